@@ -0,0 +1,134 @@
+import hashlib
+import marshal
+import os
+
+from block_markdown import PageMetadata, get_search_terms
+from copystatic import write_atomic
+from htmlnode import LeafNode, ParentNode, PlainLeafNode, RawNode
+from template import get_asset_digest
+
+# Bump whenever the parser's output for the same markdown changes, so stale trees are never reused
+PARSER_VERSION = 8
+
+LEAF = 0
+PARENT = 1
+RAW = 2
+PLAIN = 3
+
+def node_to_data(node)-> tuple:
+    """
+    Flattens an HTMLNode tree into nested tuples that marshal can store.
+    """
+    if isinstance(node, ParentNode):
+        return (PARENT, node.tag, node.props, tuple(node_to_data(child) for child in node.children))
+    if isinstance(node, PlainLeafNode):
+        return (PLAIN, node.tag, node.value, node.props)
+    if isinstance(node, LeafNode):
+        return (LEAF, node.tag, node.value, node.props)
+    if isinstance(node, RawNode):
+        return (RAW, node.value)
+    raise ValueError(f"Unsupported node type: {type(node).__name__}")
+
+def node_from_data(data: tuple):
+    kind = data[0]
+    if kind == PARENT:
+        _, tag, props, children = data
+        return ParentNode(tag, [node_from_data(child) for child in children], props)
+    if kind == LEAF:
+        _, tag, value, props = data
+        return LeafNode(tag, value, props)
+    if kind == PLAIN:
+        _, tag, value, props = data
+        return PlainLeafNode(tag, value, props)
+    if kind == RAW:
+        return RawNode(data[1])
+    raise ValueError(f"Unsupported node data: {kind}")
+
+class ASTCache:
+    """
+    On-disk cache of parsed markdown trees and their page metadata, keyed by a hash of PARSER_VERSION, the basepath
+    the tree's links were built for, whether search terms were collected, the fingerprinted asset URLs and the
+    markdown, so a page whose markdown is unchanged goes straight to serialization when only the template changed.
+
+    Entries are marshal files; hits touch their entry. Worker processes each get their own copy of the cache, so
+    none of them can tell how large it is: the build calls trim once its pages are generated, which evicts the least
+    recently used entries, by mtime, when the cache has grown past max_bytes.
+    """
+    def __init__(self, cache_dir, max_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, markdown: str, basepath: str = "/")-> str:
+        digest = hashlib.sha256(
+            f"{PARSER_VERSION}\0{basepath}\0{get_search_terms():d}\0{get_asset_digest()}\0".encode()
+        )
+        digest.update(markdown.encode())
+        return digest.hexdigest()
+
+    def path_for(self, key: str)-> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, markdown: str, basepath: str = "/")-> tuple[ParentNode, PageMetadata] | None:
+        """
+        Returns the cached (tree, metadata) for markdown, or None on a miss or an unreadable entry.
+        """
+        path = self.path_for(self.key(markdown, basepath))
+        try:
+            with open(path, "rb") as f:
+                node_data, metadata_data = marshal.load(f)
+            node = node_from_data(node_data)
+            metadata = PageMetadata.from_dict(metadata_data)
+        except (OSError, EOFError, ValueError, TypeError, KeyError):
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return node, metadata
+
+    def put(self, markdown: str, node, metadata: PageMetadata, basepath: str = "/"):
+        path = self.path_for(self.key(markdown, basepath))
+        write_atomic(path, marshal.dumps((node_to_data(node), metadata.to_dict())))
+
+    def entries(self)-> list[tuple[str, os.stat_result]]:
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    entries.append((entry.path, entry.stat()))
+        return entries
+
+    def disk_size(self)-> int:
+        return sum(stat.st_size for _, stat in self.entries())
+
+    def trim(self)-> int:
+        """
+        Scans the cache once and, if it is larger than max_bytes, removes the least recently used entries until it is
+        back under 90% of max_bytes, leaving room to grow before the next build has to evict.
+
+        Returns:
+            int: the size of the cache in bytes afterwards.
+        """
+        entries = self.entries()
+        size = sum(stat.st_size for _, stat in entries)
+        if size <= self.max_bytes:
+            return size
+        entries.sort(key=lambda entry: entry[1].st_mtime_ns)
+        target = self.max_bytes * 0.9
+        for path, stat in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= stat.st_size
+        return size
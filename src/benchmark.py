@@ -0,0 +1,382 @@
+"""
+Benchmarks for the site generator. Run from the repository root with:
+
+    python3 src/benchmark.py --pages 200 --output run.json
+    python3 src/benchmark.py --pages 200 --compare run.json
+
+Every stage of the markdown pipeline is timed over a deterministic synthetic corpus (see corpus.py), reporting
+pages/sec, MB/sec and peak traced memory. Comparing against a saved run flags stages that got slower or hungrier
+than the threshold allows. Only the standard library is used.
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import block_markdown
+from block_markdown import BlockType, block_to_block_type, markdown_to_blocks, markdown_to_html_node
+from corpus import CorpusSpec, generate_corpus, write_corpus
+from htmlnode import LeafNode, ParentNode
+from inline_markdown import text_to_textnodes
+from pagegenerator import generate_pages_recursive
+from template import rewrite_basepath
+from textnode import TextNode, TextType
+
+BENCH_BASEPATH = "/site/"
+# Link density for the basepath comparison, well above what real prose has
+LINK_HEAVY_DENSITY = 0.3
+# About one word in fifty holding "&", "<" or ">", which leaves about half of the leaves with something to escape
+MARKUP_DENSITY = 0.02
+
+BENCH_TEMPLATE = '<html><head><title>{{ Title }}</title><link href="/index.css"></head><body>{{ Content }}</body></html>'
+
+NODE_COUNT = 100_000
+SAMPLE_TEXT = "some text"
+
+class _DictTextNode:
+    """TextNode as it was laid out before slots, kept to compare against."""
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+class _DictHTMLNode:
+    """HTMLNode as it was laid out before slots, kept to compare against."""
+    def __init__(self, tag=None, value=None, children=None, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = children
+        self.props = props
+
+def bytes_per_node(factory, count=NODE_COUNT)-> float:
+    """
+    Returns the average number of bytes allocated per node created by factory, excluding the list holding them.
+    """
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        nodes = [factory() for _ in range(count)]
+        allocated = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    return (allocated - sys.getsizeof(nodes)) / count
+
+def node_memory()-> list[tuple[str, float, float]]:
+    """
+    Measures bytes per node for each node class against its pre-slots layout.
+
+    Returns:
+        list: (node name, bytes before, bytes after) rows.
+    """
+    cases = [
+        (
+            "TextNode",
+            lambda: _DictTextNode(SAMPLE_TEXT, TextType.TEXT),
+            lambda: TextNode(SAMPLE_TEXT, TextType.TEXT),
+        ),
+        (
+            "LeafNode",
+            lambda: _DictHTMLNode(None, SAMPLE_TEXT, [], None),
+            lambda: LeafNode(None, SAMPLE_TEXT),
+        ),
+        (
+            "ParentNode",
+            lambda: _DictHTMLNode("p", "", [], None),
+            lambda: ParentNode("p", []),
+        ),
+    ]
+    return [(name, bytes_per_node(before), bytes_per_node(after)) for name, before, after in cases]
+
+def always_escape(text: str)-> bool:
+    return False
+
+def never_escape(text: str)-> bool:
+    return True
+
+@contextlib.contextmanager
+def escape_check(check):
+    """
+    Swaps the per-block check text_to_children makes before it builds plain leaves: always_escape turns the check
+    off, so every leaf escapes, and never_escape turns escaping off altogether.
+    """
+    original = block_markdown.is_plain
+    block_markdown.is_plain = check
+    try:
+        yield
+    finally:
+        block_markdown.is_plain = original
+
+def escaping_overhead(corpus: list[str], repeat: int = 3)-> dict:
+    """
+    Times parsing plus to_html over the corpus three ways: as built, with the per-block check that skips escaping
+    plain blocks, with that check turned off so every leaf escapes, and with nothing escaped. The check runs while
+    parsing, so both are timed together.
+
+    Returns:
+        dict: seconds for each way, the overhead of escaping as built as a fraction of the unescaped time, and the
+        same without the check.
+    """
+    def build():
+        return [markdown_to_html_node(markdown).to_html() for markdown in corpus]
+
+    timings = {"checked": float("inf"), "unchecked": float("inf"), "unescaped": float("inf")}
+    checks = {"checked": block_markdown.is_plain, "unchecked": always_escape, "unescaped": never_escape}
+    # Like timeit, keep the collector out of the timings, and alternate the three so drift in machine load favours
+    # none of them
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            for name, check in checks.items():
+                with escape_check(check):
+                    timings[name] = min(timings[name], best_time(build, 1))
+    finally:
+        gc.enable()
+    unescaped = timings["unescaped"]
+    return {
+        "checked_seconds": timings["checked"],
+        "unchecked_seconds": timings["unchecked"],
+        "unescaped_seconds": unescaped,
+        "overhead": timings["checked"] / unescaped - 1 if unescaped else 0.0,
+        "unchecked_overhead": timings["unchecked"] / unescaped - 1 if unescaped else 0.0,
+    }
+
+def markup_spec(spec: CorpusSpec)-> CorpusSpec:
+    """
+    Returns the corpus spec with a realistic share of text that needs escaping, unless it already asks for one.
+    """
+    return CorpusSpec(
+        pages=spec.pages,
+        page_size=spec.page_size,
+        block_mix=spec.block_mix,
+        link_density=spec.link_density,
+        emphasis_density=spec.emphasis_density,
+        depth=spec.depth,
+        fanout=spec.fanout,
+        seed=spec.seed,
+        markup_density=spec.markup_density or MARKUP_DENSITY,
+    )
+
+def basepath_rewriting(spec: CorpusSpec, repeat: int = 3)-> dict:
+    """
+    Compares the two ways of applying the basepath on a link-heavy version of the corpus: rendering with "/" and
+    replacing href="/ and src="/ in the finished HTML, against building link and image nodes with the basepath.
+
+    Returns:
+        dict: seconds for each approach, parse and serialization included.
+    """
+    link_heavy = CorpusSpec(
+        pages=spec.pages,
+        page_size=spec.page_size,
+        block_mix=spec.block_mix,
+        link_density=max(spec.link_density, LINK_HEAVY_DENSITY),
+        emphasis_density=spec.emphasis_density,
+        seed=spec.seed,
+    )
+    corpus = [markdown for _, markdown in generate_corpus(link_heavy)]
+
+    def string_replace():
+        return [rewrite_basepath(markdown_to_html_node(markdown).to_html(), BENCH_BASEPATH) for markdown in corpus]
+
+    def node_level():
+        return [markdown_to_html_node(markdown, basepath=BENCH_BASEPATH).to_html() for markdown in corpus]
+
+    return {
+        "string_replace_seconds": best_time(string_replace, repeat),
+        "node_level_seconds": best_time(node_level, repeat),
+    }
+
+def best_time(run, repeat: int)-> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def peak_memory(run)-> int:
+    """
+    Returns the peak memory traced while run executes, above what was allocated before it started.
+    """
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        run()
+        return tracemalloc.get_traced_memory()[1] - start
+    finally:
+        tracemalloc.stop()
+
+def measure_stage(run, pages: int, size: int, repeat: int)-> dict:
+    seconds = best_time(run, repeat)
+    return {
+        "seconds": seconds,
+        "pages_per_sec": pages / seconds if seconds else 0.0,
+        "mb_per_sec": size / 1_000_000 / seconds if seconds else 0.0,
+        "peak_bytes": peak_memory(run),
+    }
+
+def paragraph_texts(markdown: str)-> list[str]:
+    texts = []
+    for block in markdown_to_blocks(markdown):
+        if block_to_block_type(block) == BlockType.PARAGRAPH:
+            texts.append(" ".join(block.split("\n")))
+    return texts
+
+def run_suite(spec: CorpusSpec, repeat: int = 3)-> dict:
+    """
+    Times each pipeline stage over the corpus described by spec.
+
+    Returns:
+        dict: the spec, the environment and, per stage, seconds, pages_per_sec, mb_per_sec and peak_bytes.
+    """
+    corpus = [markdown for _, markdown in generate_corpus(spec)]
+    corpus_size = sum(len(markdown.encode()) for markdown in corpus)
+    texts = [text for markdown in corpus for text in paragraph_texts(markdown)]
+    texts_size = sum(len(text.encode()) for text in texts)
+    nodes = [markdown_to_html_node(markdown) for markdown in corpus]
+
+    stages = {}
+    stages["text_to_textnodes"] = measure_stage(
+        lambda: [text_to_textnodes(text) for text in texts], spec.pages, texts_size, repeat
+    )
+    stages["markdown_to_html_node"] = measure_stage(
+        lambda: [markdown_to_html_node(markdown) for markdown in corpus], spec.pages, corpus_size, repeat
+    )
+    stages["to_html"] = measure_stage(lambda: [node.to_html() for node in nodes], spec.pages, corpus_size, repeat)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        content = os.path.join(tmp, "content")
+        template = os.path.join(tmp, "template.html")
+        write_corpus(spec, content)
+        with open(template, "w") as f:
+            f.write(BENCH_TEMPLATE)
+
+        def build():
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_pages_recursive(content, template, os.path.join(tmp, "docs"), "/site/")
+
+        stages["generate_pages_recursive"] = measure_stage(build, spec.pages, corpus_size, repeat)
+
+    return {
+        "spec": spec.to_dict(),
+        "python": platform.python_version(),
+        "corpus_bytes": corpus_size,
+        "stages": stages,
+        "node_memory": {name: after for name, _, after in node_memory()},
+        "escaping": {
+            "corpus": escaping_overhead(corpus, repeat),
+            "markup": escaping_overhead([markdown for _, markdown in generate_corpus(markup_spec(spec))], repeat),
+        },
+        "basepath": basepath_rewriting(spec, repeat),
+    }
+
+def compare(baseline: dict, current: dict, threshold: float = 0.1)-> list[str]:
+    """
+    Lists the stages whose throughput dropped, or whose peak memory grew, by more than threshold against baseline.
+    """
+    regressions = []
+    for name, stage in current["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if base is None:
+            continue
+        if stage["mb_per_sec"] < base["mb_per_sec"] * (1 - threshold):
+            regressions.append(f"{name}: {base['mb_per_sec']:.2f} -> {stage['mb_per_sec']:.2f} MB/s")
+        if stage["peak_bytes"] > base["peak_bytes"] * (1 + threshold):
+            regressions.append(f"{name}: peak {base['peak_bytes']} -> {stage['peak_bytes']} bytes")
+    for name, after in current.get("node_memory", {}).items():
+        before = baseline.get("node_memory", {}).get(name)
+        if before is not None and after > before * (1 + threshold):
+            regressions.append(f"{name}: {before:.1f} -> {after:.1f} bytes per node")
+    return regressions
+
+def format_results(results: dict)-> str:
+    lines = [f"Corpus: {results['spec']['pages']} pages, {results['corpus_bytes']} bytes"]
+    lines.append(f"{'stage':<26}{'pages/s':>12}{'MB/s':>10}{'peak KB':>12}")
+    for name, stage in results["stages"].items():
+        lines.append(
+            f"{name:<26}{stage['pages_per_sec']:>12.1f}{stage['mb_per_sec']:>10.2f}{stage['peak_bytes'] / 1024:>12.1f}"
+        )
+    lines.append("Memory per node (bytes)")
+    for name, size in results["node_memory"].items():
+        lines.append(f"  {name:<12}{size:>10.1f}")
+    for name, escaping in results.get("escaping", {}).items():
+        lines.append(
+            f"Escaping, parse+to_html on the {name} pages: {escaping['unescaped_seconds'] * 1000:.1f} ms unescaped,"
+            f" {escaping['checked_seconds'] * 1000:.1f} ms ({escaping['overhead'] * 100:+.1f}%),"
+            f" {escaping['unchecked_seconds'] * 1000:.1f} ms without the per-block check"
+            f" ({escaping['unchecked_overhead'] * 100:+.1f}%)"
+        )
+    basepath = results.get("basepath")
+    if basepath is not None:
+        lines.append(
+            f"Basepath on link-heavy pages: string replace {basepath['string_replace_seconds'] * 1000:.1f} ms,"
+            f" node level {basepath['node_level_seconds'] * 1000:.1f} ms"
+        )
+    return "\n".join(lines)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the markdown pipeline on a synthetic corpus.")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--page-size", type=int, default=4000, help="approximate bytes of markdown per page")
+    parser.add_argument("--link-density", type=float, default=0.05)
+    parser.add_argument("--emphasis-density", type=float, default=0.1)
+    parser.add_argument(
+        "--markup-density",
+        type=float,
+        default=0.0,
+        help='share of words holding "&", "<" or ">"; escaping is also timed on a corpus with a realistic share',
+    )
+    parser.add_argument("--depth", type=int, default=2, help="directory nesting depth of the corpus")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage; the best time is kept")
+    parser.add_argument("--output", metavar="PATH", help="save the results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="flag regressions against saved results")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown or growth, as a fraction")
+    parser.add_argument("--nodes", action="store_true", help="only compare node memory against the pre-slots layout")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.nodes:
+        print("Memory per node (bytes)")
+        print(f"{'node':<12}{'before':>10}{'after':>10}")
+        for name, before, after in node_memory():
+            print(f"{name:<12}{before:>10.1f}{after:>10.1f}")
+        return
+
+    spec = CorpusSpec(
+        pages=args.pages,
+        page_size=args.page_size,
+        link_density=args.link_density,
+        emphasis_density=args.emphasis_density,
+        depth=args.depth,
+        seed=args.seed,
+        markup_density=args.markup_density,
+    )
+    results = run_suite(spec, args.repeat)
+    print(format_results(results))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.threshold)
+        for regression in regressions:
+            print(f"regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions")
+
+if __name__ == "__main__":
+    main()
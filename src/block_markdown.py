@@ -1,7 +1,13 @@
+import re
+import time
+from collections import OrderedDict
 from enum import Enum
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from typing import Iterator
+from frontmatter import split_front_matter
+from htmlnode import HTMLNode, LeafNode, ParentNode, RawNode, is_plain
 from textnode import TextNode, TextType, text_node_to_html_node
 from inline_markdown import text_to_textnodes
+from profiler import BLOCK_TO_BLOCK_TYPE, MARKDOWN_TO_BLOCKS, TEXT_TO_TEXTNODES
 
 class BlockType(Enum):
     PARAGRAPH = "paragraph"
@@ -11,15 +17,87 @@ class BlockType(Enum):
     QUOTE = "quote"
     CODE = "code"
 
-def markdown_to_blocks(markdown: str)-> list[str]:
-    blocks = markdown.split("\n\n")
-    filtered_blocks = []
-    for block in blocks:
-        if block == "":
+FENCE = "```"
+
+def iter_blocks(lines)-> Iterator[str]:
+    """
+    Lazily splits markdown into blocks, one blank line apart, holding only the current block in memory.
+
+    Args:
+        lines (iterable): the markdown's lines, with or without their trailing newline, such as an open file.
+
+    Yields:
+        str: each block, stripped, skipping blocks that are only whitespace. Blank lines inside a fenced code block
+            opened at the start of a block do not end it.
+    """
+    block_lines = []
+    in_fence = False
+    for line in lines:
+        line = line.rstrip("\n")
+        if in_fence:
+            block_lines.append(line)
+            if line.startswith(FENCE):
+                in_fence = False
             continue
-        block = block.strip()
-        filtered_blocks.append(block)
-    return filtered_blocks
+        if line == "":
+            if block_lines:
+                block = "\n".join(block_lines).strip()
+                block_lines = []
+                if block:
+                    yield block
+            continue
+        # A fence opens only on a line that doesn't also close it, like ```python but not ```code```
+        if not block_lines and line.lstrip().startswith(FENCE) and line.count(FENCE) == 1:
+            in_fence = True
+        block_lines.append(line)
+    if block_lines:
+        block = "\n".join(block_lines).strip()
+        if block:
+            yield block
+
+def _decode_block(buffer, start: int, stop: int, encoding: str)-> str:
+    block = buffer[start:stop].decode(encoding)
+    if "\r" in block:
+        block = block.replace("\r\n", "\n")
+    return block.strip()
+
+def iter_buffer_blocks(buffer, encoding: str = "utf-8")-> Iterator[str]:
+    """
+    Splits markdown held in a bytes-like buffer, such as an mmap of the source file, into the same blocks as
+    iter_blocks. Line and block boundaries are found on the raw bytes and only each block's slice is decoded, so the
+    document is never decoded or copied as a whole.
+    """
+    fence = FENCE.encode()
+    size = len(buffer)
+    block_start = None
+    in_fence = False
+    pos = 0
+    while pos < size:
+        end = buffer.find(b"\n", pos)
+        if end == -1:
+            end = size
+        if in_fence:
+            if buffer[pos:pos + len(fence)] == fence:
+                in_fence = False
+        elif end == pos or (end == pos + 1 and buffer[pos] == ord("\r")):
+            if block_start is not None:
+                block = _decode_block(buffer, block_start, pos, encoding)
+                block_start = None
+                if block:
+                    yield block
+        elif block_start is None:
+            block_start = pos
+            line = buffer[pos:end]
+            if line.lstrip().startswith(fence) and line.count(fence) == 1:
+                in_fence = True
+        pos = end + 1
+    if block_start is not None:
+        block = _decode_block(buffer, block_start, size, encoding)
+        if block:
+            yield block
+
+def markdown_to_blocks(markdown: str)-> list[str]:
+    return list(iter_blocks(markdown.split("\n")))
 
 def block_to_block_type(block: str) -> BlockType:
     lines = block.split("\n")
@@ -47,96 +125,387 @@ def block_to_block_type(block: str) -> BlockType:
         return BlockType.OLIST
     return BlockType.PARAGRAPH
 
-def text_to_children(text: str)-> list[HTMLNode]:
-    text_nodes = text_to_textnodes(text)
-    html_nodes = [text_node_to_html_node(node) for node in text_nodes]
+# Words that make search terms, matched against lowercased text
+_TERM = re.compile(r"\w\w+")
+
+def collect_terms(terms: set, text: str):
+    terms.update(_TERM.findall(text.lower()))
+
+def text_to_children(text: str, profiler=None, basepath: str = "/", links=None, terms=None)-> list[HTMLNode]:
+    """
+    Parses inline markdown into leaf nodes. With links given, the target of every link and image is appended to it
+    as written, before the basepath is applied. With terms given, the search terms of the plain text of every node,
+    image alt text included, are added to it.
+    """
+    if profiler is None:
+        text_nodes = text_to_textnodes(text)
+    else:
+        start = time.perf_counter()
+        text_nodes = text_to_textnodes(text)
+        profiler.lap(TEXT_TO_TEXTNODES, start)
+    if links is not None:
+        links.extend(node.url for node in text_nodes if node.url is not None)
+    if terms is not None:
+        collect_terms(terms, " ".join([node.text for node in text_nodes]))
+    # Every node's text and URL is part of the block's, with at most the basepath added, so one check here spares each
+    # leaf its own when it is serialized
+    plain = is_plain(text) and is_plain(basepath)
+    html_nodes = [text_node_to_html_node(node, basepath, plain) for node in text_nodes]
     return html_nodes
 
-def markdown_to_html_node(markdown: str) -> ParentNode:
-    parent = ParentNode("div", [])
-    blocks = markdown_to_blocks(markdown)
+def block_to_html_node(
+    block: str, block_type: BlockType, profiler=None, basepath: str = "/", links=None, terms=None
+) -> HTMLNode:
+    match block_type:
+        case BlockType.HEADING:
+            # Determine how many #
+            level = block.count("#", 0, block.find(" "))
+            child = ParentNode(f"h{level}", [])
+            if level + 1 >= len(block):
+                raise ValueError(f"invalid heading level: {level}")
+            
+            grand_children = text_to_children(block[level + 1:], profiler, basepath, links, terms)
+            child.children.extend(grand_children)
 
-    for block in blocks:
-        block_type = block_to_block_type(block)
-        match block_type:
-            case BlockType.HEADING:
-                # Determine how many #
-                level = block.count("#", 0, block.find(" "))
-                child = ParentNode(f"h{level}", [])
-                if level + 1 >= len(block):
-                    raise ValueError(f"invalid heading level: {level}")
-                
-                grand_children = text_to_children(block[level + 1:])
-                child.children.extend(grand_children)
+        case BlockType.CODE:
+            # encase <code> in <pre>
+            child = ParentNode("pre", [])
+            grand_child = ParentNode("code", [])
 
-            case BlockType.CODE:
-                # encase <code> in <pre>
-                child = ParentNode("pre", [])
-                grand_child = ParentNode("code", [])
+            # Remove the first and last lines (```)
+            code = block[4:-3]
+            if terms is not None:
+                collect_terms(terms, code)
+            code_node = TextNode(code, TextType.TEXT)
+            html_code_node = text_node_to_html_node(code_node)
+            grand_child.children.append(html_code_node)
+            child.children.append(grand_child)
 
-                # Remove the first and last lines (```)
-                code = block[4:-3]
-                code_node = TextNode(code, TextType.TEXT)
-                html_code_node = text_node_to_html_node(code_node)
-                grand_child.children.append(html_code_node)
-                child.children.append(grand_child)
 
+        case BlockType.ULIST:
+            # encase <li> in <ul>
+            child = ParentNode("ul", [])
+            
+            # Seperate items and remove "- "
+            items = block.split("\n")
 
-            case BlockType.ULIST:
-                # encase <li> in <ul>
-                child = ParentNode("ul", [])
-                
-                # Seperate items and remove "- "
-                items = block.split("\n")
+            for item in items:
+                item = item[2:]
+                grand_child = text_to_children(item, profiler, basepath, links, terms)
+                child.children.append(ParentNode("li", grand_child))
 
-                for item in items:
-                    item = item[2:]
-                    grand_child = text_to_children(item)
-                    child.children.append(ParentNode("li", grand_child))
 
 
+        case BlockType.OLIST:
+            # encase <li> in <ol>
+            child = ParentNode("ol", [])
+            
+            # Seperate items and remove "- "
+            items = block.split("\n")
 
-            case BlockType.OLIST:
-                # encase <li> in <ol>
-                child = ParentNode("ol", [])
-                
-                # Seperate items and remove "- "
-                items = block.split("\n")
+            for item in items:
+                item = item[3:]
 
-                for item in items:
-                    item = item[3:]
+                grand_child = text_to_children(item, profiler, basepath, links, terms)
+                child.children.append(ParentNode("li", grand_child))
 
-                    grand_child = text_to_children(item)
-                    child.children.append(ParentNode("li", grand_child))
 
+        case BlockType.PARAGRAPH:
+            # Remove new lines
+            child = ParentNode("p", [])
+            lines = block.split("\n")
+            paragraph = " ".join(lines)
+            grand_children = text_to_children(paragraph, profiler, basepath, links, terms)
+            child.children.extend(grand_children)
 
-            case BlockType.PARAGRAPH:
-                # Remove new lines
-                child = ParentNode("p", [])
-                lines = block.split("\n")
-                paragraph = " ".join(lines)
-                grand_children = text_to_children(paragraph)
-                child.children.extend(grand_children)
+            
+        case BlockType.QUOTE:
+            child = ParentNode("blockquote", [])
+            lines = block.split("\n")
 
+            for line in lines:
+                if not line.startswith(">"):
+                    raise ValueError(f"Invalid quote block: line does not start with >: {line}")
                 
-            case BlockType.QUOTE:
-                child = ParentNode("blockquote", [])
-                lines = block.split("\n")
-
-                for line in lines:
-                    if not line.startswith(">"):
-                        raise ValueError(f"Invalid quote block: line does not start with >: {line}")
-                    
-                    lines = [line.strip(">").strip() for line in lines]
-                quote = " ".join(lines)
-                grand_children = text_to_children(quote)
-                child.children = grand_children
-            
+                lines = [line.strip(">").strip() for line in lines]
+            quote = " ".join(lines)
+            grand_children = text_to_children(quote, profiler, basepath, links, terms)
+            child.children = grand_children
+        
+        case _:
+            raise ValueError(f"Unsupported block type: {block_type}")
+
+    return child
+
+class BlockMemo:
+    """
+    Bounded LRU of rendered HTML fragments, with the link targets and search terms found in them, keyed by a block's type, raw markdown
+    and the basepath its links were rendered for, for sites that repeat the same blocks (disclaimers, navigation
+    lists, shared code samples) across many pages. Memoizing costs more than it saves on sites whose blocks are
+    mostly unique, so builds only use one when asked to.
+    """
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, block_type: BlockType, block: str, basepath: str = "/") -> tuple[str, tuple, frozenset] | None:
+        key = (block_type, block, basepath)
+        fragment = self.entries.get(key)
+        if fragment is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return fragment
+
+    def put(self, block_type: BlockType, block: str, fragment: tuple[str, tuple, frozenset], basepath: str = "/"):
+        key = (block_type, block, basepath)
+        self.entries[key] = fragment
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def summary(self)-> str:
+        return f"Block memo: {self.hits} hits, {self.misses} misses"
+
+# Per process, so each build worker keeps its memo across all the pages it renders
+_block_memo = None
+
+def set_block_memo(memo: BlockMemo | None):
+    global _block_memo
+    _block_memo = memo
+
+def get_block_memo() -> BlockMemo | None:
+    return _block_memo
+
+# Per process as well: collecting search terms costs about as much as counting words, so only builds that write a
+# search index pay for it
+_search_terms = False
+
+def set_search_terms(enabled: bool):
+    global _search_terms
+    _search_terms = enabled
+
+def get_search_terms() -> bool:
+    return _search_terms
+
+def render_block(block: str, profiler=None, metadata=None, basepath: str = "/") -> HTMLNode:
+    """
+    Turns one block into its HTML node, or into a RawNode of its memoized fragment when a block memo is set.
+
+    Args:
+        metadata (PageMetadata): collects the block's title, heading, words, links and search terms, if given.
+        basepath (str): prefix for root-relative link and image URLs.
+    """
+    if profiler is None:
+        block_type = block_to_block_type(block)
+    else:
+        start = time.perf_counter()
+        block_type = block_to_block_type(block)
+        profiler.lap(BLOCK_TO_BLOCK_TYPE, start)
+    if metadata is not None:
+        metadata.add_block(block, block_type)
+
+    memo = _block_memo
+    if memo is None:
+        if metadata is None:
+            return block_to_html_node(block, block_type, profiler, basepath)
+        return block_to_html_node(block, block_type, profiler, basepath, metadata.links, metadata.terms)
+
+    wants_terms = metadata is not None and metadata.terms is not None
+    entry = memo.get(block_type, block, basepath)
+    if entry is not None and wants_terms and entry[2] is None:
+        # Memoized while terms weren't collected
+        entry = None
+    if entry is None:
+        links = []
+        terms = set() if wants_terms else None
+        fragment = block_to_html_node(block, block_type, profiler, basepath, links, terms).to_html()
+        entry = (fragment, tuple(links), frozenset(terms) if terms is not None else None)
+        memo.put(block_type, block, entry, basepath)
+        if profiler is not None:
+            profiler.count("block_memo_misses")
+    elif profiler is not None:
+        profiler.count("block_memo_hits")
+    fragment, links, terms = entry
+    if metadata is not None:
+        metadata.links.extend(links)
+        if wants_terms:
+            metadata.terms.update(terms)
+    return RawNode(fragment)
+
+# A paragraph that is nothing but one link or image, like a "back home" link, says nothing about the page
+_LONE_LINK = re.compile(r"!?\[[^\]]*\]\([^)]*\)")
+
+class PageMetadata:
+    """
+    Document facts collected from the blocks while a page is parsed, so titles, tables of contents and indexes never
+    have to scan the markdown again.
+
+    Attributes:
+        title (str): text of the first "# " line, or None if there is none.
+        outline (list): (level, text) of every heading block in order, with the heading's inline markdown as written.
+        word_count (int): whitespace-separated words of the content, without list, quote and heading markers.
+        links (list): target of every link and image in order, as written in the markdown.
+        fields (dict): the page's front matter; its "title" takes the place of the first "# " line.
+        summary (str): the first paragraph that isn't a lone link or image, on one line with its inline markdown as
+            written, or the front matter's "summary".
+        terms (set): the lowercased words of the content's plain text, for the search index, or None when search
+            terms aren't collected.
+    """
+    def __init__(self, title=None, outline=None, word_count=0, links=None, fields=None, summary=None, terms=None):
+        self.title = title
+        self.outline = outline if outline is not None else []
+        self.word_count = word_count
+        self.links = links if links is not None else []
+        self.fields = fields if fields is not None else {}
+        self.summary = summary
+        self.terms = terms
+
+    def add_front_matter(self, fields: dict):
+        self.fields = fields
+        if fields.get("title"):
+            self.title = fields["title"]
+        if fields.get("summary"):
+            self.summary = fields["summary"]
+
+    def add_block(self, block: str, block_type: BlockType):
+        if self.title is None:
+            self.title = _find_title(block)
+
+        match block_type:
+            case BlockType.HEADING:
+                level = block.count("#", 0, block.find(" "))
+                text = block[level + 1:]
+                self.outline.append((level, text))
+                self.word_count += len(text.split())
+            case BlockType.CODE:
+                self.word_count += len(block[4:-3].split())
+            case BlockType.ULIST | BlockType.OLIST | BlockType.QUOTE:
+                for line in block.split("\n"):
+                    if block_type == BlockType.QUOTE:
+                        line = line.lstrip(">")
+                    else:
+                        line = line[line.find(" ") + 1:]
+                    self.word_count += len(line.split())
             case _:
-                raise ValueError(f"Unsupported block type: {block_type}")
+                if self.summary is None and not _LONE_LINK.fullmatch(block):
+                    self.summary = block.replace("\n", " ")
+                self.word_count += len(block.split())
+
+    def to_dict(self)-> dict:
+        return {
+            "title": self.title,
+            "outline": [list(entry) for entry in self.outline],
+            "word_count": self.word_count,
+            "links": list(self.links),
+            "fields": dict(self.fields),
+            "summary": self.summary,
+            "terms": sorted(self.terms) if self.terms is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PageMetadata":
+        return cls(
+            data["title"],
+            [tuple(entry) for entry in data["outline"]],
+            data["word_count"],
+            list(data["links"]),
+            dict(data["fields"]),
+            data["summary"],
+            set(data["terms"]) if data["terms"] is not None else None,
+        )
+
+    def __eq__(self, other)-> bool:
+        return isinstance(other, PageMetadata) and self.to_dict() == other.to_dict()
+
+    def __repr__(self)-> str:
+        return (
+            f"PageMetadata(title={self.title!r}, outline={self.outline}, word_count={self.word_count}, "
+            f"links={self.links}, fields={self.fields}, summary={self.summary!r}, "
+            f"terms={len(self.terms) if self.terms is not None else None})"
+        )
+
+def _find_title(block: str) -> str | None:
+    if block.startswith("# "):
+        start = 0
+    else:
+        start = block.find("\n# ")
+        if start == -1:
+            return None
+        start += 1
+    end = block.find("\n", start)
+    return block[start + 2:end if end != -1 else len(block)]
+
+def parse_markdown(markdown: str, profiler=None, basepath: str = "/") -> tuple[ParentNode, PageMetadata]:
+    """
+    Parses markdown into its HTML tree and the page's metadata in one pass over the blocks. Root-relative link and
+    image URLs are pointed at basepath as their nodes are built. A front matter block at the start goes into the
+    metadata instead of the tree.
+    """
+    parent = ParentNode("div", [])
+    metadata = PageMetadata(terms=set() if _search_terms else None)
+    if profiler is None:
+        blocks = markdown_to_blocks(markdown)
+    else:
+        start = time.perf_counter()
+        blocks = markdown_to_blocks(markdown)
+        profiler.lap(MARKDOWN_TO_BLOCKS, start)
+
+    if blocks:
+        fields, rest = split_front_matter(blocks[0])
+        if fields is not None:
+            metadata.add_front_matter(fields)
+            blocks = [rest, *blocks[1:]] if rest else blocks[1:]
+    for block in blocks:
+        parent.children.append(render_block(block, profiler, metadata, basepath))
+
+    return parent, metadata
+
+def markdown_to_html_node(markdown: str, profiler=None, basepath: str = "/") -> ParentNode:
+    return parse_markdown(markdown, profiler, basepath)[0]
 
-        parent.children.append(child)
+class MarkdownStream:
+    """
+    Stands in for the tree markdown_to_html_node would build: write_html pulls one block at a time and writes its
+    HTML before pulling the next, so memory is bounded by the largest block rather than the whole document. It can be
+    passed to Template.write like any node, and can only be written once. The page's metadata is collected on the way
+    and is complete once write_html returns, apart from the front matter, which is taken from the first block.
 
-    
-    return parent
+    Args:
+        blocks (iterator): the markdown's blocks, from iter_blocks over the open source file or iter_buffer_blocks
+            over a mapped one.
+        profiler (Profiler): records the stages of every block, if given.
+        basepath (str): prefix for root-relative link and image URLs.
+    """
+    def __init__(self, blocks, profiler=None, basepath="/"):
+        self.blocks = blocks
+        self.profiler = profiler
+        self.basepath = basepath
+        self.metadata = PageMetadata(terms=set() if _search_terms else None)
 
+    def write_html(self, fp):
+        profiler = self.profiler
+        blocks = self.blocks
+        first = True
+        fp.write("<div>")
+        while True:
+            if profiler is None:
+                block = next(blocks, None)
+            else:
+                start = time.perf_counter()
+                block = next(blocks, None)
+                profiler.lap(MARKDOWN_TO_BLOCKS, start)
+            if block is None:
+                break
+            if first:
+                first = False
+                fields, block = split_front_matter(block)
+                if fields is not None:
+                    self.metadata.add_front_matter(fields)
+                    if not block:
+                        continue
+            render_block(block, profiler, self.metadata, self.basepath).write_html(fp)
+        fp.write("</div>")
@@ -1,21 +1,235 @@
+import hashlib
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 
-def directory_copy(src: str, dst: str):
+COPY = "copy"
+HARDLINK = "hardlink"
+REFLINK = "reflink"
+TRANSFER_MODES = (COPY, HARDLINK, REFLINK)
+PROGRESS_INTERVAL = 1000
+
+def file_hash(path)-> str:
+    """
+    Returns the sha256 hex digest of a file's contents, read in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class CopyStats:
+    """
+    Counts of what a directory_copy call did, in files and bytes.
+    """
+    def __init__(self):
+        self.copied = 0
+        self.linked = 0
+        self.skipped = 0
+        self.removed = 0
+        self.copied_bytes = 0
+        self.linked_bytes = 0
+        self.skipped_bytes = 0
+        self.files = []
+
+    def summary(self)-> str:
+        return (
+            f"{self.copied} copied ({self.copied_bytes} bytes), "
+            f"{self.linked} linked ({self.linked_bytes} bytes), "
+            f"{self.skipped} unchanged ({self.skipped_bytes} bytes), "
+            f"{self.removed} removed"
+        )
+
+    def __repr__(self)-> str:
+        return f"CopyStats({self.summary()})"
+
+def is_unchanged(from_path, from_stat, dest_path, checksum=False, linked=False)-> bool:
+    """
+    Reports whether dest_path already holds from_path: the same size and either the same mtime or, with checksum, the
+    same content hash. A hardlink to the source only counts when linked is set; otherwise it is replaced by a copy.
+    """
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        return False
+    if (dest_stat.st_dev, dest_stat.st_ino) == (from_stat.st_dev, from_stat.st_ino):
+        return linked
+    if dest_stat.st_size != from_stat.st_size:
+        return False
+    if checksum:
+        return file_hash(from_path) == file_hash(dest_path)
+    return dest_stat.st_mtime_ns == from_stat.st_mtime_ns
+
+def copy_file_range(from_path, dest_path):
+    """
+    Copies a file inside the kernel with os.copy_file_range, which shares extents (a reflink) on filesystems that
+    support it. Raises OSError when the filesystem or platform can't, so callers can fall back to a regular copy.
+    """
+    if not hasattr(os, "copy_file_range"):
+        raise OSError("os.copy_file_range is not available")
+    with open(from_path, "rb") as from_file, open(dest_path, "wb") as to_file:
+        remaining = os.fstat(from_file.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(from_file.fileno(), to_file.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+    shutil.copystat(from_path, dest_path)
+
+def transfer_file(from_path, dest_path, mode=COPY)-> bool:
+    """
+    Puts from_path at dest_path using the cheapest transfer the mode allows, falling back to a regular copy when
+    source and destination don't share a filesystem.
+
+    Returns:
+        bool: True if the file was hardlinked, False if its bytes were copied.
+    """
+    # Replace rather than write through, which would modify the source if dest_path is a hardlink to it
+    if os.path.lexists(dest_path):
+        os.remove(dest_path)
+
+    if mode == HARDLINK:
+        try:
+            os.link(from_path, dest_path)
+            return True
+        except OSError:
+            pass
+    elif mode == REFLINK:
+        try:
+            copy_file_range(from_path, dest_path)
+            return False
+        except OSError:
+            if os.path.lexists(dest_path):
+                os.remove(dest_path)
+
+    # copy2 keeps the mtime, which is what lets the next build skip the file, and uses sendfile where available
+    shutil.copy2(from_path, dest_path)
+    return False
+
+def scan_tree(src: str)-> tuple[list[str], list[tuple[str, os.stat_result]]]:
+    """
+    Walks src once with os.scandir, reusing the stat results it already has.
+
+    Returns:
+        tuple: the relative paths of every directory, and (relative path, stat) of every file, both sorted.
+    """
+    dirs = []
+    files = []
+    pending = [""]
+    while pending:
+        rel_dir = pending.pop()
+        with os.scandir(os.path.join(src, rel_dir)) as entries:
+            for entry in entries:
+                rel_path = os.path.join(rel_dir, entry.name)
+                if entry.is_dir():
+                    dirs.append(rel_path)
+                    pending.append(rel_path)
+                else:
+                    files.append((rel_path, entry.stat()))
+    dirs.sort()
+    files.sort(key=lambda file: file[0])
+    return dirs, files
+
+def write_atomic(path, data: str | bytes):
+    """
+    Writes data to path through a temporary file and a rename, so readers never see a partial file.
+
+    Args:
+        path: The file to write; its directory is created if missing.
+        data: Text is written as utf-8, bytes as they are.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if isinstance(data, bytes):
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+    else:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+    os.replace(tmp_path, path)
+
+def remove_output(dest_path, root):
+    """
+    Deletes a file written under root and any parent directories it leaves empty, stopping at root.
+    """
+    if os.path.lexists(dest_path) and not os.path.isdir(dest_path):
+        os.remove(dest_path)
+    root = os.path.abspath(root)
+    parent = os.path.dirname(os.path.abspath(dest_path))
+    while parent != root and parent.startswith(root + os.sep):
+        try:
+            os.rmdir(parent)
+        except OSError:
+            break
+        parent = os.path.dirname(parent)
+
+def sync_file(src, dst, rel_path, from_stat, mode, checksum)-> str:
+    """
+    Brings one file in dst up to date and returns what happened to it: "skipped", "linked" or "copied".
+    """
+    from_path = os.path.join(src, rel_path)
+    dest_path = os.path.join(dst, rel_path)
+    if is_unchanged(from_path, from_stat, dest_path, checksum, mode == HARDLINK):
+        return "skipped"
+    if transfer_file(from_path, dest_path, mode):
+        return "linked"
+    return "copied"
+
+def directory_copy(src: str, dst: str, mode=COPY, checksum=False, previous=None, workers=None)-> CopyStats:
     """
     Copies a directory from the static directory and recursively copies all subdirectories to the public directory in this directory.
-    
+
+    The tree is scanned once and every directory created up front, then files are copied by a pool of threads, since
+    copying many small files is bound by filesystem latency rather than bandwidth. Files whose size and mtime (or
+    content hash, with checksum) already match are skipped. With mode HARDLINK or REFLINK files are linked or copied
+    in-kernel when source and destination share a filesystem.
+
     Args:
         src (str): The source directory path.
+        dst (str): The destination directory path.
+        mode (str): one of COPY, HARDLINK or REFLINK.
+        checksum (bool): compare content hashes instead of mtimes for files of equal size.
+        previous (list): relative paths copied by the last run; those no longer in src are removed from dst. Other
+            files in dst, such as generated pages, are never touched.
+        workers (int): copy threads, defaulting to ThreadPoolExecutor's choice.
+
+    Returns:
+        CopyStats: what was copied, linked, skipped and removed.
     """
-    if not os.path.exists(dst):
-        os.mkdir(dst)
-
-    for filename in os.listdir(src):
-        from_path = os.path.join(src, filename)
-        dest_path = os.path.join(dst, filename)
-        print(f" * {from_path} -> {dest_path}")
-        if os.path.isfile(from_path):
-            shutil.copy(from_path, dest_path)
-        else:
-            directory_copy(from_path, dest_path)
\ No newline at end of file
+    if mode not in TRANSFER_MODES:
+        raise ValueError(f"Unsupported transfer mode: {mode}")
+    stats = CopyStats()
+    dirs, files = scan_tree(src)
+    stats.files = [rel_path for rel_path, _ in files]
+
+    os.makedirs(dst, exist_ok=True)
+    for rel_dir in dirs:
+        os.makedirs(os.path.join(dst, rel_dir), exist_ok=True)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(
+            lambda file: sync_file(src, dst, file[0], file[1], mode, checksum),
+            files,
+        )
+        for done, ((rel_path, from_stat), result) in enumerate(zip(files, results), start=1):
+            if result == "skipped":
+                stats.skipped += 1
+                stats.skipped_bytes += from_stat.st_size
+            elif result == "linked":
+                stats.linked += 1
+                stats.linked_bytes += from_stat.st_size
+            else:
+                stats.copied += 1
+                stats.copied_bytes += from_stat.st_size
+            if done % PROGRESS_INTERVAL == 0:
+                print(f" * {done}/{len(files)} files")
+
+    if previous:
+        current = set(stats.files)
+        for rel_path in previous:
+            if rel_path not in current:
+                remove_output(os.path.join(dst, rel_path), dst)
+                stats.removed += 1
+
+    return stats
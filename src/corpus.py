@@ -0,0 +1,149 @@
+"""
+Deterministic synthetic markdown for benchmarks. The same spec and seed always produce the same corpus, so runs on
+different machines or commits measure the same input.
+"""
+import os
+import random
+
+from block_markdown import BlockType
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog elf ring shire river mountain road tale song star wood stone "
+    "hobbit wizard king tower gate forest light shadow fire water wind"
+).split()
+
+# Words holding characters HTML escapes, as prose and code samples write them
+MARKUP = ("{} & {}", "<{}>", "{} < {}", "{} -> {}", "{} && {}")
+
+DEFAULT_BLOCK_MIX = {
+    BlockType.PARAGRAPH: 6,
+    BlockType.HEADING: 2,
+    BlockType.ULIST: 1,
+    BlockType.OLIST: 1,
+    BlockType.QUOTE: 1,
+    BlockType.CODE: 1,
+}
+
+class CorpusSpec:
+    """
+    Shape of a synthetic corpus.
+
+    Args:
+        pages (int): number of markdown files.
+        page_size (int): approximate size of each file in bytes; blocks are added until it is reached.
+        block_mix (dict): relative weight of each BlockType.
+        link_density (float): chance that an inline token is a link (a tenth of those are images).
+        emphasis_density (float): chance that an inline token is bold, italic or code.
+        markup_density (float): chance that a token, in prose or in code, holds "&", "<" or ">".
+        depth (int): directory nesting depth of the content tree.
+        fanout (int): subdirectories per directory level.
+        seed (int): random seed.
+    """
+    def __init__(self, pages=100, page_size=4000, block_mix=None, link_density=0.05, emphasis_density=0.1, depth=2,
+                 fanout=4, seed=1, markup_density=0.0):
+        self.pages = pages
+        self.page_size = page_size
+        self.block_mix = block_mix if block_mix is not None else dict(DEFAULT_BLOCK_MIX)
+        self.link_density = link_density
+        self.emphasis_density = emphasis_density
+        self.depth = depth
+        self.fanout = fanout
+        self.seed = seed
+        self.markup_density = markup_density
+
+    def to_dict(self)-> dict:
+        return {
+            "pages": self.pages,
+            "page_size": self.page_size,
+            "block_mix": {block_type.value: weight for block_type, weight in self.block_mix.items()},
+            "link_density": self.link_density,
+            "emphasis_density": self.emphasis_density,
+            "depth": self.depth,
+            "fanout": self.fanout,
+            "seed": self.seed,
+            "markup_density": self.markup_density,
+        }
+
+def inline_text(rng: random.Random, spec: CorpusSpec, words: int)-> str:
+    tokens = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        roll = rng.random()
+        if roll < spec.link_density:
+            target = f"/{rng.choice(WORDS)}/{rng.randrange(1000)}"
+            if rng.random() < 0.1:
+                tokens.append(f"![{word}]({target}.png)")
+            else:
+                tokens.append(f"[{word}]({target})")
+        elif roll < spec.link_density + spec.emphasis_density:
+            tokens.append(rng.choice(("**{}**", "_{}_", "`{}`")).format(word))
+        elif roll < spec.link_density + spec.emphasis_density + spec.markup_density:
+            tokens.append(rng.choice(MARKUP).format(word, rng.choice(WORDS)))
+        else:
+            tokens.append(word)
+    return " ".join(tokens)
+
+def code_word(rng: random.Random, spec: CorpusSpec)-> str:
+    word = rng.choice(WORDS)
+    # Only rolled for when asked for, so corpora without markup stay the same for a given seed
+    if spec.markup_density and rng.random() < spec.markup_density:
+        return rng.choice(MARKUP).format(word, rng.choice(WORDS))
+    return word
+
+def synthetic_block(rng: random.Random, spec: CorpusSpec, block_type: BlockType)-> str:
+    match block_type:
+        case BlockType.HEADING:
+            return "#" * rng.randint(2, 6) + " " + inline_text(rng, spec, rng.randint(2, 6))
+        case BlockType.ULIST:
+            return "\n".join("- " + inline_text(rng, spec, rng.randint(3, 10)) for _ in range(rng.randint(2, 8)))
+        case BlockType.OLIST:
+            return "\n".join(f"{i}. " + inline_text(rng, spec, rng.randint(3, 10)) for i in range(1, rng.randint(3, 9)))
+        case BlockType.QUOTE:
+            return "\n".join("> " + inline_text(rng, spec, rng.randint(5, 12)) for _ in range(rng.randint(1, 4)))
+        case BlockType.CODE:
+            lines = [" ".join(code_word(rng, spec) for _ in range(rng.randint(2, 8))) for _ in range(rng.randint(2, 10))]
+            return "```\n" + "\n".join(lines) + "\n```"
+        case _:
+            lines = [inline_text(rng, spec, rng.randint(8, 20)) for _ in range(rng.randint(1, 5))]
+            return "\n".join(lines)
+
+def synthetic_page(rng: random.Random, spec: CorpusSpec, title: str)-> str:
+    block_types = list(spec.block_mix)
+    weights = [spec.block_mix[block_type] for block_type in block_types]
+    blocks = [f"# {title}"]
+    size = len(blocks[0])
+    while size < spec.page_size:
+        block = synthetic_block(rng, spec, rng.choices(block_types, weights)[0])
+        blocks.append(block)
+        size += len(block) + 2
+    return "\n\n".join(blocks) + "\n"
+
+def page_path(spec: CorpusSpec, index: int)-> str:
+    parts = []
+    rest = index
+    for _ in range(spec.depth):
+        parts.append(f"section{rest % spec.fanout}")
+        rest //= spec.fanout
+    parts.append(f"page{index}")
+    parts.append("index.md")
+    return os.path.join(*parts)
+
+def generate_corpus(spec: CorpusSpec)-> list[tuple[str, str]]:
+    """
+    Returns the (relative path, markdown) of every page in the corpus.
+    """
+    rng = random.Random(spec.seed)
+    return [(page_path(spec, i), synthetic_page(rng, spec, f"Page {i}")) for i in range(spec.pages)]
+
+def write_corpus(spec: CorpusSpec, dir_path)-> int:
+    """
+    Writes the corpus under dir_path and returns its total size in bytes.
+    """
+    total = 0
+    for rel_path, markdown in generate_corpus(spec):
+        path = os.path.join(dir_path, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(markdown)
+        total += len(markdown.encode())
+    return total
@@ -0,0 +1,142 @@
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from copystatic import file_hash, remove_output, scan_tree, write_atomic
+
+# Hex digits of the content hash put in a fingerprinted name
+HASH_LENGTH = 12
+HASH_CACHE_VERSION = 1
+
+def fingerprinted_path(rel_path: str, digest: str)-> str:
+    """
+    Puts the start of a content hash before a path's extension: images/tom.png becomes images/tom.<hash>.png.
+    """
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}.{digest[:HASH_LENGTH]}{ext}"
+
+def static_url(rel_path: str)-> str:
+    return "/" + rel_path.replace(os.sep, "/")
+
+def load_hash_cache(cache_path)-> dict:
+    """
+    Loads the hashes of the last build, {relative path: [mtime_ns, size, sha256]}, or an empty cache if the file is
+    missing, unreadable or from another version.
+    """
+    if cache_path is None or not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, "r") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get("version") != HASH_CACHE_VERSION:
+        return {}
+    return cache.get("files", {})
+
+def save_hash_cache(files, cache_path):
+    """
+    Writes the hash cache atomically, like the build manifest.
+    """
+    write_atomic(cache_path, json.dumps({"version": HASH_CACHE_VERSION, "files": files}, indent=1, sort_keys=True))
+
+class Fingerprints:
+    """
+    The fingerprinted name of every static file, from fingerprint_assets.
+
+    Attributes:
+        names (dict): fingerprinted relative path of each static file, keyed by its relative path.
+        hashed (int): files whose contents were hashed this build.
+        cached (int): files whose hash was reused because their mtime and size were unchanged.
+    """
+    def __init__(self, names=None, hashed=0, cached=0):
+        self.names = names if names is not None else {}
+        self.hashed = hashed
+        self.cached = cached
+
+    def urls(self)-> dict[str, str]:
+        """
+        Returns the lookup table of root-relative URLs, {"/index.css": "/index.<hash>.css"}, that references in
+        pages and templates are rewritten with.
+        """
+        return {static_url(rel_path): static_url(name) for rel_path, name in self.names.items()}
+
+    def summary(self)-> str:
+        return f"{len(self.names)} fingerprinted, {self.hashed} hashed, {self.cached} unchanged"
+
+    def __repr__(self)-> str:
+        return f"Fingerprints({self.summary()})"
+
+def fingerprint_assets(src: str, cache_path=None, workers=None)-> Fingerprints:
+    """
+    Hashes every file under src to give it a fingerprinted name. Hashes are cached in cache_path by mtime and size,
+    so only files that changed since the last build are read; those are hashed by a pool of threads, since hashlib
+    releases the GIL while it digests each chunk.
+
+    Args:
+        src (str): the static directory.
+        cache_path (str): JSON file the hashes are kept in between builds, if given.
+        workers (int): hashing threads, defaulting to ThreadPoolExecutor's choice.
+
+    Returns:
+        Fingerprints: the fingerprinted name of every file.
+    """
+    if not os.path.isdir(src):
+        return Fingerprints()
+    cache = load_hash_cache(cache_path)
+    _, files = scan_tree(src)
+
+    digests = {}
+    stale = []
+    for rel_path, stat in files:
+        cached = cache.get(rel_path)
+        if cached is not None and cached[:2] == [stat.st_mtime_ns, stat.st_size]:
+            digests[rel_path] = cached[2]
+        else:
+            stale.append((rel_path, stat))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        hashes = executor.map(lambda file: file_hash(os.path.join(src, file[0])), stale)
+        for (rel_path, _), digest in zip(stale, hashes):
+            digests[rel_path] = digest
+
+    if cache_path is not None:
+        save_hash_cache(
+            {rel_path: [stat.st_mtime_ns, stat.st_size, digests[rel_path]] for rel_path, stat in files},
+            cache_path,
+        )
+    names = {rel_path: fingerprinted_path(rel_path, digests[rel_path]) for rel_path, _ in files}
+    return Fingerprints(names, len(stale), len(files) - len(stale))
+
+def publish_fingerprints(dst: str, fingerprints: Fingerprints, previous=None)-> list[str]:
+    """
+    Puts every static file in dst under its fingerprinted name too, as a hardlink to the copy directory_copy made
+    where the filesystem allows, so the extra names cost no space. The original names stay, for references nothing
+    rewrites, such as url() in stylesheets.
+
+    A fingerprinted name only ever holds one content, so files already in place are kept as they are.
+
+    Args:
+        previous (list): fingerprinted paths published by the last build; those no longer current are removed.
+
+    Returns:
+        list: the fingerprinted relative paths in dst.
+    """
+    for rel_path, name in fingerprints.names.items():
+        dest_path = os.path.join(dst, name)
+        if os.path.lexists(dest_path):
+            continue
+        from_path = os.path.join(dst, rel_path)
+        try:
+            os.link(from_path, dest_path)
+        except OSError:
+            shutil.copy2(from_path, dest_path)
+
+    names = sorted(fingerprints.names.values())
+    if previous:
+        current = set(names)
+        for name in previous:
+            if name not in current:
+                remove_output(os.path.join(dst, name), dst)
+    return names
@@ -0,0 +1,86 @@
+import re
+
+DELIMITER = "---"
+# Bytes read from the start of a source when only its front matter is wanted; more is read only if the block is
+# longer
+PREFIX_SIZE = 512
+
+# The end of a front matter block: its closing delimiter line, or a blank line, which the block can't contain
+_BLOCK_END = re.compile(rb"\n(?:---[ \t]*)?\r?\n")
+
+def parse_front_matter(lines)-> dict[str, str] | None:
+    """
+    Parses a front matter block: "key: value" lines between two "---" lines, with no blank line inside. Keys and
+    values are stripped of surrounding whitespace and kept as strings.
+
+    Args:
+        lines: the lines of the page from its first one; only those up to the closing delimiter are consumed.
+
+    Returns:
+        dict: the fields, or None if the lines don't start with a well-formed front matter block.
+    """
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None or first.rstrip() != DELIMITER:
+        return None
+    fields = {}
+    for line in lines:
+        line = line.rstrip()
+        if line == DELIMITER:
+            return fields
+        key, separator, value = line.partition(":")
+        key = key.strip()
+        if not separator or not key:
+            return None
+        fields[key] = value.strip()
+    return None
+
+def split_front_matter(block: str)-> tuple[dict[str, str] | None, str]:
+    """
+    Splits a page's first block at the end of its front matter. Content that starts on the line right after the
+    closing delimiter, with no blank line between them, is in the same block and is returned for rendering.
+
+    Returns:
+        tuple: the fields and the rest of the block, stripped and possibly empty, or None and the whole block if it
+            doesn't start with front matter.
+    """
+    if not block.startswith(DELIMITER):
+        return None, block
+    lines = iter(block.split("\n"))
+    fields = parse_front_matter(lines)
+    if fields is None:
+        return None, block
+    return fields, "\n".join(lines).strip()
+
+def scan_front_matter(fp, prefix_size: int = PREFIX_SIZE)-> dict[str, str]:
+    """
+    Reads the front matter from a binary file positioned at the start of a page, reading prefix_size bytes at a time
+    and stopping at the end of the block, so the body is never read.
+
+    Returns:
+        dict: the fields, empty if the page has no front matter.
+    """
+    head = fp.read(prefix_size)
+    # Pages may start with blank lines, which the block splitter skips as well
+    head = head.lstrip()
+    if not head.startswith(DELIMITER.encode()):
+        return {}
+    while True:
+        end = _BLOCK_END.search(head)
+        if end is not None:
+            head = head[:end.end()]
+            break
+        more = fp.read(prefix_size)
+        if not more:
+            break
+        head += more
+    fields = parse_front_matter(head.decode("utf-8").split("\n"))
+    return fields if fields is not None else {}
+
+def read_front_matter(from_path, prefix_size: int = PREFIX_SIZE)-> dict[str, str]:
+    """
+    Returns the front matter of the page at from_path without reading its body, for listings, feeds and dependency
+    checks that need a page's metadata but not its content.
+    """
+    with open(from_path, "rb") as from_file:
+        return scan_front_matter(from_file, prefix_size)
@@ -1,4 +1,41 @@
+import io
+
+# Shared by every LeafNode so leaves never allocate a children list of their own
+NO_CHILDREN = ()
+
+# Replacement tables, applied in order so "&" is escaped before the entities that contain it are introduced
+TEXT_ESCAPES = (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"))
+ATTRIBUTE_ESCAPES = TEXT_ESCAPES + (('"', "&quot;"),)
+
+def escape_text(text: str)-> str:
+    """
+    Escapes text for an element's content. Most text has nothing to escape, so a few membership scans decide that
+    before any replacement runs.
+    """
+    if "&" in text or "<" in text or ">" in text:
+        for char, entity in TEXT_ESCAPES:
+            text = text.replace(char, entity)
+    return text
+
+def is_plain(text: str)-> bool:
+    """
+    Reports whether text holds nothing escape_text would change.
+    """
+    return "&" not in text and "<" not in text and ">" not in text
+
+def escape_attribute(value: str)-> str:
+    """
+    Escapes a value for a double-quoted attribute.
+    """
+    if "&" in value or "<" in value or ">" in value or '"' in value:
+        for char, entity in ATTRIBUTE_ESCAPES:
+            value = value.replace(char, entity)
+    return value
+
 class HTMLNode:
+    # Pages create millions of nodes, so they are slotted rather than carrying a __dict__ each
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -6,43 +43,114 @@ class HTMLNode:
         self.props = props
     
     def to_html(self)-> str:
-        raise NotImplementedError("Subclasses must implement the to_html method")
+        buffer = io.StringIO()
+        self.write_html(buffer)
+        return buffer.getvalue()
+
+    def write_html(self, fp):
+        """
+        Streams the node's HTML to a file-like object in fragments, so a page never has to exist as one string.
+        """
+        raise NotImplementedError("Subclasses must implement the write_html method")
     
     def props_to_html(self)-> str:
+        """
+        Returns the escaped attribute string.
+        """
         if self.props is None:
             return ""
-        return " " + " ".join(f'{key}="{value}"' for key, value in self.props.items())
+        return "".join(f' {key}="{escape_attribute(str(value))}"' for key, value in self.props.items())
     
     def __repr__(self)-> str:
         return f"HTMLNode(tag='{self.tag}', value='{self.value}', children={self.children}, props={self.props})"
     
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
-        super().__init__(tag=tag, value=value, children=[], props=props)
+        super().__init__(tag=tag, value=value, children=NO_CHILDREN, props=props)
     
     def to_html(self)-> str:
         if self.value is None:
             raise ValueError("Invalid HTML: no value")
+        value = self.value
+        # Checked inline so the common case of nothing to escape costs no call
+        if "&" in value or "<" in value or ">" in value:
+            value = escape_text(value)
         if self.tag is None:
-            return self.value
-        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+            return value
+        if self.props is None:
+            return f"<{self.tag}>{value}</{self.tag}>"
+        return f"<{self.tag}{self.props_to_html()}>{value}</{self.tag}>"
+
+    def write_html(self, fp):
+        fp.write(self.to_html())
     
     def __repr__(self)-> str:
         return f"LeafNode(tag='{self.tag}', value='{self.value}', props={self.props})"
-    
+
+class PlainLeafNode(LeafNode):
+    """
+    A LeafNode whose value and attribute values are known to hold nothing to escape. Parsing checks a whole block of
+    inline markdown once and builds its leaves as these when it is plain, so serializing them costs no check at all.
+    """
+    __slots__ = ()
+
+    def to_html(self)-> str:
+        if self.value is None:
+            raise ValueError("Invalid HTML: no value")
+        if self.tag is None:
+            return self.value
+        if self.props is None:
+            return f"<{self.tag}>{self.value}</{self.tag}>"
+        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+
+    def props_to_html(self)-> str:
+        if self.props is None:
+            return ""
+        return "".join(f' {key}="{value}"' for key, value in self.props.items())
+
+    def __repr__(self)-> str:
+        return f"PlainLeafNode(tag='{self.tag}', value='{self.value}', props={self.props})"
+
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag=tag, value="", children=children, props=props)
     
-    def to_html(self):
+    def write_html(self, fp):
         if self.tag is None:
             raise ValueError("Invalid HTML: no tag")
         
         if self.children is None:
             raise ValueError("Invalid HTML: no children")
         
-        children_html = "".join(child.to_html() for child in self.children)
-        return f"<{self.tag}{self.props_to_html()}>{children_html}</{self.tag}>"
+        if self.props is None:
+            fp.write(f"<{self.tag}>")
+        else:
+            fp.write(f"<{self.tag}{self.props_to_html()}>")
+        for child in self.children:
+            child.write_html(fp)
+        fp.write(f"</{self.tag}>")
     
     def __repr__(self)-> str:
-        return f"ParentNode(tag='{self.tag}', children={self.children}, props={self.props})"
\ No newline at end of file
+        return f"ParentNode(tag='{self.tag}', children={self.children}, props={self.props})"
+
+class RawNode(HTMLNode):
+    """
+    Already-rendered HTML, written out verbatim without escaping. Used for memoized block fragments.
+    """
+    __slots__ = ()
+
+    def __init__(self, html):
+        super().__init__(tag=None, value=html, children=NO_CHILDREN, props=None)
+
+    def to_html(self)-> str:
+        return self.value
+
+    def write_html(self, fp):
+        fp.write(self.value)
+
+    def __repr__(self)-> str:
+        return f"RawNode(html='{self.value}')"
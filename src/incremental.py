@@ -0,0 +1,243 @@
+import json
+import os
+
+from block_markdown import PageMetadata, get_search_terms
+from copystatic import file_hash, remove_output, write_atomic
+from pagegenerator import find_pages, generate_pages_parallel
+from pipeline import generate_pages_pipelined
+from template import TemplateRegistry, get_asset_urls
+
+MANIFEST_VERSION = 6
+
+def page_assets(links, asset_urls)-> dict[str, str]:
+    """
+    Returns the fingerprinted URL of every static file among a page's links, keyed by the link.
+    """
+    return {url: asset_urls[url] for url in links if url in asset_urls}
+
+def empty_manifest()-> dict:
+    return {"version": MANIFEST_VERSION, "pages": {}}
+
+def load_manifest(manifest_path)-> dict:
+    """
+    Loads the build manifest, falling back to an empty one if it is missing, unreadable or from another version.
+    """
+    if not os.path.exists(manifest_path):
+        return empty_manifest()
+    try:
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return empty_manifest()
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return empty_manifest()
+    manifest.setdefault("pages", {})
+    return manifest
+
+def save_manifest(manifest, manifest_path):
+    """
+    Writes the manifest atomically so an interrupted build never leaves a half-written file behind.
+    """
+    write_atomic(manifest_path, json.dumps(manifest, indent=1, sort_keys=True))
+
+def page_entries(pages, basepath, templates)-> dict[str, dict]:
+    """
+    Returns the manifest entry of every (from_path, dest_path) page, without its metadata: the hash of its source,
+    the hash and asset references of the layout it uses, its basepath and its destination.
+    """
+    template_state = {}
+    entries = {}
+    for from_path, dest_path in pages:
+        page_template_path = templates.path_for(from_path)
+        if page_template_path not in template_state:
+            # A page naming a missing layout has no hash to match, so it is retried and reports the error every build
+            if os.path.isfile(page_template_path):
+                template_state[page_template_path] = (
+                    file_hash(page_template_path),
+                    templates.get(page_template_path).assets,
+                )
+            else:
+                template_state[page_template_path] = (None, None)
+        template, template_assets = template_state[page_template_path]
+        entries[from_path] = {
+            "hash": file_hash(from_path),
+            "template": template,
+            "template_assets": template_assets,
+            "basepath": basepath,
+            "dest": str(dest_path),
+        }
+    return entries
+
+def manifest_entry(entry, page_metadata, asset_urls)-> dict:
+    """
+    Completes a page's entry from page_entries with the metadata it was generated with. Search terms are left out.
+    """
+    return dict(
+        entry,
+        metadata=dict(page_metadata.to_dict(), terms=None),
+        assets=page_assets(page_metadata.links, asset_urls),
+    )
+
+def entry_metadata(entry, term_store=None)-> PageMetadata:
+    """
+    Returns the PageMetadata recorded for a page, with its search terms from term_store when given.
+    """
+    page_metadata = PageMetadata.from_dict(entry["metadata"])
+    if term_store is not None:
+        page_metadata.terms = term_store.get(entry["hash"])
+    return page_metadata
+
+def record_pages(manifest_path, current, generated, removed=())-> dict:
+    """
+    Records pages generated outside generate_pages_incremental, by a clean build or by --watch, in the manifest so
+    the next incremental build skips them.
+
+    Args:
+        current (dict): entries from page_entries of at least the generated pages.
+        generated (dict): PageMetadata of the pages generated, keyed by from_path.
+        removed (list): from_paths of pages deleted since the manifest was written.
+
+    Returns:
+        dict: the manifest as saved.
+    """
+    manifest = load_manifest(manifest_path)
+    asset_urls = get_asset_urls()
+    for from_path, page_metadata in generated.items():
+        manifest["pages"][from_path] = manifest_entry(current[from_path], page_metadata, asset_urls)
+    for from_path in removed:
+        manifest["pages"].pop(from_path, None)
+    save_manifest(manifest, manifest_path)
+    return manifest
+
+class GeneratedPages(dict):
+    """
+    Collects the PageMetadata of the pages a build renders, storing each page's search terms in
+    the term store and passing the page on to the caller's metadata as soon as it arrives, instead of once every page
+    is done.
+    """
+    def __init__(self, current, metadata=None, term_store=None):
+        super().__init__()
+        self.current = current
+        self.metadata = metadata
+        self.term_store = term_store
+
+    def __setitem__(self, from_path, page_metadata):
+        if self.term_store is not None and page_metadata.terms is not None:
+            self.term_store.put(self.current[from_path]["hash"], page_metadata.terms)
+        if self.metadata is not None:
+            self.metadata[from_path] = page_metadata
+        super().__setitem__(from_path, page_metadata)
+
+    def update(self, *args, **kwargs):
+        for from_path, page_metadata in dict(*args, **kwargs).items():
+            self[from_path] = page_metadata
+
+    def pop(self, from_path, *default):
+        if self.metadata is not None:
+            self.metadata.pop(from_path, None)
+        return super().pop(from_path, *default)
+
+def generate_pages_incremental(
+    dir_path_content,
+    template_path,
+    dest_dir_path,
+    basepath,
+    manifest_path,
+    jobs=1,
+    profiler=None,
+    ast_cache=None,
+    metadata=None,
+    io_threads=0,
+    io_queue=16,
+    templates=None,
+    term_store=None,
+)-> dict:
+    """
+    Regenerates only the pages whose markdown, template or basepath changed since the last build recorded in the
+    manifest, and removes pages whose source disappeared. Everything else in the public directory is left untouched.
+    With templates given, each page is compared against the layout it uses, so changing one layout regenerates only
+    its pages. When assets are fingerprinted, pages are also regenerated when an asset they or their layout reference
+    gets a new fingerprint.
+
+    Each page's metadata is recorded in the manifest, so with metadata given it receives the PageMetadata of every
+    page, generated or unchanged, keyed by from_path. Search terms are kept out of the manifest: with term_store given
+    they are kept there instead, and unchanged pages get theirs back from it. With io_threads given, changed pages are rendered by
+    generate_pages_pipelined instead of generate_pages_parallel.
+
+    Returns:
+        dict: counts of "generated", "skipped", "removed" and "failed" pages, plus the "errors" of failed pages.
+    """
+    manifest = load_manifest(manifest_path)
+    old_pages = manifest["pages"]
+    if templates is None:
+        templates = TemplateRegistry(template_path, basepath)
+    search_terms = get_search_terms()
+    asset_urls = get_asset_urls()
+
+    all_pages = find_pages(dir_path_content, dest_dir_path)
+    current = page_entries(all_pages, basepath, templates)
+    dirty = []
+    for from_path, dest_path in all_pages:
+        entry = current[from_path]
+        old_entry = old_pages.get(from_path)
+        if (
+            old_entry is None
+            or {key: old_entry.get(key) for key in entry} != entry
+            or "metadata" not in old_entry
+            # Pages last built without search terms have none to give the search index
+            or (search_terms and (term_store is None or not term_store.has(entry["hash"])))
+            # Checked against the links the page had, which are the same unless its markdown changed anyway
+            or page_assets(old_entry["metadata"]["links"], asset_urls) != old_entry.get("assets", {})
+            or not os.path.exists(dest_path)
+        ):
+            dirty.append((from_path, dest_path))
+
+    counts = {"generated": 0, "skipped": len(current) - len(dirty), "removed": 0, "failed": 0, "errors": []}
+
+    current_dests = {entry["dest"] for entry in current.values()}
+    for from_path, entry in old_pages.items():
+        if entry["dest"] in current_dests:
+            continue
+        print(f" - {entry['dest']}")
+        remove_output(entry["dest"], dest_dir_path)
+        counts["removed"] += 1
+
+    # Only pages that were written successfully are recorded, so a failed build retries the rest next time
+    pages = {}
+    dirty_paths = {from_path for from_path, _ in dirty}
+    for from_path, entry in current.items():
+        if from_path not in dirty_paths:
+            pages[from_path] = old_pages[from_path]
+            if metadata is not None:
+                metadata[from_path] = entry_metadata(old_pages[from_path], term_store if search_terms else None)
+
+    generated = GeneratedPages(current, metadata, term_store if search_terms else None)
+    try:
+        if io_threads > 0:
+            errors = generate_pages_pipelined(
+                dirty, template_path, basepath, io_threads, io_queue, profiler, ast_cache, generated, templates
+            )
+        else:
+            errors = generate_pages_parallel(
+                dirty,
+                template_path,
+                basepath,
+                jobs,
+                profiler=profiler,
+                ast_cache=ast_cache,
+                metadata=generated,
+                templates=templates,
+            )
+        failed = {from_path for from_path, _ in errors}
+        for from_path in dirty_paths - failed:
+            pages[from_path] = manifest_entry(current[from_path], generated[from_path], asset_urls)
+        counts["generated"] = len(dirty) - len(failed)
+        counts["failed"] = len(failed)
+        counts["errors"] = errors
+    finally:
+        manifest["pages"] = pages
+        save_manifest(manifest, manifest_path)
+        if term_store is not None:
+            term_store.retain(entry["hash"] for entry in pages.values())
+
+    return counts
@@ -95,11 +95,95 @@ def split_nodes_links(old_nodes: list[TextNode])-> list[TextNode]:
 
     return new_nodes
 
+INLINE_DELIMITERS = {"**": TextType.BOLD, "_": TextType.ITALIC, "`": TextType.CODE}
+
+class _Finder:
+    """
+    Caches the next position of each token in a text so repeated lookups from an advancing position stay linear.
+    """
+    def __init__(self, text: str):
+        self.text = text
+        self.end = len(text)
+        self.cache = {}
+
+    def find(self, token: str, start: int)-> int:
+        cached = self.cache.get(token)
+        if cached is not None and cached[0] <= start <= cached[1]:
+            return cached[1]
+        pos = self.text.find(token, start)
+        if pos == -1:
+            pos = self.end
+        self.cache[token] = (start, pos)
+        return pos
+
+def _match_link(finder: _Finder, open_bracket: int)-> tuple[int, int, int] | None:
+    """
+    Matches `[text](url)` starting at the `[`, with the same rules as extract_markdown_links: no brackets in the text,
+    no parentheses in the url. Spans containing emphasis delimiters are left for the delimiter passes, as the chained
+    splitters did. Returns the positions of `]` and `)` and the end of the match, or None.
+    """
+    text = finder.text
+    close_bracket = finder.find("]", open_bracket + 1)
+    if close_bracket == finder.end or finder.find("[", open_bracket + 1) < close_bracket:
+        return None
+    if close_bracket + 1 >= finder.end or text[close_bracket + 1] != "(":
+        return None
+    close_paren = finder.find(")", close_bracket + 2)
+    if close_paren == finder.end or finder.find("(", close_bracket + 2) < close_paren:
+        return None
+    for delimiter in INLINE_DELIMITERS:
+        if finder.find(delimiter, open_bracket + 1) < close_paren:
+            return None
+    return close_bracket, close_paren, close_paren + 1
+
 def text_to_textnodes(text: str)-> list[TextNode]:
+    """
+    Splits inline markdown into TextNodes in a single left-to-right scan.
+
+    Produces the same nodes as running split_nodes_delimiter for **, _ and `, then split_nodes_images and
+    split_nodes_links, without rebuilding the node list per pass or re-splitting the text per link.
+    """
     nodes = []
-    nodes = split_nodes_delimiter([TextNode(text, TextType.TEXT)], "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_images(nodes)
-    nodes = split_nodes_links(nodes)
-    return nodes
\ No newline at end of file
+    finder = _Finder(text)
+    end = finder.end
+    plain_start = 0
+    i = 0
+    while i < end:
+        # Jump straight to the next character that can open a span
+        i = min(
+            finder.find("**", i),
+            finder.find("_", i),
+            finder.find("`", i),
+            finder.find("[", i),
+        )
+        if i == end:
+            break
+
+        if text[i] == "[":
+            match = _match_link(finder, i)
+            if match is None:
+                i += 1
+                continue
+            close_bracket, close_paren, match_end = match
+            is_image = i > plain_start and text[i - 1] == "!"
+            span_start = i - 1 if is_image else i
+            if span_start > plain_start:
+                nodes.append(TextNode(text[plain_start:span_start], TextType.TEXT))
+            text_type = TextType.IMAGE if is_image else TextType.LINK
+            nodes.append(TextNode(text[i + 1:close_bracket], text_type, text[close_bracket + 2:close_paren]))
+            i = plain_start = match_end
+            continue
+
+        delimiter = "**" if text.startswith("**", i) else text[i]
+        close = text.find(delimiter, i + len(delimiter))
+        if close == -1:
+            raise ValueError(f"Invalid markdown: unmatched delimiter '{delimiter}' in text '{text}'")
+        if i > plain_start:
+            nodes.append(TextNode(text[plain_start:i], TextType.TEXT))
+        if close > i + len(delimiter):
+            nodes.append(TextNode(text[i + len(delimiter):close], INLINE_DELIMITERS[delimiter]))
+        i = plain_start = close + len(delimiter)
+
+    if plain_start < end:
+        nodes.append(TextNode(text[plain_start:], TextType.TEXT))
+    return nodes
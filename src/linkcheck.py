@@ -0,0 +1,135 @@
+import os
+import posixpath
+import re
+from urllib.parse import unquote, urlsplit
+
+# Anything that makes a root-relative target more than a plain path: queries, fragments, escapes, schemes, empty
+# or dot segments
+_NEEDS_PARSING = re.compile(r"[?#%:]|//|/\.")
+
+def output_path(dest_path, dir_path_public)-> str:
+    """
+    Returns a generated file's path relative to the public directory, with forward slashes, as it appears in URLs.
+    """
+    return os.path.relpath(dest_path, dir_path_public).replace(os.sep, "/")
+
+def link_candidates(page: str, target: str)-> list[str] | None:
+    """
+    Lists the output paths a link target may be served from, in the order a static host tries them, resolving relative
+    targets against the page's own path. Returns None for targets outside the site: other schemes and hosts, and links
+    to an anchor or query on the same page.
+    """
+    if target.startswith("/") and not _NEEDS_PARSING.search(target):
+        # Plain root-relative paths, by far the most common links, need no URL parsing or normalization
+        path = target[1:]
+        if path == "":
+            return ["index.html"]
+        if path.endswith("/"):
+            return [f"{path}index.html"]
+        return [path, f"{path}.html", f"{path}/index.html"]
+    parts = urlsplit(target)
+    if parts.scheme or parts.netloc:
+        return None
+    path = unquote(parts.path)
+    if path == "":
+        return None
+    if not path.startswith("/"):
+        path = "/" + posixpath.join(posixpath.dirname(page), path)
+    directory = path.endswith("/")
+    path = posixpath.normpath(path).lstrip("/")
+    if path in ("", "."):
+        return ["index.html"]
+    if directory:
+        return [f"{path}/index.html"]
+    return [path, f"{path}.html", f"{path}/index.html"]
+
+class LinkIndex:
+    """
+    Every file the build put in the public directory, and the link and image targets of every generated page, so
+    dangling links and orphan pages are found with one hash lookup per link instead of touching the disk.
+
+    Pages bring the targets collected in their PageMetadata while they were rendered, so nothing is parsed again.
+    """
+    def __init__(self):
+        self.outputs = set()
+        self.pages = {}
+        # Root-relative targets resolve the same from every page, and navigation links repeat on every page. Filled
+        # by check, once every output has been added
+        self.resolved = {}
+
+    def add_file(self, path: str):
+        self.outputs.add(path)
+
+    def add_page(self, path: str, links):
+        self.outputs.add(path)
+        self.pages[path] = links
+
+    def add_static(self, static_files):
+        """
+        Adds the static files, given relative to the static directory as in CopyStats.files.
+        """
+        for rel_path in static_files:
+            self.add_file(rel_path.replace(os.sep, "/"))
+
+    def add_pages(self, pages, metadata, dir_path_public):
+        """
+        Adds the generated pages.
+
+        Args:
+            pages (list): (from_path, dest_path) of every page, from find_pages.
+            metadata (dict): PageMetadata of the pages that were generated, keyed by from_path; pages that failed are
+                missing and so count as absent.
+        """
+        for from_path, dest_path in pages:
+            page_metadata = metadata.get(from_path)
+            if page_metadata is not None:
+                self.add_page(output_path(dest_path, dir_path_public), page_metadata.links)
+
+    def resolve(self, page: str, target: str)-> str | None:
+        """
+        Returns the output path target leads to from page, "" if it is outside the site, or None if nothing serves it.
+        """
+        absolute = target.startswith("/")
+        if absolute and target in self.resolved:
+            return self.resolved[target]
+        candidates = link_candidates(page, target)
+        resolved = None
+        if candidates is None:
+            resolved = ""
+        else:
+            for candidate in candidates:
+                if candidate in self.outputs:
+                    resolved = candidate
+                    break
+        if absolute:
+            self.resolved[target] = resolved
+        return resolved
+
+    def check(self)-> tuple[list[tuple[str, str]], list[str]]:
+        """
+        Returns the (page, target) of every link that resolves to no output, and the pages no other page links to,
+        apart from the site's root index.html.
+        """
+        dangling = []
+        linked = set()
+        for page, links in self.pages.items():
+            for target in links:
+                resolved = self.resolve(page, target)
+                if resolved is None:
+                    dangling.append((page, target))
+                elif resolved != page:
+                    linked.add(resolved)
+        orphans = sorted(page for page in self.pages if page not in linked and page != "index.html")
+        return dangling, orphans
+
+def report_links(index: LinkIndex)-> bool:
+    """
+    Prints dangling links and orphan pages, and returns whether every link resolved.
+    """
+    dangling, orphans = index.check()
+    for page, target in dangling:
+        print(f"broken link: {page}: {target}")
+    for page in orphans:
+        print(f"orphan page: {page}")
+    print(f"Checked links: {len(dangling)} broken, {len(orphans)} orphan page(s)")
+    return not dangling
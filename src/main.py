@@ -1,29 +1,502 @@
+import argparse
 import os
 import shutil
 import sys
 
-from copystatic import directory_copy
-from pagegenerator import generate_pages_recursive
+from astcache import ASTCache
+from block_markdown import BlockMemo, set_block_memo, set_search_terms
+from copystatic import COPY, TRANSFER_MODES, directory_copy, remove_output
+from fingerprint import Fingerprints, fingerprint_assets, publish_fingerprints
+from incremental import (
+    GeneratedPages,
+    entry_metadata,
+    generate_pages_incremental,
+    load_manifest,
+    page_entries,
+    record_pages,
+    save_manifest,
+)
+from linkcheck import LinkIndex, output_path, report_links
+from pagegenerator import find_pages, generate_pages_parallel
+from pipeline import generate_pages_pipelined
+from profiler import Profiler, phase
+from search import SearchCollector, SearchIndex, TermStore
+from sections import PAGE_SIZE, generate_sections, page_url, parse_date
+from sitemap import write_sitemap
+from template import TemplateRegistry, rewrite_url, set_asset_urls
+from watch import watch
 
 dir_path_static = "./static"
 dir_path_public = "./docs"
 dir_path_content = "./content"
 template_path = "./template.html"
+dir_path_layouts = "./layouts"
+dir_path_search = os.path.join(dir_path_public, "search")
+manifest_path = "./.build-manifest.json"
+ast_cache_path = "./.cache/ast"
+asset_hash_cache_path = "./.cache/assets.json"
+terms_cache_path = "./.cache/terms"
 
 
-def main():
-    basepath = sys.argv[1] if len(sys.argv) > 1 else "/"
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build the static site into the public directory.")
+    parser.add_argument("basepath", nargs="?", default="/", help="URL prefix the site is served from")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only regenerate pages whose sources changed since the last build",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of processes rendering pages in parallel (0 uses every CPU core)",
+    )
+    parser.add_argument(
+        "--io-threads",
+        type=int,
+        default=0,
+        metavar="N",
+        help="render pages in this process while N threads read sources ahead and write pages behind (0 disables); "
+        "pages are then held whole in memory instead of streamed, and --jobs can't be used",
+    )
+    parser.add_argument(
+        "--io-queue",
+        type=int,
+        default=16,
+        metavar="N",
+        help="pages read ahead of, and waiting to be written behind, rendering with --io-threads",
+    )
+    parser.add_argument(
+        "--link",
+        choices=TRANSFER_MODES,
+        default=COPY,
+        help="how static files reach the public directory: copy, hardlink, or reflink (in-kernel copy)",
+    )
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="compare static files by content hash instead of size and mtime",
+    )
+    parser.add_argument(
+        "--copy-threads",
+        type=int,
+        default=None,
+        help="number of threads copying, and with --fingerprint hashing, static files",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="also publish static files under names holding their content hash and point pages and layouts at them",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="after building, serve the public directory and rebuild whatever changes",
+    )
+    parser.add_argument("--port", type=int, default=8888, help="port the --watch server listens on")
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=0.05,
+        help="seconds between checks for changed files in --watch mode",
+    )
+    parser.add_argument(
+        "--ast-cache",
+        action="store_true",
+        help="reuse parsed markdown trees cached on disk, so template changes skip parsing (trees are cached per "
+        "basepath, so a basepath change parses again)",
+    )
+    parser.add_argument(
+        "--ast-cache-size",
+        type=int,
+        default=256,
+        metavar="MB",
+        help="size the AST cache is trimmed back to, least recently used first",
+    )
+    parser.add_argument(
+        "--block-memo",
+        type=int,
+        default=0,
+        metavar="N",
+        help="rendered blocks kept per process for reuse across pages; only pays off when many pages repeat the "
+        "same blocks (0, the default, disables)",
+    )
+    parser.add_argument(
+        "--check-links",
+        action="store_true",
+        help="report links and images that point at no generated page or static file, and pages nothing links to",
+    )
+    parser.add_argument(
+        "--section",
+        action="append",
+        default=[],
+        metavar="DIR",
+        help="write paginated listing pages for the pages under content/DIR (repeatable)",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=PAGE_SIZE,
+        metavar="N",
+        help="entries per section listing page",
+    )
+    parser.add_argument(
+        "--site-url",
+        metavar="URL",
+        help="absolute URL the site is served from, such as https://example.com; sections get an Atom feed when set",
+    )
+    parser.add_argument(
+        "--sitemap",
+        action="store_true",
+        help="write sitemap.xml listing every generated page (needs --site-url)",
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="write a sharded search index of every generated page to the public directory's search/ folder",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="time every build phase and page stage and print a report",
+    )
+    parser.add_argument("--profile-json", metavar="PATH", help="write the profiling report as JSON to PATH")
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        metavar="N",
+        help="number of slowest pages listed in the profiling report",
+    )
+    args = parser.parse_args(argv)
+    if args.io_threads > 0 and args.jobs != 1:
+        parser.error("--io-threads renders in a single process and can't be used with --jobs")
+    if args.jobs <= 0:
+        args.jobs = os.cpu_count() or 1
+    if args.io_queue <= 0:
+        parser.error("--io-queue must be at least 1")
+    if args.copy_threads is not None and args.copy_threads <= 0:
+        parser.error("--copy-threads must be at least 1")
+    if args.page_size <= 0:
+        parser.error("--page-size must be at least 1")
+    if args.fingerprint and args.watch:
+        parser.error("--fingerprint can't be used with --watch, which serves static files under their own names")
+    if args.sitemap and not args.site_url:
+        parser.error("--sitemap needs --site-url, since sitemaps list absolute URLs")
+    for section in args.section:
+        if os.path.exists(os.path.join(dir_path_content, section, "index.md")):
+            parser.error(f"section {section} has its own index.md, which its listing would replace")
+    return args
 
+
+def report_errors(errors)-> bool:
+    for from_path, error in errors:
+        print(f"error: {from_path}: {error}", file=sys.stderr)
+    if errors:
+        print(f"{len(errors)} page(s) failed to generate", file=sys.stderr)
+    return not errors
+
+
+def collects_metadata(args, link_index=None)-> bool:
+    return link_index is not None or bool(args.section) or args.sitemap or args.search
+
+
+def page_collector(args, pages, link_index=None):
+    """
+    Returns the dict generation fills with the metadata of every page, or None when nothing needs it, and with
+    --search the SearchIndex that the dict feeds each page's terms to as the page is generated.
+    """
+    if not collects_metadata(args, link_index):
+        return None, None
+    if not args.search:
+        return {}, None
+    index = SearchIndex()
+    urls = {
+        from_path: rewrite_url(page_url(dest_path, dir_path_public), args.basepath) for from_path, dest_path in pages
+    }
+    return SearchCollector(index, urls), index
+
+
+def build_indexes(args, pages, metadata, templates, profiler=None, link_index=None, index=None)-> list[str]:
+    """
+    Writes whatever is built from the metadata of every page once they are all generated: section listings and
+    feeds, the sitemap and the search index, which index already holds the pages of.
+
+    Returns:
+        list: paths of every file written.
+    """
+    listings = []
+    written = []
+    if args.section:
+        print("Generating section listings...")
+        with phase(profiler, "sections"):
+            sections = generate_sections(
+                args.section,
+                pages,
+                metadata,
+                templates,
+                dir_path_content,
+                dir_path_public,
+                args.basepath,
+                args.page_size,
+                args.site_url,
+            )
+        for dest_path, links in sections:
+            if links is None:
+                written.append(dest_path)
+            else:
+                listings.append(dest_path)
+                if link_index is not None:
+                    link_index.add_page(output_path(dest_path, dir_path_public), links)
+
+    generated = [(from_path, dest_path) for from_path, dest_path in pages if from_path in metadata]
+    if args.sitemap:
+        print("Writing sitemap...")
+        with phase(profiler, "sitemap"):
+            entries = [
+                (page_url(dest_path, dir_path_public), parse_date(metadata[from_path].fields.get("date")))
+                for from_path, dest_path in generated
+            ]
+            entries.extend((page_url(dest_path, dir_path_public), None) for dest_path in listings)
+            written.extend(write_sitemap(dir_path_public, entries, args.site_url, args.basepath))
+
+    if index is not None:
+        print("Writing search index...")
+        with phase(profiler, "search"):
+            written.extend(index.write(dir_path_search))
+
+    if link_index is not None:
+        for dest_path in written:
+            link_index.add_file(output_path(dest_path, dir_path_public))
+    return listings + written
+
+
+def record_indexes(written):
+    """
+    Records the files build_indexes wrote in the manifest, and removes those a previous build wrote that weren't
+    written again, such as the listings of a section no longer asked for.
+    """
+    manifest = load_manifest(manifest_path)
+    previous = manifest.get("indexes", [])
+    current = sorted(output_path(dest_path, dir_path_public) for dest_path in written)
+    if not previous and not current:
+        return
+    kept = set(current)
+    for path in previous:
+        if path not in kept:
+            print(f" - {path}")
+            remove_output(os.path.join(dir_path_public, path), dir_path_public)
+    manifest["indexes"] = current
+    save_manifest(manifest, manifest_path)
+
+
+def generate_changed_pages(args, profiler=None, ast_cache=None, link_index=None, templates=None):
+    """
+    Regenerates the pages that changed since the last build, then rewrites what is built from every page.
+
+    Returns:
+        tuple: the counts from generate_pages_incremental, the pages from find_pages, and their metadata, or None
+        when nothing needs it.
+    """
+    print("Generating changed pages...")
+    pages = find_pages(dir_path_content, dir_path_public)
+    metadata, index = page_collector(args, pages, link_index)
+    with phase(profiler, "pages"):
+        counts = generate_pages_incremental(
+            dir_path_content,
+            template_path,
+            dir_path_public,
+            args.basepath,
+            manifest_path,
+            args.jobs,
+            profiler,
+            ast_cache,
+            metadata,
+            args.io_threads,
+            args.io_queue,
+            templates,
+            TermStore(terms_cache_path) if args.search else None,
+        )
+    print(f"{counts['generated']} generated, {counts['skipped']} unchanged, {counts['removed']} removed")
+    written = []
+    if metadata is not None:
+        written = build_indexes(args, pages, metadata, templates, profiler, link_index, index)
+    record_indexes(written)
+    return counts, pages, metadata
+
+
+def build_incremental(
+    args, profiler=None, ast_cache=None, link_index=None, templates=None, fingerprints=None
+)-> list[tuple[str, str]]:
+    print("Syncing static files to public directory...")
+    with phase(profiler, "static"):
+        manifest = load_manifest(manifest_path)
+        stats = directory_copy(
+            dir_path_static,
+            dir_path_public,
+            args.link,
+            args.checksum,
+            manifest.get("static", []),
+            args.copy_threads,
+        )
+        manifest["static"] = stats.files
+        # Publishing nothing still removes the fingerprinted files of a previous build
+        published = publish_fingerprints(
+            dir_path_public, fingerprints or Fingerprints(), manifest.get("fingerprints", [])
+        )
+        manifest["fingerprints"] = published
+        save_manifest(manifest, manifest_path)
+    print(stats.summary())
+
+    counts, pages, metadata = generate_changed_pages(args, profiler, ast_cache, link_index, templates)
+    if link_index is not None:
+        link_index.add_static(stats.files + published)
+        link_index.add_pages(pages, metadata, dir_path_public)
+    return counts["errors"]
+
+
+def build_clean(
+    args, profiler=None, ast_cache=None, link_index=None, templates=None, fingerprints=None
+)-> list[tuple[str, str]]:
     print("Deleting public directory...")
-    if os.path.exists(dir_path_public):
-        shutil.rmtree(dir_path_public)
+    with phase(profiler, "delete"):
+        if os.path.exists(dir_path_public):
+            shutil.rmtree(dir_path_public)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
 
     print("Copying static files to public directory...")
-    directory_copy(dir_path_static, dir_path_public)
+    with phase(profiler, "static"):
+        stats = directory_copy(dir_path_static, dir_path_public, args.link, workers=args.copy_threads)
+        published = publish_fingerprints(dir_path_public, fingerprints) if fingerprints is not None else []
+    print(stats.summary())
 
     print("Generating pages...")
-    generate_pages_recursive(dir_path_content, template_path, dir_path_public, basepath)
+    pages = find_pages(dir_path_content, dir_path_public)
+    metadata, index = page_collector(args, pages, link_index)
+    with phase(profiler, "pages"):
+        # Recorded in the manifest, so an incremental build or --watch afterwards starts from this build
+        current = page_entries(pages, args.basepath, templates)
+        generated = GeneratedPages(current, metadata, TermStore(terms_cache_path) if args.search else None)
+        if args.io_threads > 0:
+            errors = generate_pages_pipelined(
+                pages,
+                template_path,
+                args.basepath,
+                args.io_threads,
+                args.io_queue,
+                profiler,
+                ast_cache,
+                generated,
+                templates,
+            )
+        else:
+            errors = generate_pages_parallel(
+                pages,
+                template_path,
+                args.basepath,
+                args.jobs,
+                profiler=profiler,
+                ast_cache=ast_cache,
+                metadata=generated,
+                templates=templates,
+            )
+        record_pages(manifest_path, current, generated)
+    if metadata is not None:
+        record_indexes(build_indexes(args, pages, metadata, templates, profiler, link_index, index))
+    if link_index is not None:
+        link_index.add_static(stats.files + published)
+        link_index.add_pages(pages, metadata, dir_path_public)
+    return errors
+
+
+def refresh_indexes(args):
+    """
+    Returns what --watch calls after rebuilding pages to bring section listings, the sitemap and the search index up
+    to date, or None when the build writes none of them. Only the pages the watcher rendered are hashed and recorded
+    in the manifest; every other page's metadata comes from the manifest.
+    """
+    if not collects_metadata(args):
+        return None
+
+    def refresh(templates, rendered, removed):
+        pages = find_pages(dir_path_content, dir_path_public)
+        term_store = TermStore(terms_cache_path) if args.search else None
+        current = page_entries([page for page in pages if page[0] in rendered], args.basepath, templates)
+        generated = GeneratedPages(current, term_store=term_store)
+        generated.update(rendered)
+        recorded = record_pages(manifest_path, current, generated, removed)["pages"]
+
+        metadata, index = page_collector(args, pages)
+        for from_path, _ in pages:
+            entry = recorded.get(from_path)
+            if entry is not None and "metadata" in entry:
+                metadata[from_path] = entry_metadata(entry, term_store)
+        record_indexes(build_indexes(args, pages, metadata, templates, index=index))
+
+    return refresh
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    profiler = Profiler() if args.profile or args.profile_json else None
+    ast_cache = ASTCache(ast_cache_path, args.ast_cache_size * 1024 * 1024) if args.ast_cache else None
+    memo = BlockMemo(args.block_memo) if args.block_memo > 0 else None
+    set_block_memo(memo)
+    set_search_terms(args.search)
+
+    fingerprints = None
+    if args.fingerprint:
+        print("Fingerprinting static files...")
+        # Before the layouts are compiled, since they are compiled with the fingerprinted URLs
+        with phase(profiler, "fingerprint"):
+            fingerprints = fingerprint_assets(dir_path_static, asset_hash_cache_path, args.copy_threads)
+        print(fingerprints.summary())
+    set_asset_urls(fingerprints.urls() if fingerprints is not None else None)
+
+    link_index = LinkIndex() if args.check_links else None
+    # Every layout is compiled here, once, and shared by every page that uses it
+    with phase(profiler, "templates"):
+        templates = TemplateRegistry(template_path, args.basepath, dir_path_content, dir_path_layouts)
+
+    if args.incremental:
+        errors = build_incremental(args, profiler, ast_cache, link_index, templates, fingerprints)
+    else:
+        errors = build_clean(args, profiler, ast_cache, link_index, templates, fingerprints)
+    if ast_cache is not None:
+        # Once, here, since every worker process has its own copy of the cache
+        with phase(profiler, "ast cache"):
+            ast_cache.trim()
+    if memo is not None:
+        print(memo.summary())
+    ok = report_errors(errors)
+    if link_index is not None:
+        with phase(profiler, "check links"):
+            ok = report_links(link_index) and ok
+
+    if profiler is not None:
+        print(profiler.report(args.profile_top))
+        if args.profile_json:
+            profiler.dump_json(args.profile_json, args.profile_top)
+
+    if args.watch:
+        watch(
+            dir_path_content,
+            dir_path_static,
+            template_path,
+            dir_path_public,
+            args.basepath,
+            port=args.port,
+            dir_path_layouts=dir_path_layouts,
+            interval=args.watch_interval,
+            mode=args.link,
+            on_change=refresh_indexes(args),
+        )
+    elif not ok:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
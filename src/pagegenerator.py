@@ -1,45 +1,286 @@
+import contextlib
+import io
+import mmap
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
-from block_markdown import markdown_to_html_node
+from block_markdown import (
+    MarkdownStream,
+    PageMetadata,
+    get_block_memo,
+    get_search_terms,
+    iter_blocks,
+    iter_buffer_blocks,
+    parse_markdown,
+    set_block_memo,
+    set_search_terms,
+)
+from frontmatter import scan_front_matter
+from htmlnode import ParentNode, escape_text
+from profiler import AST_CACHE, EXTRACT_TITLE, PARSE_STAGES, READ, SERIALIZE, WRITE, Profiler
+from template import TemplateRegistry, get_asset_urls, load_template, set_asset_urls
 
-def generate_page(from_path, template_path, dest_path, basepath):
+OUTPUT_BUFFER_SIZE = 1 << 16
+# Sources at least this large are memory-mapped instead of read through a text buffer
+MMAP_THRESHOLD = 1 << 20
+SOURCE_ENCODING = "utf-8"
+
+def generate_page(from_path, template_path, dest_path, basepath, template=None, profiler=None, ast_cache=None):
+    """
+    Renders one markdown file into the template and writes it to dest_path.
+
+    Args:
+        template (Template): the compiled template for template_path and basepath; loaded here when not given, but
+            builds should compile it once and pass it to every page.
+        profiler (Profiler): records the time spent in each stage of this page, if given.
+        ast_cache (ASTCache): reuses the parsed tree of markdown seen before instead of parsing it again, if given.
+
+    Returns:
+        PageMetadata: the title, heading outline and word count collected while the page was parsed.
+    """
     print(f" * {from_path} {template_path} -> {dest_path}")
-    from_file = open(from_path, "r")
-    markdown_content = from_file.read()
-    from_file.close()
+    if template is None:
+        template = load_template(template_path, basepath)
+    start = None
+    if profiler is not None:
+        profiler.page(from_path)
+        start = time.perf_counter()
+
+    if ast_cache is None:
+        # Without a cache nothing needs the whole document, so it is streamed from the source one block at a time
+        with contextlib.ExitStack() as stack:
+            from_file = stack.enter_context(open(from_path, "rb"))
+            if profiler is not None:
+                start = profiler.lap(READ, start)
+            size = os.fstat(from_file.fileno()).st_size
+            # A front matter title replaces the first "# " line, and only the start of the file is read to find it
+            title = scan_front_matter(from_file).get("title")
+            from_file.seek(0)
+            if size > 0 and size >= MMAP_THRESHOLD:
+                # Large sources are scanned in place and decoded a block at a time
+                buffer = stack.enter_context(mmap.mmap(from_file.fileno(), 0, access=mmap.ACCESS_READ))
+                title = title or extract_title(buffer)
+                blocks = iter_buffer_blocks(buffer, SOURCE_ENCODING)
+            else:
+                lines = io.TextIOWrapper(from_file, encoding=SOURCE_ENCODING)
+                if not title:
+                    title = read_title(lines)
+                    lines.seek(0)
+                blocks = iter_blocks(lines)
+            if profiler is not None:
+                start = profiler.lap(EXTRACT_TITLE, start)
+            # The title slot comes before the content, so it is found with a scan that stops at the first "# " line
+            # and the rest of the metadata is collected while the content streams
+            content = MarkdownStream(blocks, profiler, basepath)
+            write_page(dest_path, template, title, content, profiler, start)
+        return content.metadata
+
+    markdown_content = read_source(from_path)
+    if profiler is not None:
+        profiler.lap(READ, start)
+    node, metadata = parse_page(markdown_content, basepath, profiler, ast_cache)
+    if profiler is not None:
+        start = time.perf_counter()
+    write_page(dest_path, template, metadata.title, node, profiler, start)
+    return metadata
 
-    template_file = open(template_path, "r")
-    template = template_file.read()
-    template_file.close()
+def read_source(from_path)-> str:
+    with open(from_path, "r", encoding=SOURCE_ENCODING) as from_file:
+        return from_file.read()
 
-    node = markdown_to_html_node(markdown_content)
-    html = node.to_html()
+def parse_page(markdown_content: str, basepath: str, profiler=None, ast_cache=None)-> tuple[ParentNode, PageMetadata]:
+    """
+    Parses a whole page, or takes its tree and metadata from ast_cache when given, and checks that it has a title.
+    """
+    if ast_cache is None:
+        parsed = parse_markdown(markdown_content, profiler, basepath)
+    else:
+        if profiler is not None:
+            start = time.perf_counter()
+        parsed = ast_cache.get(markdown_content, basepath)
+        if profiler is not None:
+            profiler.lap(AST_CACHE, start)
+            profiler.count("ast_cache_hits" if parsed is not None else "ast_cache_misses")
+        if parsed is None:
+            parsed = parse_markdown(markdown_content, profiler, basepath)
+            ast_cache.put(markdown_content, *parsed, basepath)
+    if parsed[1].title is None:
+        raise ValueError("no title found")
+    return parsed
 
-    title = extract_title(markdown_content)
-    template = template.replace("{{ Title }}", title)
-    template = template.replace("{{ Content }}", html)
-    template = template.replace('href="/', 'href="' + basepath)
-    template = template.replace('src="/', 'src="' + basepath)
+def write_page(dest_path, template, title, content, profiler=None, start=None):
+    """
+    Serializes the page straight into the buffered output file instead of building it as one string first. The title
+    is escaped here, since the template writes string values as they are.
 
+    Args:
+        content: the page body, an HTMLNode or a MarkdownStream.
+        start (float): when the serialize stage started, if profiling.
+    """
     dest_dir_path = os.path.dirname(dest_path)
     if dest_dir_path != "":
         os.makedirs(dest_dir_path, exist_ok=True)
-    to_file = open(dest_path, "w")
-    to_file.write(template)
+    if title is not None:
+        title = escape_text(title)
+    try:
+        with open(dest_path, "w", buffering=OUTPUT_BUFFER_SIZE) as to_file:
+            if profiler is None:
+                template.write(to_file, Title=title, Content=content)
+            else:
+                parsed = profiler.total(PARSE_STAGES)
+                template.write(to_file, Title=title, Content=content)
+                # A streamed page is parsed while it is written, and that time is already charged to the parse stages
+                now = time.perf_counter()
+                profiler.add(SERIALIZE, now - start - (profiler.total(PARSE_STAGES) - parsed))
+                start = now
+    except Exception:
+        # A block that fails to parse mid-stream must not leave half a page behind
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        raise
+    if profiler is not None:
+        profiler.lap(WRITE, start)
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
-    for filename in os.listdir(dir_path_content):
+def find_pages(dir_path_content, dest_dir_path)-> list[tuple[str, Path]]:
+    """
+    Walks the content directory and returns the (source, destination) pairs of every page, sorted by source path.
+    """
+    pages = []
+    for filename in sorted(os.listdir(dir_path_content)):
         from_path = os.path.join(dir_path_content, filename)
         dest_path = os.path.join(dest_dir_path, filename)
         if os.path.isfile(from_path):
-            dest_path = Path(dest_path).with_suffix(".html")
-            generate_page(from_path, template_path, dest_path, basepath)
+            pages.append((from_path, Path(dest_path).with_suffix(".html")))
         else:
-            generate_pages_recursive(from_path, template_path, dest_path, basepath)
+            pages.extend(find_pages(from_path, dest_path))
+    return pages
 
-def extract_title(md):
-    lines = md.split("\n")
+def generate_pages_recursive(
+    dir_path_content, template_path, dest_dir_path, basepath, profiler=None, ast_cache=None, templates=None
+):
+    """
+    Renders every page under dir_path_content, with the layout templates picks for it when given, and with
+    template_path otherwise.
+    """
+    if templates is None:
+        templates = TemplateRegistry(template_path, basepath)
+    for from_path, dest_path in find_pages(dir_path_content, dest_dir_path):
+        page_template_path = templates.path_for(from_path)
+        template = templates.get(page_template_path)
+        generate_page(from_path, page_template_path, dest_path, basepath, template, profiler, ast_cache)
+
+def generate_page_task(
+    templates, profile, ast_cache, task
+)-> tuple[str, str | None, Profiler | None, PageMetadata | None, tuple[int, int] | None]:
+    """
+    Runs generate_page for one (from_path, template_path, dest_path, basepath) task and returns the source path with
+    an error message, or None on success, so one broken page does not abort the whole build. With profile set, the
+    page's own profiler is returned too, since worker processes can't record into the caller's profiler, and so is
+    the page's metadata on success. With a block memo set, so are the memo hits and misses the page caused.
+    """
+    from_path, template_path, dest_path, basepath = task
+    profiler = Profiler() if profile else None
+    memo = get_block_memo()
+    if memo is not None:
+        hits, misses = memo.hits, memo.misses
+    error = metadata = None
+    try:
+        template = templates.get(template_path)
+        metadata = generate_page(from_path, template_path, dest_path, basepath, template, profiler, ast_cache)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    memo_counts = (memo.hits - hits, memo.misses - misses) if memo is not None else None
+    return from_path, error, profiler, metadata, memo_counts
+
+def collect_results(results, profiler, metadata=None, memo=None)-> list[tuple[str, str]]:
+    """
+    Gathers the results of generate_page_task, in work list order, returning the errors. With memo given, the memo
+    hits and misses of pages rendered in other processes are added to it.
+    """
+    errors = []
+    for from_path, error, page_profiler, page_metadata, memo_counts in results:
+        if memo is not None and memo_counts is not None:
+            memo.hits += memo_counts[0]
+            memo.misses += memo_counts[1]
+        if error is not None:
+            errors.append((from_path, error))
+            continue
+        if profiler is not None:
+            profiler.merge(page_profiler)
+        if metadata is not None:
+            metadata[from_path] = page_metadata
+    return errors
+
+def init_worker(memo, search_terms, asset_urls=None):
+    set_block_memo(memo)
+    set_search_terms(search_terms)
+    set_asset_urls(asset_urls)
+
+def generate_pages_parallel(
+    pages, template_path, basepath, jobs, chunksize=None, profiler=None, ast_cache=None, metadata=None, templates=None
+)-> list[tuple[str, str]]:
+    """
+    Renders a work list of (from_path, dest_path) pairs in a pool of worker processes.
+
+    Args:
+        pages (list): the pages to render, usually from find_pages.
+        jobs (int): number of worker processes; 1 renders in this process.
+        chunksize (int): pages handed to a worker at a time, defaults to a few chunks per worker.
+        profiler (Profiler): receives the stage timings of every page, if given.
+        ast_cache (ASTCache): cache of parsed trees shared by the workers through its directory, if given.
+        metadata (dict): receives the PageMetadata of every page generated, keyed by from_path, if given.
+        templates (TemplateRegistry): picks each page's layout, if given; otherwise every page uses template_path.
+
+    Returns:
+        list: (from_path, error message) for every page that failed, in work list order.
+    """
+    if templates is None:
+        templates = TemplateRegistry(template_path, basepath)
+    tasks = [(from_path, templates.path_for(from_path), dest_path, basepath) for from_path, dest_path in pages]
+    # Templates are compiled once here and shipped to the workers with each chunk
+    render = partial(generate_page_task, templates, profiler is not None, ast_cache)
+    if jobs <= 1 or len(tasks) <= 1:
+        return collect_results(map(render, tasks), profiler, metadata)
+
+    if chunksize is None:
+        chunksize = max(1, len(tasks) // (jobs * 4))
+    # Every worker starts with its own copy of this process's block memo, if one is configured, and its settings
+    memo = get_block_memo()
+    initargs = (memo, get_search_terms(), get_asset_urls())
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=initargs) as executor:
+        return collect_results(executor.map(render, tasks, chunksize=chunksize), profiler, metadata, memo)
+
+def read_title(lines)-> str:
+    """
+    Returns the first "# " heading among lines, stopping as soon as it is found.
+    """
     for line in lines:
         if line.startswith("# "):
-            return line[2:]
-    raise ValueError("no title found")
\ No newline at end of file
+            return line[2:].rstrip("\n")
+    raise ValueError("no title found")
+
+def extract_title(md):
+    """
+    Returns the text of the first "# " line, searching forward and stopping as soon as it is found.
+
+    Args:
+        md: the markdown as a str, or as bytes or an mmap, in which case the title alone is decoded.
+    """
+    text = isinstance(md, str)
+    marker, newline = ("# ", "\n") if text else (b"# ", b"\n")
+    if md[:2] == marker:
+        start = 0
+    else:
+        start = md.find(newline + marker)
+        if start == -1:
+            raise ValueError("no title found")
+        start += 1
+    end = md.find(newline, start)
+    if end == -1:
+        end = len(md)
+    title = md[start + 2:end]
+    if text:
+        return title
+    return title.decode(SOURCE_ENCODING).rstrip("\r")
@@ -0,0 +1,153 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from htmlnode import escape_text
+from pagegenerator import OUTPUT_BUFFER_SIZE, parse_page, read_source
+from profiler import READ, SERIALIZE, WRITE
+from template import TemplateRegistry
+
+def write_output(dest_path, html: str):
+    dest_dir_path = os.path.dirname(dest_path)
+    if dest_dir_path != "":
+        os.makedirs(dest_dir_path, exist_ok=True)
+    try:
+        with open(dest_path, "w", buffering=OUTPUT_BUFFER_SIZE) as to_file:
+            to_file.write(html)
+    except Exception:
+        # Like write_page, never leave half a page behind
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        raise
+
+def read_page(templates, from_path)-> tuple[str, str]:
+    """
+    Looks up a page's layout, which may read its front matter, and reads its source, both on a reader thread.
+    """
+    return templates.path_for(from_path), read_source(from_path)
+
+class PageWriter:
+    """
+    Writes rendered pages on background threads, taking them from a bounded queue so that rendering blocks, instead
+    of piling pages up in memory, when storage falls behind.
+
+    Args:
+        threads (int): number of writer threads.
+        max_pending (int): rendered pages that may wait to be written.
+    """
+    def __init__(self, threads, max_pending):
+        self.queue = queue.Queue(max_pending)
+        self.errors = []
+        self.threads = [threading.Thread(target=self.run, daemon=True) for _ in range(threads)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, from_path, dest_path, html: str):
+        self.queue.put((from_path, dest_path, html))
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            from_path, dest_path, html = item
+            try:
+                write_output(dest_path, html)
+            except Exception as e:
+                self.errors.append((from_path, f"{type(e).__name__}: {e}"))
+
+    def close(self):
+        """
+        Waits for every queued page to be written and stops the threads.
+        """
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+
+def generate_pages_pipelined(
+    pages,
+    template_path,
+    basepath,
+    io_threads=4,
+    max_pending=16,
+    profiler=None,
+    ast_cache=None,
+    metadata=None,
+    templates=None,
+)-> list[tuple[str, str]]:
+    """
+    Renders a work list of (from_path, dest_path) pairs in this process while background threads read the next
+    sources, looking up their layouts as they go, and write the finished pages, so the CPU isn't idle during I/O on
+    slow or network storage. Pages are rendered in work list order, the order find_pages and generate_pages_recursive
+    walk the content.
+
+    At most max_pending sources are read ahead and at most max_pending rendered pages wait for a writer, which
+    bounds memory whatever the size of the site.
+
+    Args:
+        io_threads (int): threads reading sources, and as many writing pages.
+        profiler (Profiler): receives the stage timings of every page, if given. Read and write are the time
+            rendering waited on them, not the time the I/O took.
+        metadata (dict): receives the PageMetadata of every page written, keyed by from_path, if given. Pages are
+            stored as they are rendered and popped again if writing them fails.
+        templates (TemplateRegistry): picks each page's layout, if given; otherwise every page uses template_path.
+
+    Returns:
+        list: (from_path, error message) for every page that failed, in work list order.
+    """
+    if templates is None:
+        templates = TemplateRegistry(template_path, basepath)
+    errors = []
+    writer = PageWriter(io_threads, max_pending)
+    try:
+        with ThreadPoolExecutor(io_threads) as readers:
+            remaining = iter(pages)
+            reads = deque()
+            for from_path, dest_path in remaining:
+                reads.append((from_path, dest_path, readers.submit(read_page, templates, from_path)))
+                if len(reads) >= max_pending:
+                    break
+
+            while reads:
+                from_path, dest_path, source = reads.popleft()
+                if profiler is not None:
+                    profiler.page(from_path)
+                    start = time.perf_counter()
+                try:
+                    page_template_path, markdown_content = source.result()
+                    print(f" * {from_path} {page_template_path} -> {dest_path}")
+                    if profiler is not None:
+                        profiler.lap(READ, start)
+                    node, page_metadata = parse_page(markdown_content, basepath, profiler, ast_cache)
+                    if profiler is not None:
+                        start = time.perf_counter()
+                    title = escape_text(page_metadata.title)
+                    html = templates.get(page_template_path).render(Title=title, Content=node)
+                    if profiler is not None:
+                        start = profiler.lap(SERIALIZE, start)
+                    writer.submit(from_path, dest_path, html)
+                    if profiler is not None:
+                        profiler.lap(WRITE, start)
+                except Exception as e:
+                    errors.append((from_path, f"{type(e).__name__}: {e}"))
+                else:
+                    if metadata is not None:
+                        metadata[from_path] = page_metadata
+                # Start the next read only once this page is handed over, so at most max_pending sources are held
+                page = next(remaining, None)
+                if page is not None:
+                    reads.append((*page, readers.submit(read_page, templates, page[0])))
+    finally:
+        writer.close()
+
+    errors.extend(writer.errors)
+    if metadata is not None:
+        for from_path, _ in writer.errors:
+            metadata.pop(from_path, None)
+    order = {from_path: i for i, (from_path, _) in enumerate(pages)}
+    errors.sort(key=lambda error: order[error[0]])
+    return errors
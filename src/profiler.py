@@ -0,0 +1,147 @@
+import contextlib
+import json
+import time
+
+# Stages timed inside generate_page, in pipeline order
+READ = "read"
+MARKDOWN_TO_BLOCKS = "markdown_to_blocks"
+BLOCK_TO_BLOCK_TYPE = "block_to_block_type"
+TEXT_TO_TEXTNODES = "text_to_textnodes"
+EXTRACT_TITLE = "extract_title"
+AST_CACHE = "ast_cache"
+# Since pages are streamed, to_html and template substitution happen in one pass into the output buffer
+SERIALIZE = "to_html+template"
+WRITE = "write"
+PAGE_STAGES = (
+    READ,
+    AST_CACHE,
+    MARKDOWN_TO_BLOCKS,
+    BLOCK_TO_BLOCK_TYPE,
+    TEXT_TO_TEXTNODES,
+    EXTRACT_TITLE,
+    SERIALIZE,
+    WRITE,
+)
+# Stages that run inside serialization when a page is streamed block by block
+PARSE_STAGES = (MARKDOWN_TO_BLOCKS, BLOCK_TO_BLOCK_TYPE, TEXT_TO_TEXTNODES)
+
+class Profiler:
+    """
+    Collects wall-clock timings for build phases and for the stages of every page.
+
+    Code paths take an optional profiler and skip all timing when it is None, so a build without profiling pays one
+    None check per call site.
+    """
+    def __init__(self):
+        self.phases = {}
+        self.pages = {}
+        self.counters = {}
+        self.current = None
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def page(self, path: str):
+        """
+        Starts recording stages for a page; later add and lap calls are charged to it.
+        """
+        self.current = self.pages.setdefault(str(path), {})
+
+    def add(self, stage: str, seconds: float):
+        self.current[stage] = self.current.get(stage, 0.0) + seconds
+
+    def lap(self, stage: str, since: float)-> float:
+        """
+        Charges the time since `since` to stage and returns the current time, to chain consecutive stages.
+        """
+        now = time.perf_counter()
+        self.add(stage, now - since)
+        return now
+
+    def total(self, stages)-> float:
+        """
+        Returns the time charged so far to the given stages of the current page.
+        """
+        return sum(self.current.get(stage, 0.0) for stage in stages)
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def merge_page(self, path: str, stages: dict):
+        page = self.pages.setdefault(str(path), {})
+        for stage, seconds in stages.items():
+            page[stage] = page.get(stage, 0.0) + seconds
+
+    def merge(self, other: "Profiler"):
+        """
+        Folds in the timings and counters another profiler recorded, such as one from a worker process.
+        """
+        for name, seconds in other.phases.items():
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+        for path, stages in other.pages.items():
+            self.merge_page(path, stages)
+        for name, amount in other.counters.items():
+            self.count(name, amount)
+
+    def stage_totals(self)-> dict[str, float]:
+        totals = {}
+        for stages in self.pages.values():
+            for stage, seconds in stages.items():
+                totals[stage] = totals.get(stage, 0.0) + seconds
+        return totals
+
+    def slowest(self, count: int)-> list[tuple[str, float]]:
+        totals = [(path, sum(stages.values())) for path, stages in self.pages.items()]
+        totals.sort(key=lambda page: page[1], reverse=True)
+        return totals[:count]
+
+    def to_dict(self, top: int = 10)-> dict:
+        return {
+            "phases": self.phases,
+            "stages": self.stage_totals(),
+            "page_count": len(self.pages),
+            "counters": self.counters,
+            "slowest": [{"path": path, "seconds": seconds} for path, seconds in self.slowest(top)],
+            "pages": self.pages,
+        }
+
+    def dump_json(self, path: str, top: int = 10):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(top), f, indent=1, sort_keys=True)
+
+    def report(self, top: int = 10)-> str:
+        lines = ["Build phases:"]
+        for name, seconds in self.phases.items():
+            lines.append(f"  {name:<24}{seconds * 1000:>10.1f} ms")
+
+        totals = self.stage_totals()
+        total = sum(totals.values())
+        lines.append(f"Page stages ({len(self.pages)} pages):")
+        for stage in PAGE_STAGES + tuple(sorted(set(totals) - set(PAGE_STAGES))):
+            if stage not in totals:
+                continue
+            share = totals[stage] / total * 100 if total else 0.0
+            lines.append(f"  {stage:<24}{totals[stage] * 1000:>10.1f} ms {share:>5.1f}%")
+
+        if self.counters:
+            lines.append("Counters:")
+            for name, amount in sorted(self.counters.items()):
+                lines.append(f"  {name:<24}{amount:>10}")
+
+        lines.append(f"Slowest {top} pages:")
+        for path, seconds in self.slowest(top):
+            lines.append(f"  {seconds * 1000:>10.1f} ms  {path}")
+        return "\n".join(lines)
+
+def phase(profiler: Profiler | None, name: str):
+    """
+    Times a build phase on profiler, or does nothing when profiling is off.
+    """
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.phase(name)
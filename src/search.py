@@ -0,0 +1,236 @@
+import heapq
+import json
+import os
+import tempfile
+
+from copystatic import write_atomic
+
+# A shard is closed once its JSON passes this size, so a query fetches about this much per term
+SHARD_BYTES = 32 * 1024
+# Pages listed per page table file, about 30 KB of [url, title] entries
+PAGES_PER_SHARD = 500
+# Postings held in memory before they are spilled to a sorted run on disk
+MAX_POSTINGS = 1 << 20
+INDEX_NAME = "index.json"
+SHARD_DIR = "shards"
+PAGE_DIR = "pages"
+
+def remove_stale_shards(dir_path, count: int):
+    """
+    Removes the numbered files past the first count that a previous, larger index left in dir_path.
+    """
+    current = {f"{i}.json" for i in range(count)}
+    for name in os.listdir(dir_path):
+        if name not in current:
+            os.remove(os.path.join(dir_path, name))
+
+class SearchIndex:
+    """
+    Inverted index of search terms to the pages that contain them, built as pages are added and written as a
+    manifest plus shards for a client-side search.
+
+    Postings are kept in memory up to max_postings and then spilled to a sorted run on disk; writing merges the runs,
+    so memory stays bounded however large the site. Shards cover contiguous ranges of terms in sorted order and are
+    cut at about shard_bytes each. Pages are numbered in the order they are added, and their [url, title] entries are
+    split into page files of pages_per_shard each. The manifest lists every term shard as [first term, file] and
+    every page file as [first id, file]: a client looks a query term up in the last shard whose first term is not
+    after it, then each matching id in the last page file whose first id is not after it, so a query fetches only
+    the small files it needs however many pages the site has.
+    """
+    def __init__(self, shard_bytes=SHARD_BYTES, max_postings=MAX_POSTINGS, pages_per_shard=PAGES_PER_SHARD):
+        self.shard_bytes = shard_bytes
+        self.pages_per_shard = pages_per_shard
+        self.max_postings = max_postings
+        self.pages = []
+        self.postings = {}
+        self.size = 0
+        self.runs = []
+        self.spill_dir = None
+
+    def add_page(self, url: str, title: str, terms):
+        page_id = len(self.pages)
+        self.pages.append((url, title))
+        for term in terms:
+            postings = self.postings.get(term)
+            if postings is None:
+                self.postings[term] = [page_id]
+            else:
+                postings.append(page_id)
+        self.size += len(terms)
+        if self.size >= self.max_postings:
+            self.spill()
+
+    def spill(self):
+        """
+        Writes the postings in memory to a run file sorted by term, one "term<TAB>id,id,..." line per term.
+        """
+        if not self.postings:
+            return
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.TemporaryDirectory(prefix="search-")
+        path = os.path.join(self.spill_dir.name, f"run{len(self.runs)}")
+        with open(path, "w", encoding="utf-8") as f:
+            for term in sorted(self.postings):
+                f.write(f"{term}\t{','.join(map(str, self.postings[term]))}\n")
+        self.runs.append(path)
+        self.postings = {}
+        self.size = 0
+
+    def iter_run(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                term, ids = line.rstrip("\n").split("\t")
+                yield term, [int(page_id) for page_id in ids.split(",")]
+
+    def iter_postings(self):
+        """
+        Yields (term, page ids) in term order, merging the spilled runs with the postings still in memory. Runs hold
+        pages in the order they were added, so a term's ids come out sorted by concatenating them run by run.
+        """
+        sources = [self.iter_run(path) for path in self.runs]
+        sources.append((term, self.postings[term]) for term in sorted(self.postings))
+        # The source number breaks ties between runs holding the same term, keeping their ids in order
+        numbered = [((term, n, ids) for term, ids in source) for n, source in enumerate(sources)]
+        current = None
+        ids = []
+        for term, _, run_ids in heapq.merge(*numbered):
+            if term != current:
+                if current is not None:
+                    yield current, ids
+                current = term
+                ids = []
+            ids.extend(run_ids)
+        if current is not None:
+            yield current, ids
+
+    def write(self, dir_path)-> list[str]:
+        """
+        Streams the shards into dir_path/shards and the page table into dir_path/pages, then writes the manifest to
+        dir_path/index.json, and removes files left from a previous build. Spilled runs are deleted as they are merged, so an index is written once.
+
+        Returns:
+            list: paths of the files written.
+        """
+        shard_dir = os.path.join(dir_path, SHARD_DIR)
+        os.makedirs(shard_dir, exist_ok=True)
+        shards = []
+        written = []
+        shard = None
+        size = 0
+        try:
+            for term, ids in self.iter_postings():
+                entry = f"{json.dumps(term)}:[{','.join(map(str, ids))}]"
+                if shard is None:
+                    name = f"{len(shards)}.json"
+                    path = os.path.join(shard_dir, name)
+                    shard = open(path, "w", encoding="utf-8")
+                    shards.append([term, f"{SHARD_DIR}/{name}"])
+                    written.append(path)
+                    shard.write("{")
+                    size = 1
+                else:
+                    shard.write(",")
+                    size += 1
+                shard.write(entry)
+                size += len(entry)
+                if size >= self.shard_bytes:
+                    shard.write("}")
+                    shard.close()
+                    shard = None
+            if shard is not None:
+                shard.write("}")
+                shard.close()
+                shard = None
+        finally:
+            if shard is not None:
+                shard.close()
+            if self.spill_dir is not None:
+                self.spill_dir.cleanup()
+                self.spill_dir = None
+                self.runs = []
+
+        remove_stale_shards(shard_dir, len(shards))
+
+        page_dir = os.path.join(dir_path, PAGE_DIR)
+        os.makedirs(page_dir, exist_ok=True)
+        page_shards = []
+        for first in range(0, len(self.pages), self.pages_per_shard):
+            name = f"{len(page_shards)}.json"
+            path = os.path.join(page_dir, name)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(
+                    self.pages[first:first + self.pages_per_shard], f, ensure_ascii=False, separators=(",", ":")
+                )
+            page_shards.append([first, f"{PAGE_DIR}/{name}"])
+            written.append(path)
+        remove_stale_shards(page_dir, len(page_shards))
+
+        index_path = os.path.join(dir_path, INDEX_NAME)
+        with open(index_path, "w", encoding="utf-8") as f:
+            json.dump({"pages": page_shards, "shards": shards}, f, ensure_ascii=False, separators=(",", ":"))
+        written.append(index_path)
+        return written
+
+class SearchCollector(dict):
+    """
+    Collects the PageMetadata of generated pages like the plain dict builds pass as metadata, but hands each page's
+    search terms to the index as soon as the page is stored and drops them from its metadata. Terms are then only
+    ever held by the index, which spills them to disk, however many pages the site has.
+
+    Args:
+        index (SearchIndex): receives every page with terms, in the order pages arrive.
+        urls (dict): the URL each page is served at, basepath included, keyed by from_path.
+    """
+    def __init__(self, index: SearchIndex, urls: dict[str, str]):
+        super().__init__()
+        self.index = index
+        self.urls = urls
+
+    def __setitem__(self, from_path, page_metadata):
+        if page_metadata.terms is not None:
+            self.index.add_page(self.urls[from_path], page_metadata.title, page_metadata.terms)
+            page_metadata.terms = None
+        super().__setitem__(from_path, page_metadata)
+
+    def update(self, *args, **kwargs):
+        for from_path, page_metadata in dict(*args, **kwargs).items():
+            self[from_path] = page_metadata
+
+class TermStore:
+    """
+    The search terms of every page an incremental build generated, one file per page keyed by the hash of its
+    source, so pages skipped by a later build can give their terms to the index without being parsed again or
+    carrying them in the manifest. Terms depend only on the markdown, so an entry never goes stale.
+    """
+    def __init__(self, dir_path):
+        self.dir_path = dir_path
+
+    def path_for(self, key: str)-> str:
+        return os.path.join(self.dir_path, key[:2], key)
+
+    def has(self, key: str)-> bool:
+        return os.path.exists(self.path_for(key))
+
+    def get(self, key: str)-> set[str] | None:
+        try:
+            with open(self.path_for(key), "r", encoding="utf-8") as f:
+                return set(f.read().split("\n")) - {""}
+        except OSError:
+            return None
+
+    def put(self, key: str, terms):
+        write_atomic(self.path_for(key), "\n".join(sorted(terms)))
+
+    def retain(self, keys):
+        """
+        Removes the entries of sources that are no longer part of the site.
+        """
+        keys = set(keys)
+        if not os.path.isdir(self.dir_path):
+            return
+        for shard in os.scandir(self.dir_path):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name not in keys:
+                    os.remove(entry.path)
@@ -0,0 +1,253 @@
+import os
+from datetime import datetime, timezone
+
+from block_markdown import text_to_children
+from copystatic import remove_output
+from htmlnode import LeafNode, ParentNode, escape_attribute, escape_text
+from linkcheck import output_path
+from pagegenerator import OUTPUT_BUFFER_SIZE, write_page
+from template import rewrite_url
+
+PAGE_SIZE = 10
+FEED_SIZE = 20
+FEED_NAME = "atom.xml"
+INDEX_NAME = "index.html"
+
+class SectionEntry:
+    """
+    What a listing or feed shows of one page, taken from the PageMetadata collected while the page was rendered.
+
+    Attributes:
+        url (str): root-relative URL of the page, without the basepath.
+        date (datetime): the page's front matter "date", in UTC, or None if it has none or it isn't an ISO date.
+    """
+    __slots__ = ("title", "url", "date", "summary")
+
+    def __init__(self, title: str, url: str, date: datetime | None = None, summary: str | None = None):
+        self.title = title
+        self.url = url
+        self.date = date
+        self.summary = summary
+
+    def __repr__(self)-> str:
+        return f"SectionEntry({self.title!r}, {self.url!r}, {self.date!r})"
+
+def page_url(dest_path, dir_path_public)-> str:
+    """
+    Returns the root-relative URL a generated file is served at, directory style for index pages.
+    """
+    path = output_path(dest_path, dir_path_public)
+    if path == INDEX_NAME:
+        return "/"
+    if path.endswith("/" + INDEX_NAME):
+        return "/" + path[:-len(INDEX_NAME)]
+    return "/" + path
+
+def parse_date(value: str | None)-> datetime | None:
+    """
+    Parses an ISO 8601 date or date and time from front matter. Times without a zone are taken as UTC.
+    """
+    if not value:
+        return None
+    try:
+        date = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date.astimezone(timezone.utc)
+
+def atom_date(date: datetime)-> str:
+    return date.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def section_entries(section, pages, metadata, dir_path_content, dir_path_public)-> list[SectionEntry]:
+    """
+    Collects the pages under a section's content directory, newest first, then undated pages by path.
+
+    Args:
+        section (str): the section's directory, relative to the content directory.
+        pages (list): (from_path, dest_path) of every page, from find_pages.
+        metadata (dict): PageMetadata of the pages that were generated, keyed by from_path; failed pages are left out.
+    """
+    section_dir = os.path.join(dir_path_content, section, "")
+    own_index = os.path.join(section_dir, "index.md")
+    entries = []
+    for from_path, dest_path in pages:
+        if not from_path.startswith(section_dir) or from_path == own_index:
+            continue
+        page_metadata = metadata.get(from_path)
+        if page_metadata is None:
+            continue
+        entries.append(
+            SectionEntry(
+                page_metadata.title,
+                page_url(dest_path, dir_path_public),
+                parse_date(page_metadata.fields.get("date")),
+                page_metadata.summary,
+            )
+        )
+    # Both sorts are stable, so pages with the same date, and undated pages, stay in path order
+    entries.sort(key=lambda entry: entry.url)
+    entries.sort(key=lambda entry: (entry.date is not None, entry.date or datetime.min), reverse=True)
+    return entries
+
+def summary_nodes(summary: str, basepath: str)-> list:
+    try:
+        return text_to_children(summary, basepath=basepath)
+    except ValueError:
+        # A front matter summary isn't checked when its page renders, so markdown it breaks is shown as written
+        return [LeafNode(None, summary)]
+
+def listing_url(section_url: str, number: int)-> str:
+    if number == 1:
+        return section_url
+    return f"{section_url}page/{number}/"
+
+class ListingStream:
+    """
+    Stands in for the content node of one listing page, writing its entries one at a time so a page never holds
+    more than one entry's nodes. Like MarkdownStream, it is passed to Template.write.
+
+    Args:
+        entries (list): the section's entries, of which this page shows entries[start:stop].
+        previous_url, next_url (str): the neighbouring listing pages, without the basepath, or None.
+    """
+    def __init__(self, entries, start, stop, basepath="/", previous_url=None, next_url=None):
+        self.entries = entries
+        self.start = start
+        self.stop = stop
+        self.basepath = basepath
+        self.previous_url = previous_url
+        self.next_url = next_url
+
+    def entry_node(self, entry: SectionEntry)-> ParentNode:
+        children = [LeafNode("a", entry.title, {"href": rewrite_url(entry.url, self.basepath)})]
+        if entry.date is not None:
+            children.append(LeafNode(None, " "))
+            children.append(LeafNode("time", entry.date.date().isoformat(), {"datetime": atom_date(entry.date)}))
+        if entry.summary:
+            children.append(ParentNode("p", summary_nodes(entry.summary, self.basepath)))
+        return ParentNode("li", children)
+
+    def links(self)-> list[str]:
+        """
+        Returns the targets this page links to, without the basepath, as PageMetadata.links holds them.
+        """
+        links = [entry.url for entry in self.entries[self.start:self.stop]]
+        links.extend(url for url in (self.previous_url, self.next_url) if url is not None)
+        return links
+
+    def write_html(self, fp):
+        fp.write("<div><ul>")
+        for i in range(self.start, self.stop):
+            self.entry_node(self.entries[i]).write_html(fp)
+        fp.write("</ul>")
+        nav = []
+        if self.previous_url is not None:
+            nav.append(LeafNode("a", "Newer", {"href": rewrite_url(self.previous_url, self.basepath), "rel": "prev"}))
+        if self.next_url is not None:
+            nav.append(LeafNode("a", "Older", {"href": rewrite_url(self.next_url, self.basepath), "rel": "next"}))
+        if nav:
+            ParentNode("nav", nav).write_html(fp)
+        fp.write("</div>")
+
+def write_listings(
+    section, entries, template, title, dir_path_public, basepath, page_size=PAGE_SIZE
+)-> list[tuple[str, list[str]]]:
+    """
+    Writes the section's listing pages, page_size entries each: the first at <section>/index.html, the rest at
+    <section>/page/<n>/index.html. Pages left from a longer listing are removed.
+
+    Returns:
+        list: (dest_path, links) of every listing page written.
+    """
+    section_url = f"/{section.strip('/')}/"
+    page_count = max(1, -(-len(entries) // page_size))
+    written = []
+    for number in range(1, page_count + 1):
+        dest_path = os.path.join(dir_path_public, listing_url(section_url, number)[1:], INDEX_NAME)
+        content = ListingStream(
+            entries,
+            (number - 1) * page_size,
+            min(number * page_size, len(entries)),
+            basepath,
+            listing_url(section_url, number - 1) if number > 1 else None,
+            listing_url(section_url, number + 1) if number < page_count else None,
+        )
+        print(f" * {section} listing {number}/{page_count} -> {dest_path}")
+        page_title = title if number == 1 else f"{title}, page {number}"
+        write_page(dest_path, template, page_title, content)
+        written.append((dest_path, content.links()))
+
+    number = page_count + 1
+    while True:
+        stale_path = os.path.join(dir_path_public, listing_url(section_url, number)[1:], INDEX_NAME)
+        if not os.path.exists(stale_path):
+            break
+        print(f" - {stale_path}")
+        remove_output(stale_path, dir_path_public)
+        number += 1
+    return written
+
+def write_feed(dest_path, section, entries, title, site_url, basepath, feed_size=FEED_SIZE):
+    """
+    Streams an Atom feed of the section's newest feed_size dated entries into dest_path. Atom needs absolute URLs,
+    so every link and id is site_url joined with the basepath.
+    """
+    base = site_url.rstrip("/")
+    section_url = base + rewrite_url(f"/{section.strip('/')}/", basepath)
+    dated = [entry for entry in entries[:feed_size] if entry.date is not None]
+
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    with open(dest_path, "w", buffering=OUTPUT_BUFFER_SIZE) as fp:
+        fp.write('<?xml version="1.0" encoding="utf-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom">\n')
+        fp.write(f"<title>{escape_text(title)}</title>\n")
+        fp.write(f"<id>{escape_text(section_url)}</id>\n")
+        fp.write(f'<link href="{escape_attribute(section_url)}"/>\n')
+        fp.write(f'<link rel="self" href="{escape_attribute(section_url + FEED_NAME)}"/>\n')
+        if dated:
+            fp.write(f"<updated>{atom_date(dated[0].date)}</updated>\n")
+        for entry in dated:
+            url = base + rewrite_url(entry.url, basepath)
+            fp.write("<entry>")
+            fp.write(f"<title>{escape_text(entry.title)}</title>")
+            fp.write(f'<link href="{escape_attribute(url)}"/>')
+            fp.write(f"<id>{escape_text(url)}</id>")
+            fp.write(f"<updated>{atom_date(entry.date)}</updated>")
+            if entry.summary:
+                summary = "".join(node.to_html() for node in summary_nodes(entry.summary, basepath))
+                fp.write(f'<summary type="html">{escape_text(summary)}</summary>')
+            fp.write("</entry>\n")
+        fp.write("</feed>\n")
+
+def generate_sections(
+    sections, pages, metadata, templates, dir_path_content, dir_path_public, basepath, page_size=PAGE_SIZE,
+    site_url=None,
+)-> list[tuple[str, list[str] | None]]:
+    """
+    Writes listing pages, and an Atom feed when site_url is given, for each section from the metadata collected while
+    its pages were generated, so no source is read again.
+
+    Args:
+        sections (list): section directories, relative to the content directory, such as "blog".
+        pages (list): (from_path, dest_path) of every page, from find_pages.
+        metadata (dict): PageMetadata of the pages that were generated, keyed by from_path.
+        templates (TemplateRegistry): picks each listing's layout as it would for a page in the section's directory.
+
+    Returns:
+        list: (dest_path, links) of every file written; links is None for feeds.
+    """
+    written = []
+    for section in sections:
+        if os.path.exists(os.path.join(dir_path_content, section, "index.md")):
+            raise ValueError(f"section {section} has its own index.md, which its listing would replace")
+        entries = section_entries(section, pages, metadata, dir_path_content, dir_path_public)
+        template = templates.get(templates.path_for(os.path.join(dir_path_content, section, "index.md")))
+        title = os.path.basename(section.strip("/")).capitalize()
+        written.extend(write_listings(section, entries, template, title, dir_path_public, basepath, page_size))
+        if site_url:
+            feed_path = os.path.join(dir_path_public, section.strip("/"), FEED_NAME)
+            print(f" * {section} feed -> {feed_path}")
+            write_feed(feed_path, section, entries, title, site_url, basepath)
+            written.append((feed_path, None))
+    return written
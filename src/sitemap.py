@@ -0,0 +1,61 @@
+import os
+
+from htmlnode import escape_text
+from pagegenerator import OUTPUT_BUFFER_SIZE
+from sections import atom_date
+from template import rewrite_url
+
+SITEMAP_NAME = "sitemap.xml"
+# The most URLs one sitemap file may list; larger sites get a sitemap index pointing at several files
+SITEMAP_LIMIT = 50_000
+_URLSET = '<?xml version="1.0" encoding="utf-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+
+def write_urlset(dest_path, entries, site_url, basepath):
+    """
+    Streams a sitemap of (url, date) entries, with urls root-relative and without the basepath, into dest_path.
+    """
+    base = site_url.rstrip("/")
+    with open(dest_path, "w", buffering=OUTPUT_BUFFER_SIZE, encoding="utf-8") as fp:
+        fp.write(_URLSET)
+        for url, date in entries:
+            fp.write(f"<url><loc>{escape_text(base + rewrite_url(url, basepath))}</loc>")
+            if date is not None:
+                fp.write(f"<lastmod>{atom_date(date)}</lastmod>")
+            fp.write("</url>\n")
+        fp.write("</urlset>\n")
+
+def write_sitemap(dir_path_public, entries, site_url, basepath, limit=SITEMAP_LIMIT)-> list[str]:
+    """
+    Writes sitemap.xml for the (url, date) entries, dates being a page's front matter date or None. Past limit
+    entries, sitemap.xml becomes an index of sitemap-<n>.xml files of limit entries each. Numbered files left from
+    a larger site are removed.
+
+    Returns:
+        list: paths of the files written.
+    """
+    base = site_url.rstrip("/")
+    index_path = os.path.join(dir_path_public, SITEMAP_NAME)
+    os.makedirs(dir_path_public, exist_ok=True)
+    written = []
+    if len(entries) <= limit:
+        write_urlset(index_path, entries, site_url, basepath)
+        part_count = 0
+    else:
+        part_count = -(-len(entries) // limit)
+        with open(index_path, "w", encoding="utf-8") as fp:
+            fp.write('<?xml version="1.0" encoding="utf-8"?>\n')
+            fp.write('<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+            for number in range(1, part_count + 1):
+                name = f"sitemap-{number}.xml"
+                part_path = os.path.join(dir_path_public, name)
+                write_urlset(part_path, entries[(number - 1) * limit:number * limit], site_url, basepath)
+                written.append(part_path)
+                fp.write(f"<sitemap><loc>{escape_text(base + rewrite_url('/' + name, basepath))}</loc></sitemap>\n")
+            fp.write("</sitemapindex>\n")
+    written.append(index_path)
+
+    number = part_count + 1
+    while os.path.exists(os.path.join(dir_path_public, f"sitemap-{number}.xml")):
+        os.remove(os.path.join(dir_path_public, f"sitemap-{number}.xml"))
+        number += 1
+    return written
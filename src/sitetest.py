@@ -0,0 +1,31 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+class SiteTestCase(unittest.TestCase):
+    """
+    Base for tests that build into a temporary directory, self.root, which is removed after each test.
+    """
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path, "r") as f:
+            return f.read()
+
+    def quietly(self):
+        """
+        Captures what a build prints; `with self.quietly() as out` gives the output as out.getvalue().
+        """
+        return contextlib.redirect_stdout(io.StringIO())
@@ -0,0 +1,201 @@
+import hashlib
+import io
+import json
+import os
+import posixpath
+import re
+
+from frontmatter import read_front_matter
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{ (\w+) \}\}")
+URL_ATTRIBUTE_PATTERN = re.compile(r'\b(href|src)="([^"]*)"')
+# Front matter field naming the layout a page is rendered with
+LAYOUT_FIELD = "template"
+
+def rewrite_basepath(html: str, basepath: str)-> str:
+    """
+    Points root-relative href and src attributes at the basepath the site is served from. Only used on template text,
+    once when it is compiled; page content gets the basepath on its link and image nodes instead.
+    """
+    if basepath == "/":
+        return html
+    html = html.replace('href="/', 'href="' + basepath)
+    return html.replace('src="/', 'src="' + basepath)
+
+# Per process, like the block memo: root-relative URLs of static files mapped to their fingerprinted URLs. Set once
+# before anything is rendered, since memoized blocks and compiled templates keep the URLs they were made with
+_asset_urls = {}
+_asset_digest = ""
+
+def set_asset_urls(urls: dict[str, str] | None):
+    global _asset_urls, _asset_digest
+    _asset_urls = dict(urls) if urls else {}
+    _asset_digest = (
+        hashlib.sha256(json.dumps(_asset_urls, sort_keys=True).encode()).hexdigest() if _asset_urls else ""
+    )
+
+def get_asset_urls()-> dict[str, str]:
+    return _asset_urls
+
+def get_asset_digest()-> str:
+    """
+    Returns a hash of the asset URL table, empty when assets aren't fingerprinted, for keys of cached renderings.
+    """
+    return _asset_digest
+
+def asset_url(url: str)-> str:
+    """
+    Returns the fingerprinted URL of a static file, or url itself if it names none.
+    """
+    return _asset_urls.get(url, url)
+
+def rewrite_assets(html: str, assets=None)-> str:
+    """
+    Points href and src attributes that name a static file at its fingerprinted URL. Only used on template text;
+    page content gets the fingerprinted URLs on its link and image nodes instead.
+
+    Args:
+        assets (dict): receives every URL rewritten, mapped to its fingerprinted URL, if given.
+    """
+    if not _asset_urls:
+        return html
+
+    def replace(match):
+        url = match.group(2)
+        fingerprinted = _asset_urls.get(url)
+        if fingerprinted is None:
+            return match.group(0)
+        if assets is not None:
+            assets[url] = fingerprinted
+        return f'{match.group(1)}="{fingerprinted}"'
+
+    return URL_ATTRIBUTE_PATTERN.sub(replace, html)
+
+def rewrite_url(url: str, basepath: str)-> str:
+    """
+    Points a root-relative URL at the basepath. Protocol-relative URLs ("//host/...") are left alone.
+    """
+    if basepath == "/" or not url.startswith("/") or url.startswith("//"):
+        return url
+    return basepath + url[1:]
+
+class Template:
+    """
+    A page layout compiled once per build.
+
+    The template text is split into static segments and the names of the {{ Placeholder }} slots between them, with
+    the basepath and fingerprinted asset URLs already applied to the static segments, so rendering a page only writes
+    the pieces out in order. Values are written as given: content nodes carry the basepath from parsing, so pages are
+    never rescanned.
+
+    Attributes:
+        assets (dict): the static file URLs the template references, mapped to the fingerprinted URLs written instead.
+    """
+    def __init__(self, text: str, basepath: str = "/", path: str = None):
+        self.path = path
+        self.basepath = basepath
+        self.segments = []
+        self.slots = []
+        self.assets = {}
+
+        text = rewrite_assets(text, self.assets)
+        text = rewrite_basepath(text, basepath)
+        start = 0
+        for match in PLACEHOLDER_PATTERN.finditer(text):
+            self.segments.append(text[start:match.start()])
+            self.slots.append(match.group(1))
+            start = match.end()
+        self.segments.append(text[start:])
+
+    def render(self, **values)-> str:
+        """
+        Fills every slot with its value. Unknown slots are left as written.
+        """
+        buffer = io.StringIO()
+        self.write(buffer, **values)
+        return buffer.getvalue()
+
+    def write(self, fp, **values):
+        """
+        Streams the filled template to a file-like object. Values may be strings, written as they are, so text such as
+        a title must be escaped by the caller, or HTMLNodes, serialized straight into fp rather than rendered to a string
+        first.
+        """
+        fp.write(self.segments[0])
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            value = values.get(slot)
+            if value is None:
+                fp.write(f"{{{{ {slot} }}}}")
+            elif isinstance(value, str):
+                fp.write(value)
+            else:
+                value.write_html(fp)
+            fp.write(segment)
+
+    def __repr__(self)-> str:
+        return f"Template(path='{self.path}', basepath='{self.basepath}', slots={self.slots})"
+
+def load_template(template_path, basepath)-> Template:
+    with open(template_path, "r") as f:
+        return Template(f.read(), basepath, template_path)
+
+class TemplateRegistry:
+    """
+    Every layout of the site, compiled once per build and shared by all its pages.
+
+    Layouts are the .html files under layouts_dir, named by their path there without the extension. A page uses the
+    layout its front matter names as "template", or else the layout named after the nearest directory holding it,
+    relative to the content directory, so content/blog/tom/index.md tries blog/tom then blog, and falls back to the
+    default template.
+    """
+    def __init__(self, default_path, basepath="/", dir_path_content=None, layouts_dir=None):
+        self.default_path = default_path
+        self.basepath = basepath
+        self.dir_path_content = dir_path_content
+        self.layouts_dir = layouts_dir
+        self.layouts = {}
+        self.templates = {}
+        if layouts_dir is not None and os.path.isdir(layouts_dir):
+            for root, _, filenames in os.walk(layouts_dir):
+                for filename in filenames:
+                    if filename.endswith(".html"):
+                        path = os.path.join(root, filename)
+                        name = os.path.relpath(path, layouts_dir)[:-len(".html")].replace(os.sep, "/")
+                        self.layouts[name] = path
+        for path in (default_path, *self.layouts.values()):
+            self.get(path)
+
+    def get(self, template_path)-> Template:
+        template = self.templates.get(template_path)
+        if template is None:
+            template = load_template(template_path, self.basepath)
+            self.templates[template_path] = template
+        return template
+
+    def path_for(self, from_path)-> str:
+        """
+        Returns the path of the template the page at from_path is rendered with. Only the page's front matter is
+        read, and only when the site has layouts: without any, every page uses the default template, whatever its
+        front matter names.
+        """
+        if not self.layouts:
+            return self.default_path
+        try:
+            name = read_front_matter(from_path).get(LAYOUT_FIELD)
+        except OSError:
+            # The page itself reports the error when it is rendered
+            name = None
+        if name:
+            # A layout that doesn't exist fails the page when its template is loaded
+            return self.layouts.get(name, os.path.join(self.layouts_dir, f"{name}.html"))
+        if self.dir_path_content is not None:
+            directory = os.path.relpath(os.path.dirname(from_path), self.dir_path_content).replace(os.sep, "/")
+            while directory not in ("", "."):
+                layout = self.layouts.get(directory)
+                if layout is not None:
+                    return layout
+                directory = posixpath.dirname(directory)
+        return self.default_path
+
+    def __repr__(self)-> str:
+        return f"TemplateRegistry(default='{self.default_path}', layouts={sorted(self.layouts)})"
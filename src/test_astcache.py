@@ -0,0 +1,100 @@
+import os
+import unittest
+
+from astcache import ASTCache, node_from_data, node_to_data
+from block_markdown import PageMetadata, markdown_to_html_node, parse_markdown, set_search_terms
+from htmlnode import LeafNode, ParentNode, RawNode
+from pagegenerator import generate_page
+from profiler import Profiler
+from sitetest import SiteTestCase
+
+MARKDOWN = "# Title\n\nSome **bold** [link](/x) ![img](/i.png)\n\n- a\n- b\n\n```\ncode\n```"
+
+class TestASTCache(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = os.path.join(self.root, "ast")
+
+    def test_round_trip(self):
+        node = markdown_to_html_node(MARKDOWN)
+        restored = node_from_data(node_to_data(node))
+        self.assertEqual(restored.to_html(), node.to_html())
+        self.assertIsInstance(restored, ParentNode)
+        self.assertEqual(
+            [type(child) for child in restored.children[1].children],
+            [type(child) for child in node.children[1].children],
+        )
+
+    def test_round_trip_raw(self):
+        node = ParentNode("div", [RawNode("<p>memo</p>")])
+        self.assertEqual(node_from_data(node_to_data(node)).to_html(), "<div><p>memo</p></div>")
+
+    def test_unsupported_node(self):
+        with self.assertRaises(ValueError):
+            node_to_data(object())
+
+    def test_miss_then_hit(self):
+        cache = ASTCache(self.cache_dir)
+        self.assertIsNone(cache.get(MARKDOWN))
+        cache.put(MARKDOWN, *parse_markdown(MARKDOWN))
+        node, metadata = ASTCache(self.cache_dir).get(MARKDOWN)
+        self.assertEqual(node.to_html(), markdown_to_html_node(MARKDOWN).to_html())
+        self.assertEqual(metadata, parse_markdown(MARKDOWN)[1])
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+    def test_key_depends_on_content(self):
+        cache = ASTCache(self.cache_dir)
+        self.assertNotEqual(cache.key("a"), cache.key("b"))
+        self.assertNotEqual(cache.key("a"), cache.key("a", "/site/"))
+        self.assertEqual(cache.key("a"), cache.key("a"))
+        without_terms = cache.key("a")
+        set_search_terms(True)
+        try:
+            self.assertNotEqual(cache.key("a"), without_terms)
+        finally:
+            set_search_terms(False)
+
+    def test_corrupt_entry_is_a_miss(self):
+        cache = ASTCache(self.cache_dir)
+        cache.put(MARKDOWN, *parse_markdown(MARKDOWN))
+        with open(cache.path_for(cache.key(MARKDOWN)), "wb") as f:
+            f.write(b"junk")
+        self.assertIsNone(cache.get(MARKDOWN))
+
+    def test_lru_eviction(self):
+        node = ParentNode("div", [LeafNode("p", "x" * 1000)])
+        cache = ASTCache(self.cache_dir, max_bytes=5000)
+        for i in range(4):
+            cache.put(f"page {i}", node, PageMetadata())
+            os.utime(cache.path_for(cache.key(f"page {i}")), ns=(i * 10**9, i * 10**9))
+        # Touching page 0 makes it the most recently used
+        self.assertIsNotNone(cache.get("page 0"))
+        cache.put("page 4", node, PageMetadata())
+        cache.put("page 5", node, PageMetadata())
+        # Nothing is evicted until the build trims the cache
+        self.assertGreater(cache.disk_size(), 5000)
+        self.assertEqual(cache.trim(), cache.disk_size())
+        self.assertLessEqual(cache.disk_size(), 5000)
+        self.assertIsNotNone(cache.get("page 0"))
+        self.assertIsNone(cache.get("page 1"))
+        self.assertIsNotNone(cache.get("page 5"))
+
+    def test_generate_page_uses_cache(self):
+        source = os.path.join(self.root, "index.md")
+        template = os.path.join(self.root, "template.html")
+        self.write(source, MARKDOWN)
+        self.write(template, "{{ Title }}{{ Content }}")
+        outputs = []
+        profiler = Profiler()
+        cache = ASTCache(self.cache_dir)
+        # Trees carry their basepath, so each basepath has its own entry
+        for i, basepath in enumerate(["/", "/site/", "/site/"]):
+            dest = os.path.join(self.root, f"out{i}.html")
+            with self.quietly():
+                generate_page(source, template, dest, basepath, profiler=profiler, ast_cache=cache)
+                generate_page(source, template, dest + ".plain", basepath)
+            self.assertEqual(self.read(dest), self.read(dest + ".plain"))
+        self.assertEqual(profiler.counters, {"ast_cache_misses": 2, "ast_cache_hits": 1})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+
+import block_markdown
+from benchmark import (
+    always_escape,
+    basepath_rewriting,
+    compare,
+    escape_check,
+    escaping_overhead,
+    never_escape,
+    run_suite,
+)
+from corpus import CorpusSpec
+
+def results(mb_per_sec, peak_bytes, node_bytes=64.0):
+    return {
+        "stages": {"to_html": {"mb_per_sec": mb_per_sec, "peak_bytes": peak_bytes}},
+        "node_memory": {"LeafNode": node_bytes},
+    }
+
+class TestBenchmark(unittest.TestCase):
+    def test_compare_no_regression(self):
+        self.assertEqual(compare(results(10.0, 1000), results(9.5, 1050), 0.1), [])
+
+    def test_compare_slower(self):
+        regressions = compare(results(10.0, 1000), results(8.0, 1000), 0.1)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("to_html", regressions[0])
+
+    def test_compare_memory(self):
+        self.assertEqual(len(compare(results(10.0, 1000), results(10.0, 2000), 0.1)), 1)
+        self.assertEqual(len(compare(results(10.0, 1000), results(10.0, 1000, 128.0), 0.1)), 1)
+
+    def test_compare_ignores_new_stages(self):
+        current = results(10.0, 1000)
+        current["stages"]["new_stage"] = {"mb_per_sec": 1.0, "peak_bytes": 1}
+        self.assertEqual(compare(results(10.0, 1000), current), [])
+
+    def test_run_suite(self):
+        suite = run_suite(CorpusSpec(pages=3, page_size=1000), repeat=1)
+        self.assertEqual(
+            set(suite["stages"]),
+            {"text_to_textnodes", "markdown_to_html_node", "to_html", "generate_pages_recursive"},
+        )
+        for stage in suite["stages"].values():
+            self.assertGreater(stage["pages_per_sec"], 0)
+            self.assertGreater(stage["mb_per_sec"], 0)
+        self.assertEqual(suite["spec"]["pages"], 3)
+        self.assertEqual(set(suite["escaping"]), {"corpus", "markup"})
+
+    def test_escape_check(self):
+        markdown = "# Title\n\nSome [link](/a?b&c) & text\n\nplain"
+        escaped = block_markdown.markdown_to_html_node(markdown).to_html()
+        with escape_check(always_escape):
+            self.assertEqual(block_markdown.markdown_to_html_node(markdown).to_html(), escaped)
+        with escape_check(never_escape):
+            self.assertIn('<a href="/a?b&c">link</a> & text', block_markdown.markdown_to_html_node(markdown).to_html())
+        self.assertEqual(block_markdown.markdown_to_html_node(markdown).to_html(), escaped)
+
+    def test_escaping_overhead(self):
+        overhead = escaping_overhead(["# Title\n\nSome [link](/a?b&c) & text"], repeat=1)
+        self.assertEqual(
+            set(overhead),
+            {"checked_seconds", "unchecked_seconds", "unescaped_seconds", "overhead", "unchecked_overhead"},
+        )
+        self.assertGreater(overhead["checked_seconds"], 0)
+
+    def test_basepath_rewriting(self):
+        timings = basepath_rewriting(CorpusSpec(pages=2, page_size=500), repeat=1)
+        self.assertEqual(set(timings), {"string_replace_seconds", "node_level_seconds"})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,22 @@
+import io
 import unittest
-from block_markdown import BlockType, markdown_to_blocks, block_to_block_type, markdown_to_html_node
+from block_markdown import (
+    BlockMemo,
+    BlockType,
+    MarkdownStream,
+    PageMetadata,
+    block_to_block_type,
+    block_to_html_node,
+    iter_blocks,
+    iter_buffer_blocks,
+    markdown_to_blocks,
+    markdown_to_html_node,
+    parse_markdown,
+    set_block_memo,
+    set_search_terms,
+)
+from htmlnode import LeafNode, PlainLeafNode, RawNode
+from profiler import Profiler
 
 class TestBlockMarkdown(unittest.TestCase):
     # Test cases for markdown_to_blocks function
@@ -83,6 +100,49 @@ This is the same paragraph on a new line
             ],
         )
     
+    def test_markdown_to_blocks_skips_whitespace_blocks(self):
+        self.assertEqual(markdown_to_blocks("first\n\n   \n\n\n\nsecond"), ["first", "second"])
+
+    def test_markdown_to_blocks_fenced_code_with_blank_lines(self):
+        md = "Intro\n\n```\nline one\n\nline three\n```\n\nOutro"
+        self.assertEqual(markdown_to_blocks(md), ["Intro", "```\nline one\n\nline three\n```", "Outro"])
+
+    def test_markdown_to_blocks_inline_fence_does_not_open_block(self):
+        md = "```code``` text\n\nnext"
+        self.assertEqual(markdown_to_blocks(md), ["```code``` text", "next"])
+
+    def test_iter_blocks_is_lazy(self):
+        lines = iter(["# Title\n", "\n", "text\n"])
+        blocks = iter_blocks(lines)
+        self.assertEqual(next(blocks), "# Title")
+        self.assertEqual(next(lines), "text\n")
+
+    def test_iter_buffer_blocks_matches_text(self):
+        cases = [
+            "# Title\n\nSome text\nmore\n\n\n- a\n- b\n",
+            "Intro\n\n```\nline one\n\nline three\n```\nafter\n\nOutro",
+            "  \n\nfirst\n   \nsame block\n\n```x``` y\n\nz",
+            "unclosed\n\n```\ncode\n\nrest",
+            "café ✓\n\nnaïve",
+            "",
+        ]
+        for md in cases:
+            self.assertEqual(list(iter_buffer_blocks(md.encode())), markdown_to_blocks(md), md)
+
+    def test_iter_buffer_blocks_crlf(self):
+        md = "# Title\r\n\r\nline one\r\nline two\r\n\r\n```\r\ncode\r\n\r\n```\r\n"
+        self.assertEqual(
+            list(iter_buffer_blocks(md.encode())),
+            ["# Title", "line one\nline two", "```\ncode\n\n```"],
+        )
+
+    def test_markdown_stream_matches_tree(self):
+        md = "# Title\n\nSome **bold** text\n\n```\ncode\n\nmore\n```\n\n- a\n- b\n"
+        fp = io.StringIO()
+        MarkdownStream(iter_blocks(io.StringIO(md))).write_html(fp)
+        self.assertEqual(fp.getvalue(), markdown_to_html_node(md).to_html())
+        self.assertIn("<pre><code>code\n\nmore\n</code></pre>", fp.getvalue())
+
     # Test block_to_block_type function
     def test_block_to_block_type(self):
         self.assertEqual(block_to_block_type("# Heading"), BlockType.HEADING)
@@ -99,6 +159,19 @@ This is the same paragraph on a new line
         html = node.to_html()
         self.assertEqual(html, "<div><p>This is a paragraph.</p></div>")
 
+    def test_plain_leaves_only_for_blocks_with_nothing_to_escape(self):
+        plain = markdown_to_html_node("Some **bold** [link](/x)").children[0].children
+        self.assertEqual({type(node) for node in plain}, {PlainLeafNode})
+        escaped = markdown_to_html_node("a < b and **bold**").children[0]
+        self.assertEqual({type(node) for node in escaped.children}, {LeafNode})
+        self.assertEqual(escaped.to_html(), "<p>a &lt; b and <b>bold</b></p>")
+        quoted = markdown_to_html_node('Say ![a "quote"](/q.png) and [go](/x)').children[0]
+        self.assertEqual([type(node) for node in quoted.children], [PlainLeafNode, LeafNode, PlainLeafNode, PlainLeafNode])
+        self.assertIn('alt="a &quot;quote&quot;"', quoted.to_html())
+        basepath = markdown_to_html_node("[go](/x)", basepath="/a&b/").children[0].children[0]
+        self.assertIs(type(basepath), LeafNode)
+        self.assertEqual(basepath.to_html(), '<a href="/a&amp;b/x">go</a>')
+
     def test_markdown_to_html_node_heading(self):
         md = "# Heading"
         node = markdown_to_html_node(md)
@@ -151,5 +224,177 @@ Code block
         html = node.to_html()
         self.assertEqual(html, "<div><h1>Heading</h1><p>This is a paragraph.</p><ul><li>List item 1</li><li>List item 2</li></ul><pre><code>Code block\n</code></pre></div>")
 
+class TestPageMetadata(unittest.TestCase):
+    MARKDOWN = (
+        "Intro text here\n\n# The **Title**\n\n## Part one\n\n- one item\n- two\n\n1. first\n\n"
+        "> quoted words\n>more\n\n```\nx = 1\n```\n\n# Second\n"
+    )
+
+    def test_parse_markdown(self):
+        node, metadata = parse_markdown(self.MARKDOWN)
+        self.assertEqual(node.to_html(), markdown_to_html_node(self.MARKDOWN).to_html())
+        self.assertEqual(metadata.title, "The **Title**")
+        self.assertEqual(metadata.outline, [(1, "The **Title**"), (2, "Part one"), (1, "Second")])
+        self.assertEqual(metadata.word_count, 3 + 2 + 2 + 3 + 1 + 3 + 3 + 1)
+
+    def test_title_line_inside_block(self):
+        _, metadata = parse_markdown("Some text\n# Not a heading block")
+        self.assertEqual(metadata.title, "Not a heading block")
+        self.assertEqual(metadata.outline, [])
+
+    def test_no_title(self):
+        self.assertIsNone(parse_markdown("## Sub\n\ntext")[1].title)
+
+    def test_stream_collects_same_metadata(self):
+        stream = MarkdownStream(iter_blocks(io.StringIO(self.MARKDOWN)))
+        stream.write_html(io.StringIO())
+        self.assertEqual(stream.metadata, parse_markdown(self.MARKDOWN)[1])
+
+    def test_dict_round_trip(self):
+        metadata = parse_markdown(self.MARKDOWN)[1]
+        self.assertEqual(PageMetadata.from_dict(metadata.to_dict()), metadata)
+        metadata = parse_markdown("---\ndate: 2024-01-02\n---\n\n# Title")[1]
+        self.assertEqual(PageMetadata.from_dict(metadata.to_dict()).fields, {"date": "2024-01-02"})
+
+    def test_front_matter(self):
+        markdown = "---\ntitle: Front\ndate: 2024-01-02\n---\n\n# Heading\n\nBody"
+        node, metadata = parse_markdown(markdown)
+        self.assertEqual(node.to_html(), "<div><h1>Heading</h1><p>Body</p></div>")
+        self.assertEqual(metadata.title, "Front")
+        self.assertEqual(metadata.fields, {"title": "Front", "date": "2024-01-02"})
+        self.assertEqual(metadata.outline, [(1, "Heading")])
+
+        stream = MarkdownStream(iter_blocks(io.StringIO(markdown)))
+        buffer = io.StringIO()
+        stream.write_html(buffer)
+        self.assertEqual(buffer.getvalue(), node.to_html())
+        self.assertEqual(stream.metadata, metadata)
+
+    def test_front_matter_with_no_blank_line_after_it(self):
+        markdown = "---\ntitle: X\n---\n# Heading\n\nbody"
+        node, metadata = parse_markdown(markdown)
+        self.assertEqual(node.to_html(), "<div><h1>Heading</h1><p>body</p></div>")
+        self.assertEqual(metadata.title, "X")
+        self.assertEqual(metadata.outline, [(1, "Heading")])
+
+        stream = MarkdownStream(iter_blocks(io.StringIO(markdown)))
+        buffer = io.StringIO()
+        stream.write_html(buffer)
+        self.assertEqual(buffer.getvalue(), node.to_html())
+        self.assertEqual(stream.metadata, metadata)
+
+    def test_summary_skips_lone_links(self):
+        metadata = parse_markdown("# Title\n\n[< Back](/)\n\n![image](/a.png)\n\nFirst\nparagraph\n\nSecond")[1]
+        self.assertEqual(metadata.summary, "First paragraph")
+        metadata = parse_markdown("---\nsummary: Given\n---\n\n# Title\n\nFirst")[1]
+        self.assertEqual(metadata.summary, "Given")
+        self.assertIsNone(parse_markdown("# Title")[1].summary)
+
+    def test_front_matter_only_at_start(self):
+        node, metadata = parse_markdown("# Title\n\n---\na: 1\n---")
+        self.assertEqual(metadata.fields, {})
+        self.assertEqual(metadata.title, "Title")
+        self.assertIn("<p>--- a: 1 ---</p>", node.to_html())
+
+class TestSearchTerms(unittest.TestCase):
+    MARKDOWN = "# The **Title**\n\nSee [the docs](https://example.com/guide) and ![a Hobbit](/h.png), x\n\n```\nprint_it()\n```"
+
+    def tearDown(self):
+        set_search_terms(False)
+        set_block_memo(None)
+
+    def test_off_by_default(self):
+        self.assertIsNone(parse_markdown(self.MARKDOWN)[1].terms)
+
+    def test_terms_from_text_nodes(self):
+        set_search_terms(True)
+        terms = parse_markdown(self.MARKDOWN)[1].terms
+        # Link text and alt text count, URLs and single characters don't
+        self.assertEqual(terms, {"the", "title", "see", "docs", "and", "hobbit", "print_it"})
+
+    def test_stream_and_memo_collect_same_terms(self):
+        set_search_terms(True)
+        expected = parse_markdown(self.MARKDOWN)[1]
+        stream = MarkdownStream(iter_blocks(io.StringIO(self.MARKDOWN)))
+        stream.write_html(io.StringIO())
+        self.assertEqual(stream.metadata, expected)
+        set_block_memo(BlockMemo())
+        parse_markdown(self.MARKDOWN)
+        self.assertEqual(parse_markdown(self.MARKDOWN)[1], expected)
+
+    def test_memo_from_before_terms_were_collected(self):
+        set_block_memo(BlockMemo())
+        parse_markdown(self.MARKDOWN)
+        set_search_terms(True)
+        self.assertIn("hobbit", parse_markdown(self.MARKDOWN)[1].terms)
+
+class TestBlockMemo(unittest.TestCase):
+    def tearDown(self):
+        set_block_memo(None)
+
+    def test_block_to_html_node(self):
+        node = block_to_html_node("- a\n- _b_", BlockType.ULIST)
+        self.assertEqual(node.to_html(), "<ul><li>a</li><li><i>b</i></li></ul>")
+
+    def test_memo_output_matches(self):
+        md = "# Title\n\nShared **disclaimer** [terms](/terms)\n\n- one\n- two"
+        expected = markdown_to_html_node(md).to_html()
+        set_block_memo(BlockMemo())
+        self.assertEqual(markdown_to_html_node(md).to_html(), expected)
+        self.assertEqual(markdown_to_html_node(md).to_html(), expected)
+
+    def test_memo_hits_repeated_blocks(self):
+        memo = BlockMemo()
+        set_block_memo(memo)
+        profiler = Profiler()
+        profiler.page("a.md")
+        markdown_to_html_node("# A\n\nShared text", profiler)
+        profiler.page("b.md")
+        node = markdown_to_html_node("# B\n\nShared text", profiler)
+        self.assertEqual((memo.hits, memo.misses), (1, 3))
+        self.assertEqual(profiler.counters, {"block_memo_hits": 1, "block_memo_misses": 3})
+        self.assertIsInstance(node.children[1], RawNode)
+
+    def test_memo_hits_still_collect_metadata(self):
+        set_block_memo(BlockMemo())
+        markdown = "# Title\n\n## Shared heading\n\nShared text"
+        parse_markdown(markdown)
+        _, metadata = parse_markdown(markdown)
+        self.assertEqual(metadata.outline, [(1, "Title"), (2, "Shared heading")])
+        self.assertEqual(metadata.word_count, 5)
+
+    def test_links_collected(self):
+        _, metadata = parse_markdown("# Title\n\n[a](/a) and ![img](/i.png)\n\n- [b](b)\n\n```\n[not](/code)\n```")
+        self.assertEqual(metadata.links, ["/a", "/i.png", "b"])
+
+    def test_memo_hits_still_collect_links(self):
+        set_block_memo(BlockMemo())
+        markdown = "# Title\n\n[shared](/shared) text"
+        parse_markdown(markdown, basepath="/site/")
+        _, metadata = parse_markdown(markdown, basepath="/site/")
+        self.assertEqual(metadata.links, ["/shared"])
+
+    def test_memo_keyed_by_basepath(self):
+        set_block_memo(BlockMemo())
+        markdown = "# Title\n\n[home](/)"
+        self.assertIn('href="/"', markdown_to_html_node(markdown).to_html())
+        self.assertIn('href="/site/"', markdown_to_html_node(markdown, basepath="/site/").to_html())
+
+    def test_memo_keyed_by_block_type(self):
+        memo = BlockMemo()
+        memo.put(BlockType.PARAGRAPH, "text", "<p>text</p>")
+        self.assertIsNone(memo.get(BlockType.CODE, "text"))
+        self.assertEqual(memo.get(BlockType.PARAGRAPH, "text"), "<p>text</p>")
+
+    def test_memo_is_bounded_lru(self):
+        memo = BlockMemo(max_entries=2)
+        memo.put(BlockType.PARAGRAPH, "a", "<p>a</p>")
+        memo.put(BlockType.PARAGRAPH, "b", "<p>b</p>")
+        memo.get(BlockType.PARAGRAPH, "a")
+        memo.put(BlockType.PARAGRAPH, "c", "<p>c</p>")
+        self.assertEqual(len(memo.entries), 2)
+        self.assertIsNone(memo.get(BlockType.PARAGRAPH, "b"))
+        self.assertIsNotNone(memo.get(BlockType.PARAGRAPH, "a"))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
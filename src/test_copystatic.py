@@ -0,0 +1,116 @@
+import os
+import unittest
+
+from copystatic import COPY, HARDLINK, REFLINK, directory_copy, remove_output, scan_tree, write_atomic
+from sitetest import SiteTestCase
+
+class TestCopyStatic(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.src = os.path.join(self.root, "static")
+        self.dst = os.path.join(self.root, "docs")
+        self.write(os.path.join(self.src, "index.css"), "body {}")
+        self.write(os.path.join(self.src, "images", "a.png"), "png-a")
+        self.write(os.path.join(self.src, "images", "deep", "b.png"), "png-bb")
+
+    def copy(self, **kwargs):
+        with self.quietly():
+            return directory_copy(self.src, self.dst, **kwargs)
+
+    def test_scan_tree(self):
+        dirs, files = scan_tree(self.src)
+        self.assertEqual(dirs, ["images", os.path.join("images", "deep")])
+        expected = ["images/a.png", "images/deep/b.png", "index.css"]
+        self.assertEqual([rel_path for rel_path, _ in files], [os.path.join(*p.split("/")) for p in expected])
+        self.assertEqual(files[2][1].st_size, len("body {}"))
+
+    def test_many_files_with_threads(self):
+        for i in range(300):
+            self.write(os.path.join(self.src, "bulk", f"d{i % 7}", f"f{i}.txt"), str(i))
+        stats = self.copy(workers=8)
+        self.assertEqual(stats.copied, 303)
+        self.assertEqual(self.read(os.path.join(self.dst, "bulk", "d5", "f299.txt")), "299")
+        self.assertEqual(self.copy(workers=8).skipped, 303)
+
+    def test_empty_directories_created(self):
+        os.makedirs(os.path.join(self.src, "empty"))
+        self.copy()
+        self.assertTrue(os.path.isdir(os.path.join(self.dst, "empty")))
+
+    def test_copies_everything(self):
+        stats = self.copy()
+        self.assertEqual((stats.copied, stats.skipped, stats.linked), (3, 0, 0))
+        self.assertEqual(stats.copied_bytes, len("body {}") + len("png-a") + len("png-bb"))
+        self.assertEqual(self.read(os.path.join(self.dst, "images", "deep", "b.png")), "png-bb")
+
+    def test_second_copy_skips_unchanged(self):
+        self.copy()
+        stats = self.copy()
+        self.assertEqual((stats.copied, stats.skipped), (0, 3))
+
+    def test_changed_file_copied(self):
+        self.copy()
+        self.write(os.path.join(self.src, "index.css"), "body { color: red }")
+        stats = self.copy()
+        self.assertEqual((stats.copied, stats.skipped), (1, 2))
+        self.assertEqual(self.read(os.path.join(self.dst, "index.css")), "body { color: red }")
+
+    def test_checksum_detects_same_size_edit(self):
+        self.copy()
+        dest_path = os.path.join(self.dst, "images", "a.png")
+        self.write(dest_path, "png-X")
+        self.assertEqual(self.copy(checksum=True).copied, 1)
+        self.assertEqual(self.read(dest_path), "png-a")
+
+    def test_stale_files_removed(self):
+        first = self.copy()
+        self.write(os.path.join(self.dst, "page.html"), "generated")
+        os.remove(os.path.join(self.src, "images", "deep", "b.png"))
+        stats = self.copy(previous=first.files)
+        self.assertEqual(stats.removed, 1)
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "images", "deep")))
+        self.assertTrue(os.path.exists(os.path.join(self.dst, "page.html")))
+
+    def test_write_atomic(self):
+        path = os.path.join(self.root, "cache", "entry")
+        write_atomic(path, "text")
+        self.assertEqual(self.read(path), "text")
+        write_atomic(path, b"bytes")
+        self.assertEqual(self.read(path), "bytes")
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["entry"])
+
+    def test_remove_output_prunes_up_to_root(self):
+        path = os.path.join(self.dst, "a", "b", "page.html")
+        self.write(path, "<p>x</p>")
+        remove_output(path, self.dst)
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "a")))
+        self.assertTrue(os.path.isdir(self.dst))
+
+    def test_hardlink_mode(self):
+        stats = self.copy(mode=HARDLINK)
+        self.assertEqual((stats.linked, stats.copied), (3, 0))
+        src_stat = os.stat(os.path.join(self.src, "index.css"))
+        dst_stat = os.stat(os.path.join(self.dst, "index.css"))
+        self.assertEqual(src_stat.st_ino, dst_stat.st_ino)
+        self.assertEqual(self.copy(mode=HARDLINK).skipped, 3)
+
+    def test_copy_after_hardlink_leaves_source_alone(self):
+        self.copy(mode=HARDLINK)
+        self.write(os.path.join(self.src, "index.css"), "body { margin: 0 }")
+        self.copy(mode=COPY)
+        dest_path = os.path.join(self.dst, "index.css")
+        self.write(dest_path, "edited")
+        self.assertEqual(self.read(os.path.join(self.src, "index.css")), "body { margin: 0 }")
+
+    def test_reflink_mode(self):
+        stats = self.copy(mode=REFLINK)
+        self.assertEqual(stats.copied, 3)
+        self.assertEqual(self.read(os.path.join(self.dst, "images", "a.png")), "png-a")
+        self.assertEqual(self.copy(mode=REFLINK).skipped, 3)
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            self.copy(mode="teleport")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+
+from block_markdown import BlockType, markdown_to_html_node
+from corpus import CorpusSpec, generate_corpus, write_corpus
+from pagegenerator import extract_title
+
+class TestCorpus(unittest.TestCase):
+    def test_deterministic(self):
+        spec = CorpusSpec(pages=5, page_size=2000, seed=7)
+        self.assertEqual(generate_corpus(spec), generate_corpus(CorpusSpec(pages=5, page_size=2000, seed=7)))
+        self.assertNotEqual(generate_corpus(spec), generate_corpus(CorpusSpec(pages=5, page_size=2000, seed=8)))
+
+    def test_page_count_size_and_depth(self):
+        spec = CorpusSpec(pages=6, page_size=3000, depth=3, fanout=2)
+        corpus = generate_corpus(spec)
+        self.assertEqual(len(corpus), 6)
+        for rel_path, markdown in corpus:
+            self.assertEqual(len(rel_path.split(os.sep)), 5)
+            self.assertGreaterEqual(len(markdown), 3000)
+
+    def test_pages_parse(self):
+        for rel_path, markdown in generate_corpus(CorpusSpec(pages=10, link_density=0.3, emphasis_density=0.3)):
+            self.assertTrue(extract_title(markdown).startswith("Page "))
+            markdown_to_html_node(markdown).to_html()
+
+    def test_block_mix(self):
+        spec = CorpusSpec(pages=2, block_mix={BlockType.CODE: 1})
+        for _, markdown in generate_corpus(spec):
+            html = markdown_to_html_node(markdown).to_html()
+            self.assertNotIn("<p>", html)
+            self.assertIn("<pre><code>", html)
+
+    def test_link_density(self):
+        sparse = generate_corpus(CorpusSpec(pages=3, link_density=0.0))
+        dense = generate_corpus(CorpusSpec(pages=3, link_density=0.5))
+        self.assertFalse(any("](" in markdown for _, markdown in sparse))
+        self.assertTrue(all("](" in markdown for _, markdown in dense))
+
+    def test_markup_density(self):
+        plain = generate_corpus(CorpusSpec(pages=3))
+        self.assertEqual(generate_corpus(CorpusSpec(pages=3, markup_density=0.0)), plain)
+        markup = generate_corpus(CorpusSpec(pages=3, markup_density=0.2))
+        count = lambda corpus: sum(markdown.count("&") for _, markdown in corpus)
+        self.assertEqual(count(plain), 0)
+        self.assertGreater(count(markup), 20)
+
+    def test_write_corpus(self):
+        spec = CorpusSpec(pages=3, page_size=500)
+        with tempfile.TemporaryDirectory() as tmp:
+            size = write_corpus(spec, tmp)
+            rel_path, markdown = generate_corpus(spec)[2]
+            with open(os.path.join(tmp, rel_path)) as f:
+                self.assertEqual(f.read(), markdown)
+        self.assertEqual(size, sum(len(markdown.encode()) for _, markdown in generate_corpus(spec)))
+
+if __name__ == "__main__":
+    unittest.main()
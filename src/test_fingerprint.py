@@ -0,0 +1,87 @@
+import os
+import unittest
+
+from copystatic import directory_copy, file_hash
+from fingerprint import HASH_LENGTH, fingerprint_assets, fingerprinted_path, publish_fingerprints
+from sitetest import SiteTestCase
+
+class TestFingerprint(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.src = os.path.join(self.root, "static")
+        self.dst = os.path.join(self.root, "docs")
+        self.cache = os.path.join(self.root, ".cache", "assets.json")
+        self.write(os.path.join(self.src, "index.css"), "body {}")
+        self.write(os.path.join(self.src, "images", "tom.png"), "png-tom")
+
+    def test_fingerprinted_path(self):
+        digest = "0123456789abcdef" * 4
+        self.assertEqual(fingerprinted_path("index.css", digest), f"index.{digest[:HASH_LENGTH]}.css")
+        self.assertEqual(
+            fingerprinted_path(os.path.join("images", "tom.png"), digest),
+            os.path.join("images", f"tom.{digest[:HASH_LENGTH]}.png"),
+        )
+        self.assertEqual(fingerprinted_path("LICENSE", digest), f"LICENSE.{digest[:HASH_LENGTH]}")
+
+    def test_urls(self):
+        fingerprints = fingerprint_assets(self.src)
+        css = file_hash(os.path.join(self.src, "index.css"))[:HASH_LENGTH]
+        png = file_hash(os.path.join(self.src, "images", "tom.png"))[:HASH_LENGTH]
+        self.assertEqual(
+            fingerprints.urls(),
+            {"/index.css": f"/index.{css}.css", "/images/tom.png": f"/images/tom.{png}.png"},
+        )
+        self.assertEqual((fingerprints.hashed, fingerprints.cached), (2, 0))
+
+    def test_unchanged_files_not_rehashed(self):
+        first = fingerprint_assets(self.src, self.cache)
+        second = fingerprint_assets(self.src, self.cache)
+        self.assertEqual((second.hashed, second.cached), (0, 2))
+        self.assertEqual(second.names, first.names)
+
+        self.write(os.path.join(self.src, "index.css"), "body { margin: 0 }")
+        third = fingerprint_assets(self.src, self.cache)
+        self.assertEqual((third.hashed, third.cached), (1, 1))
+        self.assertNotEqual(third.names["index.css"], first.names["index.css"])
+        self.assertEqual(third.names[os.path.join("images", "tom.png")], first.names[os.path.join("images", "tom.png")])
+
+    def test_cache_trusts_mtime_and_size(self):
+        path = os.path.join(self.src, "index.css")
+        first = fingerprint_assets(self.src, self.cache)
+        stat = os.stat(path)
+        # Same size and mtime, so the cached hash is kept, as directory_copy would skip the file too
+        self.write(path, "html {}")
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(fingerprint_assets(self.src, self.cache).names, first.names)
+
+    def test_corrupt_cache_rehashes(self):
+        fingerprint_assets(self.src, self.cache)
+        self.write(self.cache, "{not json")
+        self.assertEqual(fingerprint_assets(self.src, self.cache).hashed, 2)
+
+    def test_missing_directory(self):
+        self.assertEqual(fingerprint_assets(os.path.join(self.root, "missing")).names, {})
+
+    def test_publish(self):
+        directory_copy(self.src, self.dst)
+        fingerprints = fingerprint_assets(self.src)
+        published = publish_fingerprints(self.dst, fingerprints)
+        self.assertEqual(published, sorted(fingerprints.names.values()))
+        self.assertEqual(self.read(os.path.join(self.dst, fingerprints.names["index.css"])), "body {}")
+        self.assertEqual(self.read(os.path.join(self.dst, "index.css")), "body {}")
+
+    def test_publish_removes_stale_fingerprints(self):
+        directory_copy(self.src, self.dst)
+        previous = publish_fingerprints(self.dst, fingerprint_assets(self.src))
+        old_css = os.path.join(self.dst, fingerprint_assets(self.src).names["index.css"])
+
+        self.write(os.path.join(self.src, "index.css"), "body { margin: 0 }")
+        directory_copy(self.src, self.dst, previous=["index.css", os.path.join("images", "tom.png")])
+        fingerprints = fingerprint_assets(self.src)
+        publish_fingerprints(self.dst, fingerprints, previous)
+        self.assertFalse(os.path.exists(old_css))
+        self.assertEqual(self.read(os.path.join(self.dst, fingerprints.names["index.css"])), "body { margin: 0 }")
+        self.assertTrue(os.path.exists(os.path.join(self.dst, fingerprints.names[os.path.join("images", "tom.png")])))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import io
+import os
+import tempfile
+import unittest
+
+from frontmatter import parse_front_matter, read_front_matter, scan_front_matter, split_front_matter
+
+class TestFrontMatter(unittest.TestCase):
+    def test_parse_front_matter(self):
+        lines = ["---", "title: Hello: World", " date :2024-01-02 ", "---", "# Body"]
+        self.assertEqual(parse_front_matter(lines), {"title": "Hello: World", "date": "2024-01-02"})
+
+    def test_stops_at_closing_delimiter(self):
+        lines = iter(["---\n", "a: 1\n", "---\n", "# Body\n"])
+        self.assertEqual(parse_front_matter(lines), {"a": "1"})
+        self.assertEqual(next(lines), "# Body\n")
+
+    def test_not_front_matter(self):
+        self.assertIsNone(parse_front_matter(["# Title", "---"]))
+        self.assertIsNone(parse_front_matter(["---", "a: 1"]))
+        self.assertIsNone(parse_front_matter(["---", "no separator", "---"]))
+        self.assertIsNone(parse_front_matter(["---", ": no key", "---"]))
+        self.assertIsNone(parse_front_matter([]))
+
+    def test_split_front_matter(self):
+        self.assertEqual(split_front_matter("---\ntemplate: blog\n---"), ({"template": "blog"}, ""))
+        self.assertEqual(split_front_matter("---\na: 1\n---\n# Heading\nmore"), ({"a": "1"}, "# Heading\nmore"))
+        self.assertEqual(split_front_matter("- item\n- item"), (None, "- item\n- item"))
+        self.assertEqual(split_front_matter("---\nnot front matter"), (None, "---\nnot front matter"))
+
+    def test_scan_reads_only_the_block(self):
+        body = "# Title\n\n" + "words " * 10_000
+        source = io.BytesIO(f"---\ntitle: Fast\n---\n{body}".encode())
+        self.assertEqual(scan_front_matter(source, 64), {"title": "Fast"})
+        self.assertEqual(source.tell(), 64)
+
+    def test_scan_reads_past_prefix_for_long_blocks(self):
+        fields = {f"key{i}": "value " * 10 for i in range(20)}
+        text = "---\n" + "".join(f"{key}: {value}\n" for key, value in fields.items()) + "---\n\nBody"
+        self.assertEqual(scan_front_matter(io.BytesIO(text.encode()), 32), {k: v.strip() for k, v in fields.items()})
+
+    def test_scan_crlf_and_leading_blank_lines(self):
+        source = io.BytesIO(b"\r\n---\r\ntitle: Windows\r\n---\r\n\r\nBody")
+        self.assertEqual(scan_front_matter(source), {"title": "Windows"})
+
+    def test_scan_without_front_matter(self):
+        self.assertEqual(scan_front_matter(io.BytesIO(b"# Title\n\n---\na: 1\n---\n")), {})
+        self.assertEqual(scan_front_matter(io.BytesIO(b"---\na: 1\n\nb: 2\n---\n")), {})
+        self.assertEqual(scan_front_matter(io.BytesIO(b"")), {})
+
+    def test_read_front_matter(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "page.md")
+            with open(path, "w") as f:
+                f.write("---\ntitle: Café\ntemplate: blog\n---\n\n# Heading\n")
+            self.assertEqual(read_front_matter(path), {"title": "Café", "template": "blog"})
+
+if __name__ == "__main__":
+    unittest.main()
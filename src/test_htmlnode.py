@@ -1,6 +1,7 @@
+import io
 import unittest
 
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import HTMLNode, LeafNode, ParentNode, PlainLeafNode, RawNode, escape_attribute, escape_text
 
 class TestHTMLNode(unittest.TestCase):
     # Test cases for HTMLNode
@@ -117,5 +118,83 @@ class TestHTMLNode(unittest.TestCase):
         ])
         self.assertEqual(node.to_html(), "<h1>This is a heading</h1>")
 
+    # Test cases for node layout
+    def test_nodes_have_no_instance_dict(self):
+        for node in [HTMLNode(), LeafNode("p", "x"), ParentNode("div", [])]:
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_leaf_children_shared_and_empty(self):
+        first = LeafNode("p", "One")
+        second = LeafNode(None, "Two")
+        self.assertEqual(len(first.children), 0)
+        self.assertIs(first.children, second.children)
+
+    # Test cases for RawNode
+    def test_raw_node_verbatim(self):
+        node = ParentNode("div", [RawNode("<p>Already <b>rendered</b></p>")])
+        self.assertEqual(node.to_html(), "<div><p>Already <b>rendered</b></p></div>")
+
+    # Test cases for write_html
+    def test_escape_text(self):
+        self.assertEqual(escape_text("a < b && c > d"), "a &lt; b &amp;&amp; c &gt; d")
+        self.assertEqual(escape_text('"quoted" text'), '"quoted" text')
+        plain = "nothing to escape"
+        self.assertIs(escape_text(plain), plain)
+
+    def test_escape_attribute(self):
+        self.assertEqual(escape_attribute('/search?q=a&b="c"<'), "/search?q=a&amp;b=&quot;c&quot;&lt;")
+        self.assertEqual(escape_attribute("&lt;"), "&amp;lt;")
+
+    def test_leaf_escapes_value(self):
+        self.assertEqual(LeafNode(None, "< Back Home").to_html(), "&lt; Back Home")
+        self.assertEqual(LeafNode("code", "if a < b && c:").to_html(), "<code>if a &lt; b &amp;&amp; c:</code>")
+
+    def test_props_escaped(self):
+        node = LeafNode("img", "", props={"src": "/a.png", "alt": 'say "hi" & <wave>'})
+        self.assertEqual(node.to_html(), '<img src="/a.png" alt="say &quot;hi&quot; &amp; &lt;wave&gt;"></img>')
+
+    def test_plain_leaf_matches_leaf(self):
+        for tag in (None, "b", "code"):
+            self.assertEqual(PlainLeafNode(tag, "plain text").to_html(), LeafNode(tag, "plain text").to_html())
+        self.assertEqual(ParentNode("p", [PlainLeafNode("i", "x")]).to_html(), "<p><i>x</i></p>")
+        props = {"href": "/x", "title": "plain"}
+        self.assertEqual(PlainLeafNode("a", "go", props).to_html(), LeafNode("a", "go", props).to_html())
+        with self.assertRaises(ValueError):
+            PlainLeafNode("b", None).to_html()
+
+    def test_raw_node_not_escaped(self):
+        node = ParentNode("div", [RawNode("<p>a &amp; b</p>"), LeafNode(None, "a & b")])
+        self.assertEqual(node.to_html(), "<div><p>a &amp; b</p>a &amp; b</div>")
+
+    def test_write_html_matches_to_html(self):
+        node = ParentNode("div", [
+            ParentNode("p", [LeafNode(None, "Hello "), LeafNode("a", "link", props={"href": "/x"})]),
+            LeafNode("span", "World"),
+        ], props={"class": "container"})
+        buffer = io.StringIO()
+        node.write_html(buffer)
+        self.assertEqual(buffer.getvalue(), node.to_html())
+
+    def test_write_html_streams_fragments(self):
+        class Recorder:
+            def __init__(self):
+                self.fragments = []
+            def write(self, text):
+                self.fragments.append(text)
+
+        node = ParentNode("ul", [LeafNode("li", "One"), LeafNode("li", "Two")])
+        recorder = Recorder()
+        node.write_html(recorder)
+        self.assertEqual(recorder.fragments, ["<ul>", "<li>One</li>", "<li>Two</li>", "</ul>"])
+
+    def test_write_html_base_not_implemented(self):
+        with self.assertRaises(NotImplementedError):
+            HTMLNode().write_html(io.StringIO())
+
+    def test_write_html_invalid_child(self):
+        node = ParentNode("div", [LeafNode("p", None)])
+        with self.assertRaises(ValueError):
+            node.write_html(io.StringIO())
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
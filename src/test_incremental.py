@@ -0,0 +1,204 @@
+import os
+import unittest
+
+from block_markdown import set_search_terms
+from incremental import generate_pages_incremental, load_manifest, page_entries, record_pages
+from pagegenerator import find_pages, generate_pages_parallel, generate_pages_recursive
+from search import TermStore
+from sitetest import SiteTestCase
+from template import TemplateRegistry, set_asset_urls
+
+TEMPLATE = '<html><title>{{ Title }}</title><link href="/index.css"><body>{{ Content }}</body></html>'
+
+class TestIncremental(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.public = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.manifest = os.path.join(self.root, "manifest.json")
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome [home](/blog/a)")
+        self.write(os.path.join(self.content, "blog", "a", "index.md"), "# A\n\nFirst post")
+        self.write(os.path.join(self.content, "blog", "b", "index.md"), "# B\n\nSecond post")
+
+    def build(self, basepath="/", metadata=None, term_store=None):
+        with self.quietly():
+            counts = generate_pages_incremental(
+                self.content, self.template, self.public, basepath, self.manifest, metadata=metadata,
+                term_store=term_store,
+            )
+        self.assertEqual(counts.pop("errors"), [])
+        self.assertEqual(counts.pop("failed"), 0)
+        return counts
+
+    def test_first_build_generates_everything(self):
+        counts = self.build()
+        self.assertEqual(counts, {"generated": 3, "skipped": 0, "removed": 0})
+        self.assertIn("<p>First post</p>", self.read(os.path.join(self.public, "blog", "a", "index.html")))
+        self.assertEqual(len(load_manifest(self.manifest)["pages"]), 3)
+
+    def test_unchanged_build_skips_everything(self):
+        self.build()
+        counts = self.build()
+        self.assertEqual(counts, {"generated": 0, "skipped": 3, "removed": 0})
+
+    def test_only_changed_page_regenerated(self):
+        self.build()
+        self.write(os.path.join(self.content, "blog", "b", "index.md"), "# B\n\nEdited post")
+        counts = self.build()
+        self.assertEqual(counts, {"generated": 1, "skipped": 2, "removed": 0})
+        self.assertIn("Edited post", self.read(os.path.join(self.public, "blog", "b", "index.html")))
+
+    def test_template_change_regenerates_everything(self):
+        self.build()
+        self.write(self.template, TEMPLATE.replace("<body>", "<body class='x'>"))
+        self.assertEqual(self.build()["generated"], 3)
+
+    def test_layout_change_regenerates_its_pages(self):
+        layouts = os.path.join(self.root, "layouts")
+        self.write(os.path.join(layouts, "blog.html"), "<article>{{ Content }}</article>")
+
+        def build():
+            templates = TemplateRegistry(self.template, "/", self.content, layouts)
+            with self.quietly():
+                return generate_pages_incremental(
+                    self.content, self.template, self.public, "/", self.manifest, templates=templates
+                )
+
+        self.assertEqual(build()["generated"], 3)
+        self.assertEqual(
+            self.read(os.path.join(self.public, "blog", "a", "index.html")),
+            "<article><div><h1>A</h1><p>First post</p></div></article>",
+        )
+        self.write(os.path.join(layouts, "blog.html"), "<main>{{ Content }}</main>")
+        counts = build()
+        self.assertEqual((counts["generated"], counts["skipped"]), (2, 1))
+        self.assertIn("<main>", self.read(os.path.join(self.public, "blog", "b", "index.html")))
+        self.write(self.template, TEMPLATE.replace("<body>", "<body class='x'>"))
+        counts = build()
+        self.assertEqual((counts["generated"], counts["skipped"]), (1, 2))
+
+    def test_basepath_change_regenerates_everything(self):
+        self.build()
+        self.assertEqual(self.build("/site/")["generated"], 3)
+
+    def test_deleted_output_regenerated(self):
+        self.build()
+        os.remove(os.path.join(self.public, "index.html"))
+        self.assertEqual(self.build()["generated"], 1)
+
+    def test_removed_source_deletes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "b", "index.md"))
+        os.rmdir(os.path.join(self.content, "blog", "b"))
+        counts = self.build()
+        self.assertEqual(counts, {"generated": 0, "skipped": 2, "removed": 1})
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "b")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "blog", "a", "index.html")))
+
+    def test_matches_clean_build(self):
+        self.build("/site/")
+        clean = os.path.join(self.root, "clean")
+        with self.quietly():
+            generate_pages_recursive(self.content, self.template, clean, "/site/")
+        for rel in ["index.html", os.path.join("blog", "a", "index.html"), os.path.join("blog", "b", "index.html")]:
+            self.assertEqual(self.read(os.path.join(self.public, rel)), self.read(os.path.join(clean, rel)))
+
+    def test_pipelined_build_records_pages(self):
+        with self.quietly():
+            counts = generate_pages_incremental(
+                self.content, self.template, self.public, "/", self.manifest, io_threads=2, io_queue=1
+            )
+        self.assertEqual(counts["generated"], 3)
+        self.assertIn("<p>First post</p>", self.read(os.path.join(self.public, "blog", "a", "index.html")))
+        self.assertEqual(self.build()["skipped"], 3)
+
+    def test_failed_page_retried_next_build(self):
+        self.build()
+        self.write(os.path.join(self.content, "blog", "b", "index.md"), "No title here")
+        with self.quietly():
+            counts = generate_pages_incremental(self.content, self.template, self.public, "/", self.manifest)
+        self.assertEqual(counts["failed"], 1)
+        self.assertEqual(counts["errors"][0][0], os.path.join(self.content, "blog", "b", "index.md"))
+        self.write(os.path.join(self.content, "blog", "b", "index.md"), "# B\n\nFixed")
+        self.assertEqual(self.build()["generated"], 1)
+
+    def test_recorded_pages_skipped(self):
+        pages = find_pages(self.content, self.public)
+        templates = TemplateRegistry(self.template, "/")
+        current = page_entries(pages, "/", templates)
+        generated = {}
+        with self.quietly():
+            generate_pages_parallel(pages, self.template, "/", 1, metadata=generated, templates=templates)
+        home = os.path.join(self.content, "index.md")
+        record_pages(self.manifest, current, generated, removed=[os.path.join(self.content, "gone.md")])
+        self.assertEqual(load_manifest(self.manifest)["pages"][home]["metadata"]["links"], ["/blog/a"])
+        self.assertEqual(self.build(), {"generated": 0, "skipped": 3, "removed": 0})
+
+    def test_metadata_of_skipped_pages_from_manifest(self):
+        first = {}
+        self.build(metadata=first)
+        self.write(os.path.join(self.content, "blog", "b", "index.md"), "# B\n\n[back](/)")
+        metadata = {}
+        self.assertEqual(self.build(metadata=metadata)["generated"], 1)
+        self.assertEqual(set(metadata), set(first))
+        self.assertEqual(metadata[os.path.join(self.content, "index.md")].links, ["/blog/a"])
+        self.assertEqual(metadata[os.path.join(self.content, "blog", "b", "index.md")].links, ["/"])
+
+    def test_search_terms_rebuild_pages_built_without_them(self):
+        self.build()
+        terms = TermStore(os.path.join(self.root, "terms"))
+        set_search_terms(True)
+        try:
+            metadata = {}
+            self.assertEqual(self.build(metadata=metadata, term_store=terms)["generated"], 3)
+            self.assertIn("welcome", metadata[os.path.join(self.content, "index.md")].terms)
+            metadata = {}
+            self.assertEqual(self.build(metadata=metadata, term_store=terms)["skipped"], 3)
+            self.assertIn("welcome", metadata[os.path.join(self.content, "index.md")].terms)
+        finally:
+            set_search_terms(False)
+        self.assertEqual(self.build()["skipped"], 3)
+        # Terms live in the term store, never in the manifest
+        for entry in load_manifest(self.manifest)["pages"].values():
+            self.assertIsNone(entry["metadata"]["terms"])
+
+    def test_removed_pages_dropped_from_term_store(self):
+        terms = TermStore(os.path.join(self.root, "terms"))
+        set_search_terms(True)
+        try:
+            self.build(term_store=terms)
+            b_path = os.path.join(self.content, "blog", "b", "index.md")
+            b_hash = load_manifest(self.manifest)["pages"][b_path]["hash"]
+            self.assertEqual(terms.get(b_hash), {"second", "post"})
+            os.remove(b_path)
+            self.build(term_store=terms)
+            self.assertIsNone(terms.get(b_hash))
+        finally:
+            set_search_terms(False)
+
+    def test_new_fingerprints_rebuild_pages_referencing_them(self):
+        self.write(os.path.join(self.content, "blog", "b", "index.md"), "# B\n\n![logo](/images/logo.png)")
+        self.build()
+        try:
+            # The template links the stylesheet, so every page is rebuilt when it gets a fingerprint
+            set_asset_urls({"/index.css": "/index.1.css", "/images/logo.png": "/images/logo.1.png"})
+            self.assertEqual(self.build()["generated"], 3)
+            self.assertIn("/images/logo.1.png", self.read(os.path.join(self.public, "blog", "b", "index.html")))
+            set_asset_urls({"/index.css": "/index.1.css", "/images/logo.png": "/images/logo.2.png"})
+            counts = self.build()
+            self.assertEqual(counts, {"generated": 1, "skipped": 2, "removed": 0})
+            self.assertIn("/images/logo.2.png", self.read(os.path.join(self.public, "blog", "b", "index.html")))
+        finally:
+            set_asset_urls(None)
+        self.assertEqual(self.build()["generated"], 3)
+        self.assertIn('href="/index.css"', self.read(os.path.join(self.public, "index.html")))
+
+    def test_corrupt_manifest_rebuilds(self):
+        self.build()
+        self.write(self.manifest, "{not json")
+        self.assertEqual(self.build()["generated"], 3)
+
+if __name__ == "__main__":
+    unittest.main()
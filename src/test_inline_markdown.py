@@ -1,3 +1,5 @@
+import random
+import time
 import unittest
 from inline_markdown import (
     split_nodes_delimiter,
@@ -300,6 +302,72 @@ class TestInlineMarkdown(unittest.TestCase):
         expected_nodes = []
         self.assertEqual(text_nodes, expected_nodes)
 
+    def test_text_to_textnodes_unmatched_delimiter(self):
+        with self.assertRaises(ValueError):
+            text_to_textnodes("This is _unclosed italic")
+
+    def test_text_to_textnodes_repeated_link(self):
+        text = "[a](/x) and [a](/x)"
+        expected_nodes = [
+            TextNode("a", TextType.LINK, "/x"),
+            TextNode(" and ", TextType.TEXT),
+            TextNode("a", TextType.LINK, "/x"),
+        ]
+        self.assertEqual(text_to_textnodes(text), expected_nodes)
+
+    def test_text_to_textnodes_delimiters_inside_spans(self):
+        text = "`a_b` **c_d** [e](f)_g_"
+        expected_nodes = [
+            TextNode("a_b", TextType.CODE),
+            TextNode(" ", TextType.TEXT),
+            TextNode("c_d", TextType.BOLD),
+            TextNode(" ", TextType.TEXT),
+            TextNode("e", TextType.LINK, "f"),
+            TextNode("g", TextType.ITALIC),
+        ]
+        self.assertEqual(text_to_textnodes(text), expected_nodes)
+
+    def test_text_to_textnodes_matches_chained_splitters(self):
+        def chained(text):
+            nodes = split_nodes_delimiter([TextNode(text, TextType.TEXT)], "**", TextType.BOLD)
+            nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+            nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+            nodes = split_nodes_images(nodes)
+            return split_nodes_links(nodes)
+
+        atoms = ["a", " ", "**", "_", "`", "[", "]", "(", ")", "!", "[t](u)", "![i](p)"]
+        rng = random.Random(1234)
+        for _ in range(5000):
+            text = "".join(rng.choice(atoms) for _ in range(rng.randint(0, 8)))
+            try:
+                expected = chained(text)
+            except ValueError:
+                continue
+            self.assertEqual(text_to_textnodes(text), expected, text)
+
+    # Benchmark: the scanner must stay linear on paragraphs with thousands of spans
+    def test_text_to_textnodes_scales_linearly(self):
+        def paragraph(count):
+            return " ".join(
+                f"word **bold{i}** _it{i}_ `c{i}` [link {i}](/page/{i}) ![img {i}](/img/{i}.png) [x"
+                for i in range(count)
+            )
+
+        def best_time(text):
+            best = float("inf")
+            for _ in range(3):
+                start = time.perf_counter()
+                text_to_textnodes(text)
+                best = min(best, time.perf_counter() - start)
+            return best
+
+        small = paragraph(1000)
+        large = paragraph(8000)
+        self.assertEqual(len(text_to_textnodes(large)), 8000 * 10 + 1)
+        ratio = best_time(large) / best_time(small)
+        # Linear is ~8x; the quadratic split passes were well over 50x at this size
+        self.assertLess(ratio, 20)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,60 @@
+import unittest
+
+from block_markdown import PageMetadata
+from linkcheck import LinkIndex, link_candidates, output_path
+
+class TestLinkCandidates(unittest.TestCase):
+    def test_root(self):
+        self.assertEqual(link_candidates("blog/index.html", "/"), ["index.html"])
+
+    def test_absolute(self):
+        self.assertEqual(
+            link_candidates("index.html", "/blog/tom"),
+            ["blog/tom", "blog/tom.html", "blog/tom/index.html"],
+        )
+        self.assertEqual(link_candidates("index.html", "/blog/"), ["blog/index.html"])
+
+    def test_relative(self):
+        self.assertEqual(link_candidates("blog/tom/index.html", "../majesty/")[0], "blog/majesty/index.html")
+        self.assertEqual(link_candidates("blog/tom/index.html", "photo.png")[0], "blog/tom/photo.png")
+
+    def test_query_fragment_and_quoting(self):
+        self.assertEqual(link_candidates("index.html", "/a%20b.png?x=1#top")[0], "a b.png")
+
+    def test_outside_site(self):
+        for target in ("https://example.com/", "//cdn.example.com/x.js", "mailto:me@example.com", "#section"):
+            self.assertIsNone(link_candidates("index.html", target), target)
+
+    def test_output_path(self):
+        self.assertEqual(output_path("docs/blog/tom/index.html", "docs"), "blog/tom/index.html")
+
+class TestLinkIndex(unittest.TestCase):
+    def index(self):
+        index = LinkIndex()
+        index.add_static(["index.css", "images/tolkien.png"])
+        index.add_page("index.html", ["/blog/tom", "/images/tolkien.png", "https://example.com", "/missing"])
+        index.add_page("blog/tom/index.html", ["/", "/blog/tom", "/images/gone.png"])
+        index.add_page("blog/lost/index.html", ["/blog/lost/"])
+        return index
+
+    def test_check(self):
+        dangling, orphans = self.index().check()
+        self.assertEqual(dangling, [("index.html", "/missing"), ("blog/tom/index.html", "/images/gone.png")])
+        # A page linking only to itself is still an orphan; the root index never is
+        self.assertEqual(orphans, ["blog/lost/index.html"])
+
+    def test_resolve(self):
+        index = self.index()
+        self.assertEqual(index.resolve("index.html", "/blog/tom"), "blog/tom/index.html")
+        self.assertEqual(index.resolve("index.html", "https://example.com"), "")
+        self.assertIsNone(index.resolve("index.html", "/missing"))
+
+    def test_add_pages_skips_failed(self):
+        index = LinkIndex()
+        pages = [("content/a.md", "docs/a.html"), ("content/b.md", "docs/b.html")]
+        index.add_pages(pages, {"content/a.md": PageMetadata(links=["/"])}, "docs")
+        self.assertEqual(set(index.pages), {"a.html"})
+        self.assertIsNone(index.resolve("a.html", "/b"))
+
+if __name__ == "__main__":
+    unittest.main()
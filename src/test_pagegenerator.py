@@ -1,5 +1,12 @@
+import io
+import os
 import unittest
-from pagegenerator import extract_title
+from unittest import mock
+import pagegenerator
+from pagegenerator import extract_title, generate_page, read_title
+from profiler import PARSE_STAGES, SERIALIZE, Profiler
+from sitetest import SiteTestCase
+from template import Template
 
 class TestPageGenerator(unittest.TestCase):
     def test_extract_title_valid(self):
@@ -25,4 +32,89 @@ class TestPageGenerator(unittest.TestCase):
     def test_extract_title_title_long(self):
         markdown = "# This is a very long title that spans multiple lines\n\nThis is some content."
         expected_title = "This is a very long title that spans multiple lines"
-        self.assertEqual(extract_title(markdown), expected_title)
\ No newline at end of file
+        self.assertEqual(extract_title(markdown), expected_title)
+
+    def test_extract_title_bytes(self):
+        self.assertEqual(extract_title("intro\r\n# Café\r\n\r\ntext".encode()), "Café")
+        self.assertEqual(extract_title(b"# First"), "First")
+        with self.assertRaises(ValueError):
+            extract_title(b"no title\n#not a title")
+
+    def test_extract_title_not_at_line_start(self):
+        with self.assertRaises(ValueError):
+            extract_title("text with # inside")
+
+    def test_read_title_stops_at_first_heading(self):
+        def lines():
+            yield "intro\n"
+            yield "# Title\n"
+            raise AssertionError("read past the title")
+        self.assertEqual(read_title(lines()), "Title")
+
+    def test_read_title_no_title(self):
+        with self.assertRaises(ValueError):
+            read_title(io.StringIO("no title here\n"))
+
+class TestGeneratePageStreaming(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.template = Template("<title>{{ Title }}</title>{{ Content }}")
+
+    def render(self, markdown, profiler=None):
+        from_path = os.path.join(self.root, "page.md")
+        dest_path = os.path.join(self.root, "out", "page.html")
+        self.write(from_path, markdown)
+        with self.quietly():
+            self.metadata = generate_page(from_path, None, dest_path, "/", self.template, profiler)
+        return self.read(dest_path)
+
+    def test_streams_page(self):
+        html = self.render("Intro\n\n# Title\n\n```\na\n\nb\n```\n")
+        self.assertEqual(html, "<title>Title</title><div><p>Intro</p><h1>Title</h1><pre><code>a\n\nb\n</code></pre></div>")
+
+    def test_returns_metadata(self):
+        self.render("# Title\n\n## Section\n\nthree more words\n")
+        self.assertEqual(self.metadata.title, "Title")
+        self.assertEqual(self.metadata.outline, [(1, "Title"), (2, "Section")])
+        self.assertEqual(self.metadata.word_count, 5)
+
+    def test_mapped_source_matches_streamed(self):
+        markdown = "Intro\n\n# Title\n\n```\na\n\nb\n```\n\n- **one**\n- two\n"
+        streamed = self.render(markdown)
+        with mock.patch.object(pagegenerator, "MMAP_THRESHOLD", 1):
+            self.assertEqual(self.render(markdown), streamed)
+
+    def test_front_matter_title(self):
+        markdown = "---\ntitle: From Front Matter\n---\n\nNo heading here\n"
+        html = self.render(markdown)
+        self.assertEqual(html, "<title>From Front Matter</title><div><p>No heading here</p></div>")
+        self.assertEqual(self.metadata.fields, {"title": "From Front Matter"})
+        with mock.patch.object(pagegenerator, "MMAP_THRESHOLD", 1):
+            self.assertEqual(self.render(markdown), html)
+
+    def test_title_escaped(self):
+        html = self.render("# Salt & <Pepper>\n\nBody\n")
+        escaped = "Salt &amp; &lt;Pepper&gt;"
+        self.assertEqual(html, f"<title>{escaped}</title><div><h1>{escaped}</h1><p>Body</p></div>")
+        with mock.patch.object(pagegenerator, "MMAP_THRESHOLD", 1):
+            self.assertEqual(self.render("# Salt & <Pepper>\n\nBody\n"), html)
+        html = self.render("---\ntitle: A & B\n---\n\nBody\n")
+        self.assertEqual(html, "<title>A &amp; B</title><div><p>Body</p></div>")
+
+    def test_front_matter_with_no_blank_line_after_it(self):
+        html = self.render("---\ntitle: X\n---\n# Heading\n\nbody\n")
+        self.assertEqual(html, "<title>X</title><div><h1>Heading</h1><p>body</p></div>")
+        with mock.patch.object(pagegenerator, "MMAP_THRESHOLD", 1):
+            self.assertEqual(self.render("---\ntitle: X\n---\n# Heading\n\nbody\n"), html)
+
+    def test_failed_page_leaves_no_output(self):
+        with self.assertRaises(ValueError):
+            self.render("# Title\n\nText with **unclosed bold\n")
+        self.assertFalse(os.path.exists(os.path.join(self.root, "out", "page.html")))
+
+    def test_profiled_stages_do_not_overlap(self):
+        profiler = Profiler()
+        self.render("# Title\n\nSome text\n", profiler)
+        stages = profiler.pages[os.path.join(self.root, "page.md")]
+        for stage in PARSE_STAGES + (SERIALIZE,):
+            self.assertGreaterEqual(stages[stage], 0.0)
@@ -0,0 +1,100 @@
+import os
+import unittest
+
+from block_markdown import BlockMemo, set_block_memo, set_search_terms
+from pagegenerator import find_pages, generate_pages_parallel, generate_pages_recursive
+from sitetest import SiteTestCase
+from template import TemplateRegistry
+
+TEMPLATE = '<html><title>{{ Title }}</title><link href="/index.css"><body>{{ Content }}</body></html>'
+
+class TestParallel(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        self.write(self.template, TEMPLATE)
+        for i in range(12):
+            self.write(os.path.join(self.content, f"post{i:02}", "index.md"), f"# Post {i}\n\nBody **{i}** [link](/post{i})")
+
+    def test_find_pages_sorted(self):
+        pages = find_pages(self.content, "out")
+        self.assertEqual(len(pages), 12)
+        self.assertEqual([p[0] for p in pages], sorted(p[0] for p in pages))
+        self.assertEqual(str(pages[0][1]), os.path.join("out", "post00", "index.html"))
+
+    def test_parallel_matches_serial(self):
+        serial = os.path.join(self.root, "serial")
+        parallel = os.path.join(self.root, "parallel")
+        with self.quietly():
+            generate_pages_recursive(self.content, self.template, serial, "/site/")
+            errors = generate_pages_parallel(find_pages(self.content, parallel), self.template, "/site/", 3, chunksize=2)
+        self.assertEqual(errors, [])
+        for from_path, dest_path in find_pages(self.content, serial):
+            rel = os.path.relpath(dest_path, serial)
+            self.assertEqual(self.read(dest_path), self.read(os.path.join(parallel, rel)))
+
+    def test_errors_reported_without_aborting(self):
+        broken = os.path.join(self.content, "post03", "index.md")
+        self.write(broken, "no title")
+        public = os.path.join(self.root, "docs")
+        with self.quietly():
+            errors = generate_pages_parallel(find_pages(self.content, public), self.template, "/", 2)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0][0], broken)
+        self.assertIn("no title found", errors[0][1])
+        self.assertTrue(os.path.exists(os.path.join(public, "post11", "index.html")))
+
+    def test_single_job_runs_in_process(self):
+        public = os.path.join(self.root, "docs")
+        with self.quietly():
+            errors = generate_pages_parallel(find_pages(self.content, public), self.template, "/", 1)
+        self.assertEqual(errors, [])
+        self.assertIn("<b>5</b>", self.read(os.path.join(public, "post05", "index.html")))
+
+    def test_metadata_collected_from_workers(self):
+        public = os.path.join(self.root, "docs")
+        metadata = {}
+        with self.quietly():
+            generate_pages_parallel(find_pages(self.content, public), self.template, "/", 3, metadata=metadata)
+        self.assertEqual(len(metadata), 12)
+        page = metadata[os.path.join(self.content, "post07", "index.md")]
+        self.assertEqual((page.title, page.links), ("Post 7", ["/post7"]))
+
+    def test_search_terms_collected_in_workers(self):
+        public = os.path.join(self.root, "docs")
+        metadata = {}
+        set_search_terms(True)
+        try:
+            with self.quietly():
+                generate_pages_parallel(find_pages(self.content, public), self.template, "/", 3, metadata=metadata)
+        finally:
+            set_search_terms(False)
+        self.assertEqual(metadata[os.path.join(self.content, "post07", "index.md")].terms, {"post", "body", "link"})
+
+    def test_memo_counts_collected_from_workers(self):
+        public = os.path.join(self.root, "docs")
+        memo = BlockMemo()
+        set_block_memo(memo)
+        try:
+            with self.quietly():
+                generate_pages_parallel(find_pages(self.content, public), self.template, "/", 3)
+        finally:
+            set_block_memo(None)
+        # Every page has a heading and a paragraph of its own
+        self.assertEqual((memo.hits, memo.misses), (0, 24))
+        self.assertEqual(memo.entries, {})
+
+    def test_layouts_picked_per_page_in_workers(self):
+        layouts = os.path.join(self.root, "layouts")
+        self.write(os.path.join(layouts, "post03.html"), "<article>{{ Content }}</article>")
+        templates = TemplateRegistry(self.template, "/", self.content, layouts)
+        public = os.path.join(self.root, "docs")
+        with self.quietly():
+            errors = generate_pages_parallel(find_pages(self.content, public), None, "/", 3, templates=templates)
+        self.assertEqual(errors, [])
+        self.assertTrue(self.read(os.path.join(public, "post03", "index.html")).startswith("<article><div><h1>Post 3"))
+        self.assertTrue(self.read(os.path.join(public, "post04", "index.html")).startswith("<html>"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import pipeline
+from pagegenerator import find_pages, generate_pages_recursive
+from pipeline import PageWriter, generate_pages_pipelined, write_output
+from profiler import READ, SERIALIZE, WRITE, Profiler
+from sitetest import SiteTestCase
+
+TEMPLATE = '<html><title>{{ Title }}</title><link href="/index.css"><body>{{ Content }}</body></html>'
+
+class TestPipeline(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        self.write(self.template, TEMPLATE)
+        for i in range(12):
+            self.write(os.path.join(self.content, f"post{i:02}", "index.md"), f"# Post {i}\n\nBody **{i}** [link](/post{i})")
+
+    def generate(self, public, **kwargs):
+        with self.quietly() as out:
+            errors = generate_pages_pipelined(find_pages(self.content, public), self.template, "/site/", **kwargs)
+        return errors, out.getvalue()
+
+    def test_pipelined_matches_recursive(self):
+        serial = os.path.join(self.root, "serial")
+        public = os.path.join(self.root, "pipelined")
+        with self.quietly() as serial_out:
+            generate_pages_recursive(self.content, self.template, serial, "/site/")
+        errors, out = self.generate(public, io_threads=3, max_pending=2)
+        self.assertEqual(errors, [])
+        for from_path, dest_path in find_pages(self.content, serial):
+            rel = os.path.relpath(dest_path, serial)
+            self.assertEqual(self.read(dest_path), self.read(os.path.join(public, rel)))
+        # Pages are rendered in the same order the recursive walk visits them
+        self.assertEqual(out.replace(public, serial), serial_out.getvalue())
+
+    def test_title_escaped(self):
+        self.write(os.path.join(self.content, "post00", "index.md"), "# Salt & Pepper\n\nBody")
+        errors, _ = self.generate(os.path.join(self.root, "public"))
+        self.assertEqual(errors, [])
+        html = self.read(os.path.join(self.root, "public", "post00", "index.html"))
+        self.assertIn("<title>Salt &amp; Pepper</title>", html)
+
+    def test_errors_reported_without_aborting(self):
+        broken = os.path.join(self.content, "post03", "index.md")
+        self.write(broken, "no title")
+        public = os.path.join(self.root, "docs")
+        metadata = {}
+        errors, _ = self.generate(public, io_threads=2, metadata=metadata)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0][0], broken)
+        self.assertIn("no title found", errors[0][1])
+        self.assertNotIn(broken, metadata)
+        self.assertTrue(os.path.exists(os.path.join(public, "post11", "index.html")))
+
+    def test_write_errors_reported(self):
+        public = os.path.join(self.root, "docs")
+        # A file where post05's directory should be makes its write fail
+        self.write(os.path.join(public, "post05"), "")
+        metadata = {}
+        errors, _ = self.generate(public, io_threads=2, metadata=metadata)
+        self.assertEqual([from_path for from_path, _ in errors], [os.path.join(self.content, "post05", "index.md")])
+        self.assertEqual(len(metadata), 11)
+        self.assertTrue(os.path.exists(os.path.join(public, "post06", "index.html")))
+
+    def test_metadata_collected(self):
+        metadata = {}
+        self.generate(os.path.join(self.root, "docs"), metadata=metadata)
+        page = metadata[os.path.join(self.content, "post04", "index.md")]
+        self.assertEqual(page.title, "Post 4")
+        self.assertEqual(page.links, ["/post4"])
+
+    def test_profiler_stages(self):
+        profiler = Profiler()
+        self.generate(os.path.join(self.root, "docs"), profiler=profiler)
+        self.assertEqual(len(profiler.pages), 12)
+        for stages in profiler.pages.values():
+            for stage in (READ, SERIALIZE, WRITE):
+                self.assertIn(stage, stages)
+
+    def test_read_ahead_bounded(self):
+        reading = 0
+        most = 0
+        lock = threading.Lock()
+        read_source = pipeline.read_source
+
+        def counting_read(from_path):
+            nonlocal reading, most
+            with lock:
+                reading += 1
+                most = max(most, reading)
+            return read_source(from_path)
+
+        rendered = []
+        parse_page = pipeline.parse_page
+
+        def counting_parse(*args, **kwargs):
+            nonlocal reading
+            with lock:
+                reading -= 1
+                rendered.append(reading)
+            return parse_page(*args, **kwargs)
+
+        with mock.patch.object(pipeline, "read_source", counting_read), mock.patch.object(
+            pipeline, "parse_page", counting_parse
+        ):
+            errors, _ = self.generate(os.path.join(self.root, "docs"), io_threads=4, max_pending=3)
+        self.assertEqual(errors, [])
+        self.assertEqual(len(rendered), 12)
+        self.assertLessEqual(most, 3)
+
+class TestPageWriter(unittest.TestCase):
+    def test_submit_blocks_when_full(self):
+        release = threading.Event()
+        written = []
+
+        def slow_write(dest_path, html):
+            release.wait()
+            written.append(dest_path)
+
+        with mock.patch.object(pipeline, "write_output", slow_write):
+            writer = PageWriter(1, 1)
+            writer.submit("a", "a.html", "")
+            writer.submit("b", "b.html", "")
+            third = threading.Thread(target=writer.submit, args=("c", "c.html", ""))
+            third.start()
+            third.join(0.1)
+            # One page is being written and one waits, so the third submit blocks
+            self.assertTrue(third.is_alive())
+            release.set()
+            third.join()
+            writer.close()
+        self.assertEqual(written, ["a.html", "b.html", "c.html"])
+        self.assertEqual(writer.errors, [])
+
+    def test_failed_write_leaves_no_partial_file(self):
+        with tempfile.TemporaryDirectory() as root:
+            dest_path = os.path.join(root, "post", "index.html")
+            writer = PageWriter(1, 1)
+            # A lone surrogate can't be encoded, so the write fails after the file is created
+            writer.submit("post.md", dest_path, "<p>ok</p>\ud800")
+            writer.close()
+            self.assertEqual([from_path for from_path, _ in writer.errors], ["post.md"])
+            self.assertFalse(os.path.exists(dest_path))
+            write_output(dest_path, "<p>ok</p>")
+            self.assertTrue(os.path.exists(dest_path))
+
+if __name__ == "__main__":
+    unittest.main()
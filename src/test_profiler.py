@@ -0,0 +1,79 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from pagegenerator import find_pages, generate_pages_parallel
+from profiler import AST_CACHE, PAGE_STAGES, Profiler, phase
+
+class TestProfiler(unittest.TestCase):
+    def test_phase(self):
+        profiler = Profiler()
+        with profiler.phase("static"):
+            pass
+        with phase(profiler, "static"):
+            pass
+        self.assertEqual(list(profiler.phases), ["static"])
+        self.assertGreaterEqual(profiler.phases["static"], 0.0)
+
+    def test_phase_disabled(self):
+        with phase(None, "static"):
+            pass
+
+    def test_stage_totals_and_slowest(self):
+        profiler = Profiler()
+        profiler.merge_page("a.md", {"read": 1.0, "write": 2.0})
+        profiler.merge_page("b.md", {"read": 0.5})
+        profiler.page("c.md")
+        profiler.add("read", 4.0)
+        self.assertEqual(profiler.stage_totals(), {"read": 5.5, "write": 2.0})
+        self.assertEqual(profiler.slowest(2), [("c.md", 4.0), ("a.md", 3.0)])
+
+    def test_merge(self):
+        profiler = Profiler()
+        profiler.merge_page("a.md", {"read": 1.0})
+        profiler.count("hits")
+        other = Profiler()
+        other.merge_page("a.md", {"read": 2.0})
+        other.merge_page("b.md", {"write": 1.0})
+        other.count("hits", 2)
+        profiler.merge(other)
+        self.assertEqual(profiler.pages, {"a.md": {"read": 3.0}, "b.md": {"write": 1.0}})
+        self.assertEqual(profiler.counters, {"hits": 3})
+
+    def test_report_and_json(self):
+        profiler = Profiler()
+        profiler.merge_page("a.md", {"read": 1.0})
+        self.assertIn("a.md", profiler.report())
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "profile.json")
+            profiler.dump_json(path)
+            with open(path) as f:
+                data = json.load(f)
+        self.assertEqual(data["page_count"], 1)
+        self.assertEqual(data["slowest"], [{"path": "a.md", "seconds": 1.0}])
+
+    def test_pages_record_every_stage(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, "content")
+            template = os.path.join(tmp, "template.html")
+            with open(template, "w") as f:
+                f.write("{{ Title }}{{ Content }}")
+            for name in ["a", "b", "c"]:
+                os.makedirs(os.path.join(content, name))
+                with open(os.path.join(content, name, "index.md"), "w") as f:
+                    f.write(f"# {name}\n\nSome **text** here\n\n- item")
+            for jobs in [1, 2]:
+                profiler = Profiler()
+                pages = find_pages(content, os.path.join(tmp, f"docs{jobs}"))
+                with contextlib.redirect_stdout(io.StringIO()):
+                    errors = generate_pages_parallel(pages, template, "/", jobs, profiler=profiler)
+                self.assertEqual(errors, [])
+                self.assertEqual(len(profiler.pages), 3)
+                for stages in profiler.pages.values():
+                    self.assertEqual(set(stages), set(PAGE_STAGES) - {AST_CACHE})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import json
+import os
+import unittest
+
+from block_markdown import PageMetadata
+from search import SearchCollector, SearchIndex, TermStore
+from sitetest import SiteTestCase
+
+class TestSearchIndex(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.dir = os.path.join(self.root, "search")
+
+    def load(self, relpath):
+        with open(os.path.join(self.dir, relpath), encoding="utf-8") as f:
+            return json.load(f)
+
+    def shard_for(self, shards, key):
+        shard = None
+        for first, path in shards:
+            if first > key:
+                break
+            shard = path
+        return shard
+
+    def lookup(self, manifest, term):
+        shard = self.shard_for(manifest["shards"], term)
+        return self.load(shard).get(term, []) if shard is not None else []
+
+    def page(self, manifest, page_id):
+        first, path = max(entry for entry in manifest["pages"] if entry[0] <= page_id)
+        return self.load(path)[page_id - first]
+
+    def build(self, index, count=200):
+        for i in range(count):
+            index.add_page(f"/p{i}/", f"Page {i}", {"common", f"term{i:03}", "even" if i % 2 == 0 else "odd"})
+        return index.write(self.dir)
+
+    def test_lookup_through_shards(self):
+        written = self.build(SearchIndex(shard_bytes=256, pages_per_shard=64))
+        manifest = self.load("index.json")
+        self.assertEqual([first for first, _ in manifest["pages"]], [0, 64, 128, 192])
+        self.assertEqual(self.page(manifest, 5), ["/p5/", "Page 5"])
+        self.assertEqual(self.page(manifest, 130), ["/p130/", "Page 130"])
+        self.assertEqual(self.page(manifest, 199), ["/p199/", "Page 199"])
+        self.assertGreater(len(manifest["shards"]), 3)
+        self.assertEqual(len(written), len(manifest["shards"]) + len(manifest["pages"]) + 1)
+        self.assertEqual(self.lookup(manifest, "term123"), [123])
+        self.assertEqual(self.lookup(manifest, "common"), list(range(200)))
+        self.assertEqual(self.lookup(manifest, "odd"), list(range(1, 200, 2)))
+        self.assertEqual(self.lookup(manifest, "missing"), [])
+        firsts = [first for first, _ in manifest["shards"]]
+        self.assertEqual(firsts, sorted(firsts))
+
+    def test_spilled_runs_merge_to_same_index(self):
+        self.build(SearchIndex(shard_bytes=512))
+        in_memory = [self.load("index.json"), self.load("shards/0.json")]
+        index = SearchIndex(shard_bytes=512, max_postings=50)
+        for i in range(200):
+            index.add_page(f"/p{i}/", f"Page {i}", {"common", f"term{i:03}", "even" if i % 2 == 0 else "odd"})
+        self.assertGreater(len(index.runs), 5)
+        index.write(self.dir)
+        self.assertEqual([self.load("index.json"), self.load("shards/0.json")], in_memory)
+        self.assertIsNone(index.spill_dir)
+
+    def test_stale_shards_removed(self):
+        self.build(SearchIndex(shard_bytes=128, pages_per_shard=10))
+        self.build(SearchIndex(shard_bytes=128, pages_per_shard=10), count=3)
+        manifest = self.load("index.json")
+        self.assertEqual(sorted(os.listdir(os.path.join(self.dir, "shards"))),
+                         sorted(os.path.basename(path) for _, path in manifest["shards"]))
+        self.assertEqual(os.listdir(os.path.join(self.dir, "pages")), ["0.json"])
+
+    def test_empty_index(self):
+        SearchIndex().write(self.dir)
+        self.assertEqual(self.load("index.json"), {"pages": [], "shards": []})
+
+    def test_collector_feeds_index_and_releases_terms(self):
+        index = SearchIndex()
+        metadata = SearchCollector(index, {"b.md": "/b/", "a.md": "/a/", "c.md": "/c/"})
+        metadata["b.md"] = PageMetadata(title="B", terms={"bee"})
+        metadata.update({"a.md": PageMetadata(title="A", terms={"ant", "bee"}), "c.md": PageMetadata(title="C")})
+        self.assertEqual(list(metadata), ["b.md", "a.md", "c.md"])
+        self.assertIsNone(metadata["b.md"].terms)
+        self.assertIsNone(metadata["a.md"].terms)
+        index.write(self.dir)
+        manifest = self.load("index.json")
+        self.assertEqual(self.load(manifest["pages"][0][1]), [["/b/", "B"], ["/a/", "A"]])
+        self.assertEqual(self.lookup(manifest, "bee"), [0, 1])
+
+class TestTermStore(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.store = TermStore(os.path.join(self.root, "terms"))
+
+    def test_round_trip(self):
+        self.assertIsNone(self.store.get("ab12"))
+        self.assertFalse(self.store.has("ab12"))
+        self.store.put("ab12", {"hobbit", "shire"})
+        self.store.put("cd34", set())
+        self.assertEqual(self.store.get("ab12"), {"hobbit", "shire"})
+        self.assertEqual(self.store.get("cd34"), set())
+        self.assertTrue(self.store.has("cd34"))
+
+    def test_retain(self):
+        self.store.retain(["ab12"])
+        self.store.put("ab12", {"hobbit"})
+        self.store.put("ab34", {"shire"})
+        self.store.retain(["ab12"])
+        self.assertEqual(self.store.get("ab12"), {"hobbit"})
+        self.assertIsNone(self.store.get("ab34"))
+
+if __name__ == "__main__":
+    unittest.main()
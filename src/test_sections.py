@@ -0,0 +1,138 @@
+import os
+import unittest
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime, timezone
+
+from block_markdown import PageMetadata
+from pagegenerator import find_pages, generate_pages_parallel
+from sections import (
+    SectionEntry,
+    generate_sections,
+    page_url,
+    parse_date,
+    section_entries,
+    write_listings,
+)
+from sitetest import SiteTestCase
+from template import Template, TemplateRegistry
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+
+class TestSectionHelpers(unittest.TestCase):
+    def test_page_url(self):
+        self.assertEqual(page_url(os.path.join("docs", "index.html"), "docs"), "/")
+        self.assertEqual(page_url(os.path.join("docs", "blog", "tom", "index.html"), "docs"), "/blog/tom/")
+        self.assertEqual(page_url(os.path.join("docs", "about.html"), "docs"), "/about.html")
+
+    def test_parse_date(self):
+        self.assertEqual(parse_date("2024-01-02"), datetime(2024, 1, 2, tzinfo=timezone.utc))
+        self.assertEqual(parse_date("2024-01-02T12:00:00+02:00"), datetime(2024, 1, 2, 10, tzinfo=timezone.utc))
+        self.assertIsNone(parse_date("last tuesday"))
+        self.assertIsNone(parse_date(None))
+
+    def test_entries_newest_first(self):
+        pages = [(os.path.join("content", "blog", name, "index.md"), os.path.join("docs", "blog", name, "index.html"))
+                 for name in ("a", "b", "c", "d")]
+        pages.append((os.path.join("content", "index.md"), os.path.join("docs", "index.html")))
+        metadata = {
+            pages[0][0]: PageMetadata("A", fields={"date": "2024-01-01"}),
+            pages[1][0]: PageMetadata("B"),
+            pages[2][0]: PageMetadata("C", fields={"date": "2024-03-01"}),
+            pages[4][0]: PageMetadata("Home", fields={"date": "2025-01-01"}),
+        }
+        entries = section_entries("blog", pages, metadata, "content", "docs")
+        # d failed to generate, and the home page is outside the section
+        self.assertEqual([entry.title for entry in entries], ["C", "A", "B"])
+        self.assertEqual(entries[0].url, "/blog/c/")
+
+class TestListings(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.public = os.path.join(self.root, "docs")
+        self.template = Template("<title>{{ Title }}</title>{{ Content }}", "/site/")
+
+    def read_public(self, *parts):
+        return self.read(os.path.join(self.public, *parts))
+
+    def listings(self, count, page_size):
+        entries = [SectionEntry(f"Post {i}", f"/blog/{i}/", summary=f"About **{i}**") for i in range(count)]
+        with self.quietly():
+            return write_listings("blog", entries, self.template, "Blog", self.public, "/site/", page_size)
+
+    def test_paginated(self):
+        written = self.listings(5, 2)
+        self.assertEqual(len(written), 3)
+        first = self.read_public("blog", "index.html")
+        self.assertTrue(first.startswith("<title>Blog</title><div><ul><li>"))
+        self.assertIn('<a href="/site/blog/0/">Post 0</a><p>About <b>0</b></p>', first)
+        self.assertNotIn("Post 2", first)
+        self.assertIn('<nav><a href="/site/blog/page/2/" rel="next">Older</a></nav>', first)
+        second = self.read_public("blog", "page", "2", "index.html")
+        self.assertIn("<title>Blog, page 2</title>", second)
+        self.assertIn('<a href="/site/blog/" rel="prev">Newer</a><a href="/site/blog/page/3/" rel="next">', second)
+        self.assertEqual(written[1][1], ["/blog/2/", "/blog/3/", "/blog/", "/blog/page/3/"])
+
+    def test_empty_section_has_one_page(self):
+        self.assertEqual(len(self.listings(0, 10)), 1)
+        self.assertEqual(self.read_public("blog", "index.html"), "<title>Blog</title><div><ul></ul></div>")
+
+    def test_stale_pages_removed(self):
+        self.listings(7, 2)
+        self.listings(3, 2)
+        self.assertTrue(os.path.exists(os.path.join(self.public, "blog", "page", "2", "index.html")))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "page", "3")))
+
+class TestGenerateSections(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.public = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(
+            os.path.join(self.content, "blog", "old", "index.md"),
+            "---\ndate: 2023-05-01\n---\n\n# Old & busted\n\n[< Back](/)\n\nThe <first> post.",
+        )
+        self.write(
+            os.path.join(self.content, "blog", "new", "index.md"),
+            "---\ndate: 2024-05-01T08:30:00Z\nsummary: Fresh [news](/blog/old)\n---\n\n# New\n\nBody",
+        )
+
+    def generate(self):
+        templates = TemplateRegistry(self.template, "/site/")
+        pages = find_pages(self.content, self.public)
+        metadata = {}
+        with self.quietly():
+            generate_pages_parallel(pages, self.template, "/site/", 1, metadata=metadata, templates=templates)
+            return generate_sections(
+                ["blog"], pages, metadata, templates, self.content, self.public, "/site/", 10, "https://example.com/"
+            )
+
+    def test_listing_and_feed_from_metadata(self):
+        written = self.generate()
+        self.assertEqual([os.path.relpath(path, self.public) for path, _ in written],
+                         [os.path.join("blog", "index.html"), os.path.join("blog", "atom.xml")])
+        self.assertIsNone(written[1][1])
+        with open(os.path.join(self.public, "blog", "index.html")) as f:
+            listing = f.read()
+        self.assertLess(listing.index("New"), listing.index("Old"))
+        self.assertIn('<time datetime="2024-05-01T08:30:00Z">2024-05-01</time>', listing)
+        self.assertIn('<p>Fresh <a href="/site/blog/old">news</a></p>', listing)
+        self.assertIn("<p>The &lt;first&gt; post.</p>", listing)
+
+        feed = ElementTree.parse(os.path.join(self.public, "blog", "atom.xml")).getroot()
+        self.assertEqual(feed.find(f"{ATOM}id").text, "https://example.com/site/blog/")
+        self.assertEqual(feed.find(f"{ATOM}updated").text, "2024-05-01T08:30:00Z")
+        entries = feed.findall(f"{ATOM}entry")
+        self.assertEqual([entry.find(f"{ATOM}title").text for entry in entries], ["New", "Old & busted"])
+        self.assertEqual(entries[1].find(f"{ATOM}link").get("href"), "https://example.com/site/blog/old/")
+        self.assertEqual(entries[1].find(f"{ATOM}summary").text, "The &lt;first&gt; post.")
+
+    def test_section_with_own_index_refused(self):
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog")
+        with self.assertRaises(ValueError):
+            self.generate()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import os
+import unittest
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime, timezone
+
+from sitemap import write_sitemap
+from sitetest import SiteTestCase
+
+NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+class TestSitemap(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.public = self.root
+
+    def parse(self, name="sitemap.xml"):
+        return ElementTree.parse(os.path.join(self.public, name)).getroot()
+
+    def test_urlset(self):
+        entries = [("/", None), ("/blog/a&b/", datetime(2024, 1, 2, tzinfo=timezone.utc))]
+        written = write_sitemap(self.public, entries, "https://example.com/", "/site/")
+        self.assertEqual(written, [os.path.join(self.public, "sitemap.xml")])
+        urls = self.parse().findall(f"{NS}url")
+        self.assertEqual([url.find(f"{NS}loc").text for url in urls],
+                         ["https://example.com/site/", "https://example.com/site/blog/a&b/"])
+        self.assertIsNone(urls[0].find(f"{NS}lastmod"))
+        self.assertEqual(urls[1].find(f"{NS}lastmod").text, "2024-01-02T00:00:00Z")
+
+    def test_index_past_limit(self):
+        entries = [(f"/p{i}/", None) for i in range(5)]
+        written = write_sitemap(self.public, entries, "https://example.com", "/", limit=2)
+        self.assertEqual(len(written), 4)
+        index = self.parse()
+        self.assertEqual(index.tag, f"{NS}sitemapindex")
+        self.assertEqual([loc.text for loc in index.iter(f"{NS}loc")],
+                         [f"https://example.com/sitemap-{n}.xml" for n in (1, 2, 3)])
+        self.assertEqual(len(self.parse("sitemap-3.xml").findall(f"{NS}url")), 1)
+
+        write_sitemap(self.public, entries[:1], "https://example.com", "/", limit=2)
+        self.assertEqual(os.listdir(self.public), ["sitemap.xml"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import io
+import os
+import unittest
+
+from block_markdown import markdown_to_html_node
+from htmlnode import LeafNode, ParentNode
+from sitetest import SiteTestCase
+from template import Template, TemplateRegistry, rewrite_basepath, rewrite_url, set_asset_urls
+
+class TestTemplate(unittest.TestCase):
+    def test_segments_and_slots(self):
+        template = Template("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        self.assertEqual(template.slots, ["Title", "Content"])
+        self.assertEqual(template.segments, ["<title>", "</title><main>", "</main>"])
+
+    def test_render(self):
+        template = Template("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        self.assertEqual(
+            template.render(Title="Hi", Content="<p>Body</p>"),
+            "<title>Hi</title><main><p>Body</p></main>",
+        )
+
+    def test_render_missing_value_keeps_placeholder(self):
+        template = Template("<title>{{ Title }}</title>")
+        self.assertEqual(template.render(), "<title>{{ Title }}</title>")
+
+    def test_repeated_slot(self):
+        template = Template("{{ Title }} - {{ Title }}")
+        self.assertEqual(template.render(Title="A"), "A - A")
+
+    def test_basepath_applied_to_template_once(self):
+        template = Template('<link href="/index.css"><img src="/a.png">{{ Content }}', "/site/")
+        self.assertEqual(template.segments[0], '<link href="/site/index.css"><img src="/site/a.png">')
+
+    def test_values_written_as_given(self):
+        template = Template("{{ Content }}", "/site/")
+        self.assertEqual(template.render(Content='<a href="/blog">x</a>'), '<a href="/blog">x</a>')
+
+    def test_rewrite_url(self):
+        self.assertEqual(rewrite_url("/blog", "/site/"), "/site/blog")
+        self.assertEqual(rewrite_url("/blog", "/"), "/blog")
+        self.assertEqual(rewrite_url("https://example.com/", "/site/"), "https://example.com/")
+        self.assertEqual(rewrite_url("//cdn.example.com/a.js", "/site/"), "//cdn.example.com/a.js")
+        self.assertEqual(rewrite_url("relative/page", "/site/"), "relative/page")
+
+    def test_root_basepath_unchanged(self):
+        html = '<a href="/blog">x</a>'
+        self.assertIs(rewrite_basepath(html, "/"), html)
+
+    def test_matches_chained_replace(self):
+        markdown = "[blog](/blog) ![a](/images/a.png)"
+        text = '<title>{{ Title }}</title><link href="/index.css" />{{ Content }}'
+        title = "Tolkien"
+        content = markdown_to_html_node(markdown).to_html()
+        expected = text.replace("{{ Title }}", title).replace("{{ Content }}", content)
+        expected = expected.replace('href="/', 'href="/repo/').replace('src="/', 'src="/repo/')
+        rendered = Template(text, "/repo/").render(Title=title, Content=markdown_to_html_node(markdown, basepath="/repo/"))
+        self.assertEqual(rendered, expected)
+
+    def test_code_content_left_intact(self):
+        markdown = '```\n<a href="/blog">\n```\n\n`src="/x"` and [link](/blog)'
+        html = Template("{{ Content }}", "/repo/").render(Content=markdown_to_html_node(markdown, basepath="/repo/"))
+        self.assertIn('&lt;a href="/blog"&gt;', html)
+        self.assertIn('<code>src="/x"</code>', html)
+        self.assertIn('<a href="/repo/blog">link</a>', html)
+
+    def test_write_streams_nodes(self):
+        template = Template('<link href="/index.css">{{ Content }}', "/site/")
+        node = ParentNode("p", [LeafNode("a", "blog", props={"href": "/site/blog"}), LeafNode(None, " and more")])
+        buffer = io.StringIO()
+        template.write(buffer, Content=node)
+        self.assertEqual(buffer.getvalue(), '<link href="/site/index.css"><p><a href="/site/blog">blog</a> and more</p>')
+        self.assertEqual(template.render(Content=node), buffer.getvalue())
+
+    def test_fingerprinted_assets(self):
+        set_asset_urls({"/index.css": "/index.abc.css", "/images/tom.png": "/images/tom.def.png"})
+        try:
+            template = Template('<link href="/index.css"><a href="/blog">{{ Content }}</a>', "/site/")
+            node = markdown_to_html_node("![tom](/images/tom.png) [css](/index.css)", basepath="/site/")
+            html = template.render(Content=node)
+        finally:
+            set_asset_urls(None)
+        self.assertEqual(template.assets, {"/index.css": "/index.abc.css"})
+        self.assertIn('<link href="/site/index.abc.css">', html)
+        self.assertIn('<a href="/site/blog">', html)
+        self.assertIn('<img src="/site/images/tom.def.png" alt="tom">', html)
+        self.assertIn('<a href="/site/index.abc.css">css</a>', html)
+        self.assertEqual(Template('<link href="/index.css">').assets, {})
+
+class TestTemplateRegistry(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.layouts = os.path.join(self.root, "layouts")
+        self.default = os.path.join(self.root, "template.html")
+        self.write(self.default, '<link href="/index.css">{{ Content }}')
+        self.write(os.path.join(self.layouts, "blog.html"), "<article>{{ Content }}</article>")
+        self.write(os.path.join(self.layouts, "blog", "tom.html"), "<aside>{{ Content }}</aside>")
+
+    def test_layouts_compiled_up_front(self):
+        registry = TemplateRegistry(self.default, "/site/", self.content, self.layouts)
+        self.assertEqual(sorted(registry.layouts), ["blog", "blog/tom"])
+        self.assertEqual(len(registry.templates), 3)
+        self.assertEqual(registry.get(self.default).segments[0], '<link href="/site/index.css">')
+
+    def test_nearest_directory_layout(self):
+        registry = TemplateRegistry(self.default, "/", self.content, self.layouts)
+        blog = os.path.join(self.layouts, "blog.html")
+        self.assertEqual(registry.path_for(os.path.join(self.content, "index.md")), self.default)
+        self.assertEqual(registry.path_for(os.path.join(self.content, "blog", "index.md")), blog)
+        self.assertEqual(registry.path_for(os.path.join(self.content, "blog", "majesty", "index.md")), blog)
+        self.assertEqual(
+            registry.path_for(os.path.join(self.content, "blog", "tom", "index.md")),
+            os.path.join(self.layouts, "blog", "tom.html"),
+        )
+        self.assertEqual(registry.path_for(os.path.join(self.content, "contact", "index.md")), self.default)
+
+    def test_front_matter_names_layout(self):
+        registry = TemplateRegistry(self.default, "/", self.content, self.layouts)
+        page = os.path.join(self.content, "contact", "index.md")
+        self.write(page, "---\ntemplate: blog/tom\n---\n\n# Contact")
+        self.assertEqual(registry.path_for(page), os.path.join(self.layouts, "blog", "tom.html"))
+        self.write(page, "---\ntemplate: missing\n---\n\n# Contact")
+        with self.assertRaises(FileNotFoundError):
+            registry.get(registry.path_for(page))
+
+    def test_templates_shared(self):
+        registry = TemplateRegistry(self.default, "/", self.content, self.layouts)
+        blog = registry.path_for(os.path.join(self.content, "blog", "a", "index.md"))
+        self.assertIs(registry.get(blog), registry.get(registry.path_for(os.path.join(self.content, "blog", "b.md"))))
+
+    def test_without_layouts(self):
+        registry = TemplateRegistry(self.default, "/", self.content, os.path.join(self.root, "missing"))
+        self.assertEqual(registry.layouts, {})
+        self.assertEqual(registry.path_for(os.path.join(self.content, "blog", "index.md")), self.default)
+        page = os.path.join(self.content, "contact", "index.md")
+        self.write(page, "---\ntemplate: blog\n---\n\n# Contact")
+        self.assertEqual(registry.path_for(page), self.default)
+
+if __name__ == "__main__":
+    unittest.main()
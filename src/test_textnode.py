@@ -85,10 +85,23 @@ class TestTextNodeToHTMLNode(unittest.TestCase):
             {"src": "https://example.com/image.png", "alt": "This is an image alt text"},
         )
 
+    def test_text_node_to_html_node_basepath(self):
+        link = text_node_to_html_node(TextNode("blog", TextType.LINK, "/blog"), "/site/")
+        self.assertEqual(link.props, {"href": "/site/blog"})
+        image = text_node_to_html_node(TextNode("a", TextType.IMAGE, "/images/a.png"), "/site/")
+        self.assertEqual(image.props["src"], "/site/images/a.png")
+        external = text_node_to_html_node(TextNode("x", TextType.LINK, "https://example.com/"), "/site/")
+        self.assertEqual(external.props, {"href": "https://example.com/"})
+
     def test_text_node_to_html_node_unsupported(self):
         node = TextNode("This is a text node with unsupported type", None)
         with self.assertRaises(ValueError):
             text_node_to_html_node(node)
 
+    def test_text_node_has_no_instance_dict(self):
+        node = TextNode("text", TextType.TEXT)
+        self.assertFalse(hasattr(node, "__dict__"))
+        self.assertEqual(repr(node), "TextNode(text, text, None)")
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
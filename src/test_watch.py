@@ -0,0 +1,120 @@
+import os
+import unittest
+import urllib.request
+
+from sitetest import SiteTestCase
+from watch import SiteWatcher, diff_snapshots, serve, snapshot
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+class TestWatch(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.public = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nHello")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nPosts")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.watcher = SiteWatcher(self.content, self.static, self.template, self.public, "/")
+
+    def write(self, path, text):
+        super().write(path, text)
+        # Make sure the change is visible even on filesystems with coarse mtimes
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def poll(self):
+        with self.quietly():
+            return self.watcher.poll()
+
+    def test_diff_snapshots(self):
+        old = {"a": (1, 1), "b": (1, 1), "c": (1, 1)}
+        new = {"a": (1, 1), "b": (2, 1), "d": (1, 1)}
+        self.assertEqual(diff_snapshots(old, new), (["b", "d"], ["c"]))
+
+    def test_snapshot(self):
+        files = snapshot(self.content)
+        self.assertEqual(sorted(files), [os.path.join(self.content, "blog", "index.md"), os.path.join(self.content, "index.md")])
+        self.assertEqual(snapshot(os.path.join(self.content, "missing")), {})
+
+    def test_no_changes(self):
+        self.assertEqual(self.poll(), 0)
+
+    def test_changed_page_rebuilt_alone(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nEdited")
+        self.assertEqual(self.poll(), 1)
+        self.assertIn("<p>Edited</p>", self.read(os.path.join(self.public, "index.html")))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "index.html")))
+
+    def test_removed_page_deleted(self):
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nMore")
+        self.poll()
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        self.assertEqual(self.poll(), 1)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+
+    def test_template_change_rebuilds_all(self):
+        self.write(self.template, "<main>{{ Content }}</main>")
+        self.assertEqual(self.poll(), 2)
+        self.assertEqual(self.read(os.path.join(self.public, "blog", "index.html")), "<main><div><h1>Blog</h1><p>Posts</p></div></main>")
+
+    def test_layout_change_rebuilds_its_pages(self):
+        layouts = os.path.join(self.root, "layouts")
+        self.watcher = SiteWatcher(self.content, self.static, self.template, self.public, "/", dir_path_layouts=layouts)
+        self.write(os.path.join(layouts, "blog.html"), "<article>{{ Content }}</article>")
+        self.assertEqual(self.poll(), 1)
+        self.assertEqual(self.read(os.path.join(self.public, "blog", "index.html")), "<article><div><h1>Blog</h1><p>Posts</p></div></article>")
+        self.assertFalse(os.path.exists(os.path.join(self.public, "index.html")))
+        self.write(os.path.join(layouts, "blog.html"), "<main>{{ Content }}</main>")
+        self.assertEqual(self.poll(), 1)
+        self.assertIn("<main>", self.read(os.path.join(self.public, "blog", "index.html")))
+
+    def test_on_change_after_pages_rebuilt(self):
+        calls = []
+        self.watcher.on_change = lambda *args: calls.append(args)
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        self.poll()
+        self.assertEqual(calls, [])
+        home = os.path.join(self.content, "index.md")
+        blog = os.path.join(self.content, "blog", "index.md")
+        self.write(home, "# Home\n\nEdited [blog](/blog)")
+        os.remove(blog)
+        self.poll()
+        self.assertEqual(len(calls), 1)
+        templates, rendered, removed = calls[0]
+        self.assertIs(templates, self.watcher.templates)
+        self.assertEqual(list(rendered), [home])
+        self.assertEqual(rendered[home].links, ["/blog"])
+        self.assertEqual(removed, [blog])
+
+    def test_static_asset_synced(self):
+        self.write(os.path.join(self.static, "images", "a.png"), "png")
+        self.assertEqual(self.poll(), 1)
+        self.assertEqual(self.read(os.path.join(self.public, "images", "a.png")), "png")
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        self.assertEqual(self.poll(), 1)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images")))
+
+    def test_broken_page_does_not_stop_watching(self):
+        self.write(os.path.join(self.content, "index.md"), "no title")
+        self.assertEqual(self.poll(), 1)
+        self.write(os.path.join(self.content, "index.md"), "# Fixed")
+        self.assertEqual(self.poll(), 1)
+        self.assertIn("<h1>Fixed</h1>", self.read(os.path.join(self.public, "index.html")))
+
+    def test_serve(self):
+        self.write(os.path.join(self.public, "index.html"), "served")
+        server = serve(self.public, 0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/index.html"
+            with urllib.request.urlopen(url) as response:
+                self.assertEqual(response.read(), b"served")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+if __name__ == "__main__":
+    unittest.main()
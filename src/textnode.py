@@ -1,5 +1,6 @@
 from enum import Enum
-from htmlnode import LeafNode
+from htmlnode import LeafNode, PlainLeafNode
+from template import asset_url, rewrite_url
 
 class TextType(Enum):
     TEXT = "text"
@@ -10,6 +11,8 @@ class TextType(Enum):
     IMAGE = "image"
 
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text: str, text_type: TextType, url: str = None):
         self.text = text
         self.text_type = text_type
@@ -21,19 +24,32 @@ class TextNode:
     def __eq__(self, other)-> bool:
         return self.text == other.text and self.text_type == other.text_type and self.url == other.url
     
-def text_node_to_html_node(text_node)-> LeafNode:
+def text_node_to_html_node(text_node, basepath: str = "/", plain: bool = False)-> LeafNode:
+    """
+    Converts a TextNode to its LeafNode, pointing root-relative link and image URLs at basepath, and at the
+    fingerprinted name of the static file they reference when assets are fingerprinted. With plain set, the text, the
+    URL and the basepath are known to hold nothing escape_text would change, and the leaf is built as a PlainLeafNode
+    unless a quote in an attribute value still needs escaping.
+    """
+    leaf = PlainLeafNode if plain else LeafNode
     match text_node.text_type:
         case TextType.TEXT:
-            return LeafNode(None, text_node.text)
+            return leaf(None, text_node.text)
         case TextType.BOLD:
-            return LeafNode("b", text_node.text)
+            return leaf("b", text_node.text)
         case TextType.ITALIC:
-            return LeafNode("i", text_node.text)
+            return leaf("i", text_node.text)
         case TextType.CODE:
-            return LeafNode("code", text_node.text)
+            return leaf("code", text_node.text)
         case TextType.LINK:
-            return LeafNode("a", text_node.text, props={"href": text_node.url})
+            href = rewrite_url(asset_url(text_node.url), basepath)
+            if plain and '"' in href:
+                leaf = LeafNode
+            return leaf("a", text_node.text, props={"href": href})
         case TextType.IMAGE:
-            return LeafNode("img", "", props={"src": text_node.url, "alt": text_node.text})
+            src = rewrite_url(asset_url(text_node.url), basepath)
+            if plain and ('"' in src or '"' in text_node.text):
+                leaf = LeafNode
+            return leaf("img", "", props={"src": src, "alt": text_node.text})
         case _:
             raise ValueError(f"Unsupported text type: {text_node.text_type}")
\ No newline at end of file
@@ -0,0 +1,192 @@
+import functools
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from block_markdown import PageMetadata
+from copystatic import COPY, remove_output, transfer_file
+from pagegenerator import generate_page
+from template import TemplateRegistry
+
+def snapshot(dir_path)-> dict[str, tuple[int, int]]:
+    """
+    Returns (mtime_ns, size) for every file under dir_path, keyed by path.
+    """
+    files = {}
+    if not os.path.isdir(dir_path):
+        return files
+    pending = [dir_path]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    pending.append(entry.path)
+                else:
+                    stat = entry.stat()
+                    files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+def diff_snapshots(old, new)-> tuple[list[str], list[str]]:
+    """
+    Returns the paths that were added or modified, and the paths that were removed, between two snapshots.
+    """
+    changed = sorted(path for path, state in new.items() if old.get(path) != state)
+    removed = sorted(path for path in old if path not in new)
+    return changed, removed
+
+class SiteWatcher:
+    """
+    Polls the content, static, template and layout sources and applies each change to the public directory with the
+    smallest rebuild that covers it: one page per changed markdown file, one file per changed asset, and the pages
+    that use a template, or now pick a different one, when templates change.
+
+    Args:
+        on_change (callable): called after a poll rebuilt or removed pages with the current TemplateRegistry, the
+            PageMetadata of the pages rendered keyed by from_path, and the from_paths of the pages removed, to record
+            them and refresh what is built from every page, such as section listings, if given.
+    """
+    def __init__(self, dir_path_content, dir_path_static, template_path, dir_path_public, basepath, mode=COPY,
+                 dir_path_layouts=None, on_change=None):
+        self.dir_path_content = dir_path_content
+        self.dir_path_static = dir_path_static
+        self.template_path = template_path
+        self.dir_path_public = dir_path_public
+        self.basepath = basepath
+        self.mode = mode
+        self.dir_path_layouts = dir_path_layouts
+        self.on_change = on_change
+        self.templates = self.load_templates()
+        self.content = snapshot(dir_path_content)
+        self.static = snapshot(dir_path_static)
+        self.template_state = self.template_stat()
+        self.layouts = self.layouts_snapshot()
+
+    def load_templates(self)-> TemplateRegistry:
+        return TemplateRegistry(self.template_path, self.basepath, self.dir_path_content, self.dir_path_layouts)
+
+    def layouts_snapshot(self)-> dict[str, tuple[int, int]]:
+        if self.dir_path_layouts is None:
+            return {}
+        return snapshot(self.dir_path_layouts)
+
+    def template_stat(self)-> tuple[int, int] | None:
+        try:
+            stat = os.stat(self.template_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def dest_for(self, from_path)-> Path:
+        rel_path = os.path.relpath(from_path, self.dir_path_content)
+        return Path(os.path.join(self.dir_path_public, rel_path)).with_suffix(".html")
+
+    def render(self, from_path)-> PageMetadata | None:
+        """
+        Renders one page, returning its metadata, or None if it failed.
+        """
+        template_path = self.templates.path_for(from_path)
+        try:
+            return generate_page(
+                from_path, template_path, self.dest_for(from_path), self.basepath, self.templates.get(template_path)
+            )
+        except Exception as e:
+            print(f"error: {from_path}: {type(e).__name__}: {e}")
+            return None
+
+    def poll(self)-> int:
+        """
+        Checks every source once and rebuilds what changed.
+
+        Returns:
+            int: the number of pages and assets rebuilt or removed.
+        """
+        updates = 0
+
+        template_state = self.template_stat()
+        layouts = self.layouts_snapshot()
+        content = snapshot(self.dir_path_content)
+        stale = set()
+        if template_state is not None and (template_state != self.template_state or layouts != self.layouts):
+            changed_templates = set(diff_snapshots(self.layouts, layouts)[0])
+            if template_state != self.template_state:
+                changed_templates.add(self.template_path)
+            old_templates = self.templates
+            self.templates = self.load_templates()
+            self.template_state = template_state
+            self.layouts = layouts
+            for from_path in content:
+                template_path = self.templates.path_for(from_path)
+                if template_path in changed_templates or template_path != old_templates.path_for(from_path):
+                    stale.add(from_path)
+
+        changed, removed = diff_snapshots(self.content, content)
+        rebuilt = sorted(stale.union(changed))
+        rendered = {}
+        for from_path in rebuilt:
+            page_metadata = self.render(from_path)
+            if page_metadata is not None:
+                rendered[from_path] = page_metadata
+        for from_path in removed:
+            print(f" - {self.dest_for(from_path)}")
+            remove_output(self.dest_for(from_path), self.dir_path_public)
+        updates += len(rebuilt) + len(removed)
+        self.content = content
+        if (rebuilt or removed) and self.on_change is not None:
+            self.on_change(self.templates, rendered, removed)
+
+        static = snapshot(self.dir_path_static)
+        changed, removed = diff_snapshots(self.static, static)
+        for from_path in changed:
+            rel_path = os.path.relpath(from_path, self.dir_path_static)
+            dest_path = os.path.join(self.dir_path_public, rel_path)
+            print(f" * {from_path} -> {dest_path}")
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            transfer_file(from_path, dest_path, self.mode)
+        for from_path in removed:
+            rel_path = os.path.relpath(from_path, self.dir_path_static)
+            print(f" - {os.path.join(self.dir_path_public, rel_path)}")
+            remove_output(os.path.join(self.dir_path_public, rel_path), self.dir_path_public)
+        updates += len(changed) + len(removed)
+        self.static = static
+
+        return updates
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+def serve(dir_path_public, port)-> ThreadingHTTPServer:
+    """
+    Serves the public directory from a background thread and returns the running server.
+    """
+    handler = functools.partial(QuietHandler, directory=dir_path_public)
+    server = ThreadingHTTPServer(("", port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def watch(dir_path_content, dir_path_static, template_path, dir_path_public, basepath, port=8888, interval=0.05,
+          mode=COPY, dir_path_layouts=None, on_change=None):
+    """
+    Serves the public directory and polls the sources every interval seconds until interrupted. Polling keeps this
+    on the standard library and works on every platform and filesystem, including network mounts.
+    """
+    watcher = SiteWatcher(
+        dir_path_content, dir_path_static, template_path, dir_path_public, basepath, mode, dir_path_layouts, on_change
+    )
+    server = serve(dir_path_public, port)
+    print(f"Serving {dir_path_public} at http://localhost:{server.server_address[1]}{basepath}")
+    print("Watching for changes, press Ctrl+C to stop...")
+    try:
+        while True:
+            start = time.perf_counter()
+            if watcher.poll():
+                print(f"Rebuilt in {(time.perf_counter() - start) * 1000:.0f} ms")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()